@@ -0,0 +1,262 @@
+import os
+import sys
+import uuid
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, HTTPException
+from typing import Dict, List
+from app.api.processing import (
+    ProcessingSession,
+    processing_jobs,
+    process_documents_background,
+    _document_paths,
+    _load_gstr2b_file,
+    _attach_gstr2b,
+    _reconcile_session,
+    _export_response
+)
+from app.services.batch_scheduler import get_batch_scheduler
+from app.services.extraction_cache import get_extraction_cache
+from app.services.rate_limiter import get_gemini_rate_limiter
+from app.services.stage_metrics import session_timings
+from app.services.columnar_export import EXPORT_FORMATS
+from app.config import UPLOAD_DIR
+
+router = APIRouter()
+
+# In-memory storage for batch jobs, alongside processing_jobs
+batch_jobs: Dict[str, Dict] = {}
+
+# Share of an entry's progress taken by extraction; reconciliation is the rest
+EXTRACTION_SHARE = 0.8
+
+
+def _upload_path(relative_path: str) -> str:
+    """Resolve a manifest path inside UPLOAD_DIR; ValueError if it escapes it"""
+    root = os.path.realpath(UPLOAD_DIR)
+    path = os.path.realpath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Path is outside the upload directory: {relative_path}")
+    return path
+
+
+def _manifest_entry(index: int, raw: Dict) -> Dict:
+    """Validated batch entry from one manifest item"""
+    if not isinstance(raw, dict):
+        raise ValueError(f"Entry {index}: expected an object")
+    client_name = raw.get("client_name")
+    month = raw.get("month")
+    gstr2b_file = raw.get("gstr2b_file")
+    if not client_name or not month or not gstr2b_file:
+        raise ValueError(f"Entry {index}: client_name, month and gstr2b_file are required")
+    
+    documents_dir = raw.get("documents_dir") or os.path.join(client_name, month)
+    documents_path = _upload_path(documents_dir)
+    gstr2b_path = _upload_path(gstr2b_file)
+    if not os.path.isdir(documents_path):
+        raise ValueError(f"Entry {index}: documents directory not found: {documents_dir}")
+    if not os.path.isfile(gstr2b_path):
+        raise ValueError(f"Entry {index}: GSTR2B file not found: {gstr2b_file}")
+    
+    return {
+        "entry_id": index,
+        "client_name": client_name,
+        "month": month,
+        "documents_dir": documents_dir,
+        "gstr2b_file": gstr2b_file,
+        "documents_path": documents_path,
+        "gstr2b_path": gstr2b_path,
+        "status": "queued",
+        "session_id": None,
+        "file_count": 0,
+        "error": None,
+        "started_at": None,
+        "finished_at": None
+    }
+
+
+async def _run_entry(entry: Dict):
+    """Extract, attach GSTR2B and reconcile one client-month"""
+    entry["status"] = "extracting"
+    entry["started_at"] = datetime.now().isoformat()
+    print(f"[BATCH] Starting {entry['client_name']} {entry['month']}", file=sys.stderr)
+    
+    try:
+        session_id = str(uuid.uuid4())
+        session = ProcessingSession(session_id, entry["client_name"], entry["month"])
+        processing_jobs[session_id] = session
+        entry["session_id"] = session_id
+        
+        file_paths = _document_paths(entry["documents_path"])
+        entry["file_count"] = len(file_paths)
+        if not file_paths:
+            raise ValueError("No document files found in documents directory")
+        
+        await process_documents_background(session_id, file_paths)
+        if session.status == "error":
+            raise RuntimeError(session.error or "Document processing failed")
+        
+        entry["status"] = "reconciling"
+        with session_timings(session.timings):
+            gstr2b_data = await asyncio.to_thread(_load_gstr2b_file, entry["gstr2b_path"])
+        # Validating and indexing a large GSTR2B file is CPU work too
+        await asyncio.to_thread(_attach_gstr2b, session, gstr2b_data)
+        await _reconcile_session(session)
+        
+        entry["status"] = "completed"
+        print(f"[BATCH] ✓ Completed {entry['client_name']} {entry['month']}", file=sys.stderr)
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = str(e)
+        print(f"[BATCH] ✗ {entry['client_name']} {entry['month']}: {str(e)}", file=sys.stderr)
+    finally:
+        entry["finished_at"] = datetime.now().isoformat()
+
+
+def _entry_progress(entry: Dict, session) -> int:
+    if entry["status"] in ("completed", "error"):
+        return 100
+    if entry["status"] == "extracting" and session is not None:
+        return int(session.progress * EXTRACTION_SHARE)
+    if entry["status"] == "reconciling":
+        return int(100 * EXTRACTION_SHARE)
+    return 0
+
+
+def _combined_summary(summaries: List[Dict]) -> Dict:
+    """Reconciliation summaries of several sessions added up"""
+    combined: Dict = {}
+    status_breakdown: Dict[str, int] = {}
+    for summary in summaries:
+        for key, value in summary.items():
+            if isinstance(value, int):
+                combined[key] = combined.get(key, 0) + value
+        for status, count in summary.get("status_breakdown", {}).items():
+            status_breakdown[status] = status_breakdown.get(status, 0) + count
+    
+    total_books = combined.get("total_books_invoices", 0)
+    combined["reconciliation_rate"] = f"{(combined.get('matched', 0) / total_books * 100):.1f}%" if total_books > 0 else "0%"
+    combined["status_breakdown"] = status_breakdown
+    return combined
+
+
+def _batch_status(batch: Dict) -> Dict:
+    """Consolidated view of a batch: per-entry state plus totals"""
+    entries = []
+    status_counts: Dict[str, int] = {}
+    summaries = []
+    for entry in batch["entries"]:
+        session = processing_jobs.get(entry["session_id"]) if entry["session_id"] else None
+        reconciliation = (session.mismatch_results or {}).get("reconciliation") if session else None
+        summary = reconciliation.get("summary") if reconciliation else None
+        if summary:
+            summaries.append(summary)
+        status_counts[entry["status"]] = status_counts.get(entry["status"], 0) + 1
+        
+        entries.append({
+            "entry_id": entry["entry_id"],
+            "client_name": entry["client_name"],
+            "month": entry["month"],
+            "status": entry["status"],
+            "progress": _entry_progress(entry, session),
+            "session_id": entry["session_id"],
+            "session_status": session.status if session else None,
+            "file_count": entry["file_count"],
+            "extracted_count": len(session.extracted_invoices) if session else 0,
+            "duplicate_count": len(session.duplicates) if session else 0,
+            "reconciliation_summary": summary,
+            "timings": session.timings.to_dict() if session else None,
+            "error": entry["error"],
+            "started_at": entry["started_at"],
+            "finished_at": entry["finished_at"]
+        })
+    
+    finished = status_counts.get("completed", 0) + status_counts.get("error", 0)
+    if finished < len(entries):
+        status = "running" if finished or status_counts.get("queued", 0) < len(entries) else "queued"
+    else:
+        status = "completed" if not status_counts.get("error") else "completed_with_errors"
+    
+    return {
+        "batch_id": batch["batch_id"],
+        "status": status,
+        "created_at": batch["created_at"],
+        "progress": int(sum(entry["progress"] for entry in entries) / len(entries)) if entries else 100,
+        "entry_count": len(entries),
+        "status_counts": status_counts,
+        "summary": _combined_summary(summaries),
+        "entries": entries,
+        "extraction_cache": {**get_extraction_cache().stats, "entries": len(get_extraction_cache())},
+        "rate_limiter": get_gemini_rate_limiter().get_stats()
+    }
+
+
+@router.post("/jobs")
+async def create_batch_job(manifest: Dict):
+    """
+    Queue extraction and GSTR2B reconciliation for many client-months at once
+    
+    Body: {"entries": [{"client_name", "month", "gstr2b_file", "documents_dir"}]}
+    with paths relative to the upload directory; documents_dir defaults to
+    client_name/month as created by the upload endpoint. Entries run on a
+    shared worker pool taking clients in turn, so one large client does not
+    delay the rest.
+    """
+    raw_entries = manifest.get("entries")
+    if not isinstance(raw_entries, list) or not raw_entries:
+        raise HTTPException(status_code=400, detail="Manifest must contain a non-empty 'entries' list")
+    
+    try:
+        entries = [_manifest_entry(index, raw) for index, raw in enumerate(raw_entries)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    batch_id = str(uuid.uuid4())
+    batch = {
+        "batch_id": batch_id,
+        "created_at": datetime.now().isoformat(),
+        "entries": entries
+    }
+    batch_jobs[batch_id] = batch
+    print(f"[BATCH] Created batch {batch_id} with {len(entries)} entries", file=sys.stderr)
+    
+    scheduler = get_batch_scheduler()
+    for entry in entries:
+        scheduler.submit(entry["client_name"], lambda entry=entry: _run_entry(entry))
+    
+    return {
+        "status": "queued",
+        "batch_id": batch_id,
+        "entry_count": len(entries),
+        "concurrency": scheduler.concurrency
+    }
+
+
+@router.get("/jobs/{batch_id}")
+async def get_batch_job(batch_id: str):
+    """Consolidated status of a batch job"""
+    if batch_id not in batch_jobs:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return _batch_status(batch_jobs[batch_id])
+
+
+@router.get("/jobs/{batch_id}/report")
+async def download_batch_report(batch_id: str, format: str = "parquet"):
+    """
+    One combined export (invoices and reconciliation tables, as /process/export)
+    across every completed entry of a batch
+    """
+    if batch_id not in batch_jobs:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    selected = [
+        processing_jobs[entry["session_id"]]
+        for entry in batch_jobs[batch_id]["entries"]
+        if entry["status"] == "completed" and entry["session_id"] in processing_jobs
+    ]
+    if not selected:
+        raise HTTPException(status_code=409, detail="No completed entries in this batch yet")
+    
+    return await _export_response(selected, format, name=f"batch_{batch_id[:8]}")
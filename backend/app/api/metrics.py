@@ -0,0 +1,59 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from typing import Dict, List
+from app.api.processing import processing_jobs
+from app.services.stage_metrics import get_stage_metrics, format_labels, format_value
+from app.services.extraction_cache import get_extraction_cache
+from app.services.rate_limiter import get_gemini_rate_limiter
+
+router = APIRouter()
+
+# Starlette appends the charset to text/ media types
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Session statuses reported as they are; anything else (per-file progress
+# messages like "Processed bill.pdf...") counts as extracting
+SESSION_STATES = (
+    "initialized", "extracting", "extracted", "completed", "gstr2b_uploaded", "detecting_mismatches",
+    "mismatch_detection_completed", "reconciling", "reconciliation_completed", "error"
+)
+
+# Gemini rate limiter stats exported as counters
+LIMITER_COUNTERS = ("calls", "successes", "throttled", "server_errors", "retries", "circuit_waits")
+
+
+def _metric(lines: List[str], name: str, metric_type: str, help_text: str, samples: List):
+    """Append one metric family: (labels, value) samples under a HELP/TYPE header"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage timing histograms and pipeline counters in the Prometheus text format"""
+    lines = get_stage_metrics().render()
+    
+    states: Dict[str, int] = {state: 0 for state in SESSION_STATES}
+    for session in list(processing_jobs.values()):
+        state = session.status if session.status in states else "extracting"
+        states[state] += 1
+    _metric(lines, "gst_sessions", "gauge", "Processing sessions in memory, by status",
+            [({"status": state}, count) for state, count in states.items()])
+    
+    cache = get_extraction_cache()
+    _metric(lines, "gst_extraction_cache_requests_total", "counter", "Extraction cache lookups, by result",
+            [({"result": "hit"}, cache.stats["hits"]), ({"result": "miss"}, cache.stats["misses"])])
+    _metric(lines, "gst_extraction_cache_entries", "gauge", "Documents held in the extraction cache",
+            [({}, len(cache))])
+    
+    limiter = get_gemini_rate_limiter().get_stats()
+    for key in LIMITER_COUNTERS:
+        _metric(lines, f"gst_gemini_{key}_total", "counter", f"Gemini rate limiter {key.replace('_', ' ')}",
+                [({}, limiter[key])])
+    _metric(lines, "gst_gemini_in_flight", "gauge", "Gemini calls in flight", [({}, limiter["in_flight"])])
+    _metric(lines, "gst_gemini_concurrency_limit", "gauge", "Current adaptive Gemini concurrency limit",
+            [({}, limiter["concurrency_limit"])])
+    
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,23 +1,49 @@
 import os
 import json
 import sys
-from fastapi import APIRouter, HTTPException, BackgroundTasks, File, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, BackgroundTasks, File, UploadFile, Request, Query
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
 import asyncio
 from typing import List, Dict, Optional
 import uuid
 from app.services.document_processor import DocumentProcessor
 from app.services.mismatch_detector import MismatchDetector
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.invoice_record import as_records
 from app.services.excel_generator import ExcelGenerator
-from app.config import UPLOAD_DIR
+from app.services.gstr2b_validator import validate_gstr2b_data
+from app.services.duplicate_detector import get_duplicate_detector, summarize_duplicates
+from app.services.carry_forward import get_carry_forward_index
+from app.services.report_cache import ReportArtifactCache, content_version, write_chunks
+from app.services.stage_metrics import SessionTimings, session_timings, take_upload_timings, timed_stage
+from app.services.columnar_export import export_sessions, bundle_export, EXPORT_FORMATS
+from app.services.report_streams import reconciliation_records, reconciliation_rows, stream_csv, stream_ndjson, RECONCILIATION_COLUMNS
+from app.utils.file_responses import cached_file_response, etag_matches
+from app.utils.pagination import paginate, parse_fields, project, DEFAULT_PAGE_SIZE
+from app.utils.json_responses import json_response
+from app.config import UPLOAD_DIR, EXCEL_DIR, CARRY_FORWARD_DIR
 from openpyxl import load_workbook
 import tempfile
+import shutil
 
 router = APIRouter()
 
 # In-memory storage for processing jobs (in production, use a database)
 processing_jobs: Dict[str, Dict] = {}
 
+# Generated Excel reports, reused until the session's data changes
+report_cache = ReportArtifactCache(EXCEL_DIR)
+
+# Files picked up from a client's upload directory
+DOCUMENT_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.tif')
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Stateless apart from thresholds, so one instance serves every request
+mismatch_detector = MismatchDetector()
+
 class ProcessingSession:
     """Manages a processing session for documents"""
     
@@ -28,12 +54,65 @@ class ProcessingSession:
         self.status = "initialized"
         self.progress = 0
         self.extracted_invoices = []
+        self.duplicates = []
         self.gstr2b_data = None
+        # Normalized GSTR2B invoices with lookup indexes, built once per upload
+        self.gstr2b_index = None
         self.mismatch_results = None
         self.excel_data = None
         self.error = None
+        # Reconciliation match index, kept for incremental edits
+        self.reconciler = None
+        # Per-stage and per-file durations, reported with progress
+        self.timings = SessionTimings()
+        self.data_version = content_version(self.extracted_invoices, self.gstr2b_data)
+    
+    def update_data_version(self, changes: Optional[List[Dict]] = None):
+        """
+        Call after changing extracted_invoices or gstr2b_data; invalidates cached reports.
+        
+        For in-place edits pass the applied `changes`: the new version is chained
+        from the previous one instead of rehashing every invoice, and the
+        reconciliation index (already patched) is kept.
+        """
+        if changes is not None:
+            self.data_version = content_version(self.data_version, changes)
+            return
+        self.data_version = content_version(self.extracted_invoices, self.gstr2b_data)
+        self.reconciler = None
+    
+    def set_gstr2b_data(self, gstr2b_data: Dict):
+        """Attach GSTR2B data, normalizing and indexing it once for every later endpoint"""
+        self.gstr2b_data = gstr2b_data
+        self.gstr2b_index = GSTR2BIndex(gstr2b_data)
+        self.update_data_version()
+    
+    def get_gstr2b_index(self) -> Optional[GSTR2BIndex]:
+        if self.gstr2b_index is None and self.gstr2b_data:
+            self.gstr2b_index = GSTR2BIndex(self.gstr2b_data)
+        return self.gstr2b_index
+    
+    def gstr2b_invoices(self) -> List[Dict]:
+        """Normalized GSTR2B invoices that reconciliation results index into"""
+        index = self.get_gstr2b_index()
+        return index.invoices if index else []
+    
+    def expand_result(self, result: Dict) -> Dict:
+        """One reconciliation result with the invoices it references embedded"""
+        return GSTRReconciliationEngine.with_invoice_data(result, self.extracted_invoices, self.gstr2b_invoices())
+    
+    def expand_reconciliation(self, reconciliation: Dict) -> Dict:
+        return GSTRReconciliationEngine.expand_reconciliation(
+            reconciliation, self.extracted_invoices, self.gstr2b_invoices()
+        )
     
     def to_dict(self):
+        mismatch_results = self.mismatch_results
+        if mismatch_results and "reconciliation" in mismatch_results:
+            mismatch_results = {
+                **mismatch_results,
+                "reconciliation": self.expand_reconciliation(mismatch_results["reconciliation"])
+            }
         return {
             "session_id": self.session_id,
             "client_name": self.client_name,
@@ -41,11 +120,83 @@ class ProcessingSession:
             "status": self.status,
             "progress": self.progress,
             "extracted_invoices": self.extracted_invoices,
+            "duplicates": self.duplicates,
             "gstr2b_data": self.gstr2b_data,
-            "mismatch_results": self.mismatch_results,
+            "mismatch_results": mismatch_results,
             "excel_data": self.excel_data,
             "error": self.error
         }
+    
+    def summary_dict(self) -> Dict:
+        """Counts and result summaries only, without invoice or GSTR2B rows"""
+        results = self.mismatch_results or {}
+        report_card = results.get("report_card")
+        return {
+            "session_id": self.session_id,
+            "client_name": self.client_name,
+            "month": self.month,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "invoice_count": len(self.extracted_invoices),
+            "duplicate_count": len(self.duplicates),
+            "gstr2b_invoice_count": len(self.gstr2b_index.invoices) if self.get_gstr2b_index() else 0,
+            "excel_ready": bool(self.excel_data),
+            "data_version": self.data_version,
+            "analysis_summary": results["analysis"]["summary"] if "analysis" in results else None,
+            "report_card_summary": report_card["summary"] if report_card else None,
+            "reconciliation_summary": results["reconciliation"]["summary"] if "reconciliation" in results else None
+        }
+
+
+def _report_source(session: ProcessingSession):
+    """
+    Return (report_type, filename, chunks_fn) for the session's current
+    Excel report; chunks_fn() yields the workbook bytes incrementally.
+    May rerun a stale mismatch analysis, so call it off the event loop.
+    """
+    generator = ExcelGenerator()
+    
+    if session.mismatch_results and session.mismatch_results.get("analysis_stale"):
+        _refresh_analysis(session)
+    
+    if session.mismatch_results and "analysis" in session.mismatch_results:
+        analysis = session.mismatch_results["analysis"]
+        return "mismatch_report", "mismatch_report.xlsx", lambda: generator.stream_mismatch_report(analysis)
+    
+    invoices = session.extracted_invoices
+    return "invoices", "invoices.xlsx", lambda: generator.stream_invoice_sheet(invoices)
+
+
+def _refresh_analysis(session: ProcessingSession):
+    """Rerun mismatch analysis left stale by incremental invoice edits"""
+    while True:
+        version = session.data_version
+        analysis = mismatch_detector.detect_mismatches(session.extracted_invoices, session.get_gstr2b_index())
+        # Runs in a worker thread; an edit landing meanwhile means another pass
+        if session.data_version == version:
+            break
+    session.mismatch_results = {
+        **session.mismatch_results,
+        "analysis": analysis,
+        "report_card": mismatch_detector.generate_report_card(analysis),
+        "analysis_stale": False
+    }
+
+
+def _report_artifact(session: ProcessingSession):
+    """
+    Return (path, filename, etag) for the session's current Excel report,
+    generating it only if this data version has not been written yet.
+    """
+    report_type, filename, chunks_fn = _report_source(session)
+    
+    def build(tmp_path):
+        with timed_stage("excel_build", timings=session.timings):
+            write_chunks(tmp_path, chunks_fn())
+    
+    path = report_cache.get_or_create(session.session_id, report_type, session.data_version, build)
+    return path, filename, f"{report_type}-{session.data_version}"
 
 
 def _parse_gstr2b_excel(file_path: str) -> Dict:
@@ -127,6 +278,18 @@ def _parse_gstr2b_excel(file_path: str) -> Dict:
         return {"invoices": []}
 
 
+def _document_paths(directory: str) -> List[str]:
+    """Document files (PDF, images) under a directory, including nested subdirectories"""
+    file_paths = []
+    for root, dirs, files in os.walk(directory):
+        for f in files:
+            if f.lower().endswith(DOCUMENT_EXTENSIONS):
+                file_path = os.path.join(root, f)
+                file_paths.append(file_path)
+                print(f"[PROCESS] Found file: {file_path}", file=sys.stderr)
+    return file_paths
+
+
 @router.post("/process")
 async def process_documents(client_name: str, month: str, background_tasks: BackgroundTasks):
     """
@@ -150,15 +313,10 @@ async def process_documents(client_name: str, month: str, background_tasks: Back
             print(f"[PROCESS] ERROR: Directory not found: {client_path}", file=sys.stderr)
             raise HTTPException(status_code=400, detail="Upload directory not found")
         
-        # Get all files in the directory (including nested subdirectories)
-        file_paths = []
-        for root, dirs, files in os.walk(client_path):
-            for f in files:
-                # Only include document files (PDF, images, etc.)
-                if f.lower().endswith(('.pdf', '.png', '.jpg', '.jpeg', '.jpg', '.tiff', '.tif')):
-                    file_path = os.path.join(root, f)
-                    file_paths.append(file_path)
-                    print(f"[PROCESS] Found file: {file_path}", file=sys.stderr)
+        file_paths = _document_paths(client_path)
+        uploaded = take_upload_timings(client_path)
+        if uploaded is not None:
+            session.timings.merge(uploaded)
         
         all_items = os.listdir(client_path)
         print(f"[PROCESS] Items in directory: {all_items}", file=sys.stderr)
@@ -212,22 +370,29 @@ async def process_documents_background(session_id: str, file_paths: List[str]):
             print(f"[BACKGROUND] Progress update: {new_progress}% - {progress_data['status']}", file=sys.stderr)
         
         print(f"[BACKGROUND] Starting document processing...", file=sys.stderr)
-        result = await processor.process_documents(file_paths, progress_callback)
+        with session_timings(session.timings):
+            result = await processor.process_documents(
+                file_paths, progress_callback, duplicate_detector=get_duplicate_detector(session.client_name)
+            )
         
         print(f"[BACKGROUND] Processing complete. Extracted {len(result.get('invoices', []))} invoices", file=sys.stderr)
         
         session.extracted_invoices = result.get("invoices", [])
+        session.duplicates = result.get("duplicates", [])
+        session.update_data_version()
+        if session.duplicates:
+            print(f"[BACKGROUND] Linked {len(session.duplicates)} duplicate document(s)", file=sys.stderr)
         session.progress = 80
         session.status = "extracted"
         print(f"[BACKGROUND] Status set to 'extracted', progress: 80%", file=sys.stderr)
         
         # Generate initial Excel
         print(f"[BACKGROUND] Generating Excel report...", file=sys.stderr)
-        generator = ExcelGenerator()
-        excel_data, filename = generator.generate_invoice_sheet(session.extracted_invoices)
+        # In a worker thread so batch entries sharing the loop keep running
+        report_path, filename, _ = await asyncio.to_thread(_report_artifact, session)
         session.excel_data = {
             "filename": filename,
-            "size": len(excel_data),
+            "size": os.path.getsize(report_path),
             "data_preview": [inv for inv in session.extracted_invoices[:5]]  # First 5 for preview
         }
         
@@ -245,8 +410,11 @@ async def process_documents_background(session_id: str, file_paths: List[str]):
 
 
 @router.get("/progress/{session_id}")
-async def get_progress(session_id: str):
-    """Get processing progress for a session"""
+async def get_progress(session_id: str, files: bool = False):
+    """
+    Get processing progress for a session, with time spent per pipeline
+    stage so far (files=true adds the per-file breakdown)
+    """
     if session_id not in processing_jobs:
         print(f"[PROGRESS] Session not found: {session_id}", file=sys.stderr)
         raise HTTPException(status_code=404, detail="Session not found")
@@ -257,7 +425,9 @@ async def get_progress(session_id: str):
         "status": session.status,
         "progress": session.progress,
         "extracted_count": len(session.extracted_invoices),
-        "error": session.error
+        "duplicate_count": len(session.duplicates),
+        "error": session.error,
+        "timings": session.timings.to_dict(include_files=files)
     }
     print(f"[PROGRESS] Returning progress for {session_id}: {progress_data}", file=sys.stderr)
     return progress_data
@@ -287,24 +457,13 @@ async def upload_gstr2b(session_id: str, file: UploadFile = File(...)):
             tmp_file_path = tmp_file.name
         
         try:
-            gstr2b_data = _parse_gstr2b_excel(tmp_file_path)
-            
-            if not gstr2b_data or "invoices" not in gstr2b_data:
-                raise HTTPException(status_code=400, detail="Invalid Excel format. Please ensure it contains invoice data.")
-            
-            # Add period from session if not in parsed data
-            if not gstr2b_data.get("period"):
-                gstr2b_data["period"] = session.month
-            
-            # Validate GSTR2B data
-            processor = DocumentProcessor()
-            validation_result = await processor.validate_gstr2b_data(gstr2b_data)
+            with timed_stage("gstr2b_parse", timings=session.timings):
+                gstr2b_data = _parse_gstr2b_excel(tmp_file_path)
             
-            if not validation_result["valid"]:
-                raise HTTPException(status_code=400, detail=validation_result["message"])
-            
-            session.gstr2b_data = gstr2b_data
-            session.status = "gstr2b_uploaded"
+            try:
+                _attach_gstr2b(session, gstr2b_data)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
             return {
                 "status": "success",
@@ -323,6 +482,36 @@ async def upload_gstr2b(session_id: str, file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error processing Excel file: {str(e)}")
 
 
+def _attach_gstr2b(session: ProcessingSession, gstr2b_data: Optional[Dict]):
+    """Validate parsed GSTR2B data and attach it to a session; ValueError if unusable"""
+    if not gstr2b_data or "invoices" not in gstr2b_data:
+        raise ValueError("Invalid GSTR2B format. Please ensure it contains invoice data.")
+    
+    # Add period from session if not in parsed data
+    if not gstr2b_data.get("period"):
+        gstr2b_data["period"] = session.month
+    
+    # Validate GSTR2B data
+    validation_result = validate_gstr2b_data(gstr2b_data)
+    
+    if not validation_result["valid"]:
+        raise ValueError(validation_result["message"])
+    
+    session.set_gstr2b_data(gstr2b_data)
+    session.status = "gstr2b_uploaded"
+
+
+def _load_gstr2b_file(file_path: str) -> Dict:
+    """GSTR2B data from an Excel export or a portal JSON file on disk"""
+    if file_path.lower().endswith(".json"):
+        with timed_stage("gstr2b_parse"), open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if file_path.lower().endswith((".xlsx", ".xls")):
+        with timed_stage("gstr2b_parse"):
+            return _parse_gstr2b_excel(file_path)
+    raise ValueError("GSTR2B file must be Excel (.xlsx, .xls) or JSON")
+
+
 @router.get("/govt-api/gstr2b")
 async def fetch_gstr2b_from_govt(gstin: str, period: str):
     """
@@ -354,7 +543,7 @@ async def fetch_gstr2b_from_govt(gstin: str, period: str):
 
 
 @router.post("/detect-mismatches/{session_id}")
-async def detect_mismatches(session_id: str):
+async def detect_mismatches(session_id: str, request: Request):
     """
     Run mismatch detection between extracted invoices and GSTR2B
     """
@@ -373,41 +562,39 @@ async def detect_mismatches(session_id: str):
         session.status = "detecting_mismatches"
         session.progress = 0
         
-        # Initialize detector
-        detector = MismatchDetector()
-        
-        # Detect mismatches
-        mismatch_results = detector.detect_mismatches(
+        # Detect mismatches against the session's prebuilt GSTR2B index,
+        # in a worker thread like every other full pass over the invoices
+        mismatch_results = await asyncio.to_thread(
+            mismatch_detector.detect_mismatches,
             session.extracted_invoices,
-            session.gstr2b_data
+            session.get_gstr2b_index()
         )
         
         # Generate report card
-        report_card = detector.generate_report_card(mismatch_results)
+        report_card = mismatch_detector.generate_report_card(mismatch_results)
         
         session.mismatch_results = {
             "analysis": mismatch_results,
             "report_card": report_card
         }
         
-        # Generate final Excel with highlighted mismatches
-        generator = ExcelGenerator()
-        excel_data, filename = generator.generate_mismatch_report_sheet(mismatch_results)
+        # Generate final Excel with highlighted mismatches (kept on disk for downloads)
+        report_path, filename, _ = await asyncio.to_thread(_report_artifact, session)
         
         session.excel_data = {
             "filename": filename,
-            "size": len(excel_data),
+            "size": os.path.getsize(report_path),
             "type": "mismatch_report"
         }
         
         session.status = "mismatch_detection_completed"
         session.progress = 100
         
-        return {
+        return json_response(request, {
             "status": "success",
             "session_id": session_id,
             "report_card": report_card
-        }
+        })
     
     except Exception as e:
         session.status = "error"
@@ -415,8 +602,42 @@ async def detect_mismatches(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _with_carry_forward(session: ProcessingSession, reconciliation: Dict) -> Dict:
+    """Match this period's unmatched invoices against the client's other periods"""
+    return get_carry_forward_index(session.client_name, CARRY_FORWARD_DIR).apply(
+        session.month, reconciliation, session.extracted_invoices, session.gstr2b_invoices()
+    )
+
+
+async def _reconcile_session(session: ProcessingSession) -> Dict:
+    """Reconcile a session's invoices against its GSTR2B data and store the result"""
+    session.status = "reconciling"
+    session.progress = 0
+    
+    # Perform reconciliation, keeping the match index for later edits.
+    # Off the event loop: large builds fan out to worker processes and
+    # wait on them, and the carry-forward pass reads and writes its file
+    with timed_stage("reconcile", timings=session.timings):
+        session.reconciler = await asyncio.to_thread(
+            mismatch_detector.build_reconciler,
+            session.extracted_invoices,
+            session.get_gstr2b_index()
+        )
+        reconciliation_result = await asyncio.to_thread(
+            _with_carry_forward, session, session.reconciler.result()
+        )
+    
+    session.mismatch_results = {
+        "reconciliation": reconciliation_result
+    }
+    
+    session.status = "reconciliation_completed"
+    session.progress = 100
+    return reconciliation_result
+
+
 @router.post("/reconcile-gstr2b/{session_id}")
-async def reconcile_gstr2b(session_id: str):
+async def reconcile_gstr2b(session_id: str, request: Request):
     """
     Perform GSTR-2B reconciliation using MVP logic.
     Returns comprehensive reconciliation results with status, probable reasons, and actions.
@@ -433,30 +654,13 @@ async def reconcile_gstr2b(session_id: str):
         raise HTTPException(status_code=400, detail="GSTR2B data not uploaded")
     
     try:
-        session.status = "reconciling"
-        session.progress = 0
-        
-        # Initialize detector with reconciliation engine
-        detector = MismatchDetector()
-        
-        # Perform reconciliation
-        reconciliation_result = detector.reconcile(
-            session.extracted_invoices,
-            session.gstr2b_data
-        )
-        
-        session.mismatch_results = {
-            "reconciliation": reconciliation_result
-        }
-        
-        session.status = "reconciliation_completed"
-        session.progress = 100
+        reconciliation_result = await _reconcile_session(session)
         
-        return {
+        return json_response(request, {
             "status": "success",
             "session_id": session_id,
-            "reconciliation": reconciliation_result
-        }
+            "reconciliation": session.expand_reconciliation(reconciliation_result)
+        })
     
     except Exception as e:
         session.status = "error"
@@ -465,19 +669,112 @@ async def reconcile_gstr2b(session_id: str):
         raise HTTPException(status_code=500, detail=f"Reconciliation failed: {str(e)}")
 
 
+def _status_filter(status: Optional[str]):
+    """Predicate for a comma-separated status filter, e.g. "Value Mismatch,Missing in Books" """
+    statuses = set(parse_fields(status) or [])
+    return (lambda item: item.get("status") in statuses) if statuses else None
+
+
 @router.get("/session/{session_id}")
-async def get_session_data(session_id: str):
-    """Get complete session data including all processing results"""
+async def get_session_data(session_id: str, request: Request, view: str = "full", fields: Optional[str] = None):
+    """
+    Get session data.
+    
+    view=summary returns counts and result summaries only; fields selects
+    top-level keys of the full view (e.g. fields=status,progress,mismatch_results).
+    Use /session/{id}/invoices and /session/{id}/reconciliation to page through rows.
+    """
+    if session_id not in processing_jobs:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = processing_jobs[session_id]
+    
+    if view == "summary":
+        return json_response(request, session.summary_dict())
+    if view != "full":
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+    
+    return json_response(request, project(session.to_dict(), parse_fields(fields)))
+
+
+@router.get("/session/{session_id}/invoices")
+async def list_session_invoices(
+    session_id: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """
+    Page through extracted invoices.
+    Each item carries its "index" (the position the patch API takes);
+    fields projects invoice keys and status filters by extraction status.
+    """
     if session_id not in processing_jobs:
         raise HTTPException(status_code=404, detail="Session not found")
     
     session = processing_jobs[session_id]
-    return session.to_dict()
+    
+    try:
+        page = paginate(session.extracted_invoices, cursor, limit, _status_filter(status), parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return json_response(request, page)
+
+
+@router.get("/session/{session_id}/reconciliation")
+async def list_reconciliation_results(
+    session_id: str,
+    request: Request,
+    source: str = "books",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """
+    Page through GSTR2B reconciliation rows.
+    source=books pages the books results, source=gstr2b the GSTR2B invoices
+    missing from books; status filters by result status, e.g. status=Value Mismatch.
+    Each item's "index" is the invoice the row belongs to: the books invoice
+    position the patch API takes, or for source=gstr2b the GSTR2B invoice position.
+    """
+    if session_id not in processing_jobs:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = processing_jobs[session_id]
+    reconciliation = (session.mismatch_results or {}).get("reconciliation")
+    
+    if not reconciliation:
+        raise HTTPException(status_code=400, detail="Reconciliation not run yet")
+    
+    lists = {"books": ("books_reconciliation", "books_index"), "gstr2b": ("gstr2b_unmatched", "gstr2b_index")}
+    if source not in lists:
+        raise HTTPException(status_code=400, detail="source must be 'books' or 'gstr2b'")
+    
+    try:
+        results, index_key = lists[source]
+        page = paginate(
+            reconciliation[results], cursor, limit, _status_filter(status), parse_fields(fields),
+            transform=session.expand_result, index_key=index_key
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page["summary"] = reconciliation["summary"]
+    return json_response(request, page)
 
 
 @router.get("/download-excel/{session_id}")
-async def download_excel(session_id: str):
-    """Download the generated Excel file"""
+async def download_excel(session_id: str, request: Request):
+    """
+    Download the generated Excel file.
+    Served from the report cache with ETag and Range support. If the current
+    data version has not been written yet, the workbook is streamed to the
+    client as it is generated and stored in the cache on completion.
+    """
     if session_id not in processing_jobs:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -487,26 +784,70 @@ async def download_excel(session_id: str):
         raise HTTPException(status_code=400, detail="Excel file not generated yet")
     
     try:
-        # Regenerate Excel on download
-        generator = ExcelGenerator()
+        # A stale analysis is rerun in full first, so keep it off the event loop
+        report_type, filename, chunks_fn = await asyncio.to_thread(_report_source, session)
+        version = session.data_version
+        etag = f"{report_type}-{version}"
         
-        if session.mismatch_results:
-            excel_data, filename = generator.generate_mismatch_report_sheet(
-                session.mismatch_results["analysis"]
-            )
-        else:
-            excel_data, filename = generator.generate_invoice_sheet(session.extracted_invoices)
+        report_path = report_cache.get(session_id, report_type, version)
+        if report_path:
+            return cached_file_response(request, report_path, XLSX_MEDIA_TYPE, filename, etag)
+        
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": "private, no-cache",
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
         
         return StreamingResponse(
-            iter([excel_data]),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            report_cache.stream_and_store(session_id, report_type, version, chunks_fn()),
+            media_type=XLSX_MEDIA_TYPE,
+            headers=headers
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/download-reconciliation/{session_id}")
+async def download_reconciliation(session_id: str, format: str = "csv"):
+    """
+    Stream GSTR2B reconciliation results row by row as CSV or NDJSON.
+    Suited to very large reconciliations where building a workbook is
+    unnecessary; rows are read straight from the reconciliation results.
+    """
+    if session_id not in processing_jobs:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = processing_jobs[session_id]
+    reconciliation = (session.mismatch_results or {}).get("reconciliation")
+    
+    if not reconciliation:
+        raise HTTPException(status_code=400, detail="Reconciliation not run yet")
+    
+    if format == "csv":
+        body = stream_csv(
+            reconciliation_rows(reconciliation, session.extracted_invoices, session.gstr2b_invoices()),
+            RECONCILIATION_COLUMNS
+        )
+        media_type, extension = "text/csv", "csv"
+    elif format == "ndjson":
+        body = stream_ndjson(
+            reconciliation_records(reconciliation, session.extracted_invoices, session.gstr2b_invoices())
+        )
+        media_type, extension = "application/x-ndjson", "ndjson"
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported format. Use csv or ndjson")
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=reconciliation_{session_id}.{extension}"}
+    )
+
+
 @router.post("/update-excel/{session_id}")
 async def update_excel(session_id: str, updates: Dict):
     """
@@ -521,19 +862,20 @@ async def update_excel(session_id: str, updates: Dict):
     try:
         # Apply updates to extracted invoices or GSTR2B data
         if "invoices" in updates:
-            session.extracted_invoices = updates["invoices"]
+            session.extracted_invoices = as_records(updates["invoices"])
+            session.duplicates = summarize_duplicates(session.extracted_invoices)
+            session.update_data_version()
         
         # Regenerate mismatch detection if needed
         if session.gstr2b_data and session.extracted_invoices:
-            detector = MismatchDetector()
-            mismatch_results = detector.detect_mismatches(
+            mismatch_results = mismatch_detector.detect_mismatches(
                 session.extracted_invoices,
-                session.gstr2b_data
+                session.get_gstr2b_index()
             )
             
             session.mismatch_results = {
                 "analysis": mismatch_results,
-                "report_card": detector.generate_report_card(mismatch_results)
+                "report_card": mismatch_detector.generate_report_card(mismatch_results)
             }
         
         return {
@@ -546,6 +888,186 @@ async def update_excel(session_id: str, updates: Dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _carry_forward_rows(session: ProcessingSession, changed: Dict, previous: Dict, annotated: Dict) -> Dict:
+    """
+    Changed result rows of an edit, taken from the carry-forward annotated
+    reconciliation. Rows whose carry-forward match moved because of the edit
+    (another invoice now closes the item) count as changed too.
+    """
+    rows = {"summary": annotated["summary"]}
+    for side, index_field in (("books_reconciliation", "books_index"), ("gstr2b_unmatched", "gstr2b_index")):
+        current = {result[index_field]: result for result in annotated.get(side, [])}
+        indexes = {row["index"] for row in changed[side]}
+        
+        # Only annotated results can differ beyond the rows the edit touched
+        before = {result[index_field]: result for result in previous.get(side, []) if "carry_forward" in result}
+        after = {index: result for index, result in current.items() if "carry_forward" in result}
+        indexes.update(index for index in before.keys() | after.keys() if before.get(index) != after.get(index))
+        
+        rows[side] = [
+            {"index": index, "result": session.expand_result(current[index]) if index in current else None}
+            for index in sorted(indexes)
+        ]
+    return rows
+
+
+@router.patch("/invoices/{session_id}")
+async def patch_invoices(session_id: str, payload: Dict, request: Request):
+    """
+    Apply per-invoice field edits, e.g.
+    {"changes": [{"index": 3, "fields": {"supplier_gstin": "27AAPCT1234H1Z0"}}]}
+    
+    When GSTR2B data is loaded, only the books/GSTR2B pairs sharing the edited
+    invoices' old or new match key are recomputed, and the response carries
+    just the changed result rows plus the updated summary, with the same
+    carry-forward annotations as the stored reconciliation once the period
+    has been reconciled. Any stored mismatch analysis is marked stale and
+    rebuilt when the report is next downloaded.
+    """
+    if session_id not in processing_jobs:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    session = processing_jobs[session_id]
+    changes = payload.get("changes")
+    
+    if not isinstance(changes, list) or not changes:
+        raise HTTPException(status_code=400, detail="'changes' must be a non-empty list")
+    
+    try:
+        reconciliation = None
+        
+        if session.gstr2b_data:
+            with timed_stage("reconcile", timings=session.timings):
+                if session.reconciler is None:
+                    # Off the event loop, as in _reconcile_session
+                    session.reconciler = await asyncio.to_thread(
+                        mismatch_detector.build_reconciler,
+                        session.extracted_invoices,
+                        session.get_gstr2b_index()
+                    )
+                reconciliation = session.reconciler.apply_changes(changes)
+                mismatch_results = dict(session.mismatch_results or {})
+                previous = mismatch_results.get("reconciliation")
+                # The client's carry-forward index only ever holds periods
+                # that were reconciled; an edit to a period that never was
+                # leaves both the index and the stored results alone
+                if previous is not None:
+                    annotated = await asyncio.to_thread(
+                        _with_carry_forward, session, session.reconciler.result()
+                    )
+            if previous is not None:
+                reconciliation = _carry_forward_rows(session, reconciliation, previous, annotated)
+                mismatch_results["reconciliation"] = annotated
+            else:
+                for side in ("books_reconciliation", "gstr2b_unmatched"):
+                    for row in reconciliation[side]:
+                        if row["result"] is not None:
+                            row["result"] = session.expand_result(row["result"])
+            
+            if "analysis" in mismatch_results:
+                mismatch_results["analysis_stale"] = True
+            session.mismatch_results = mismatch_results
+        else:
+            for change in changes:
+                index = change.get("index")
+                if not isinstance(index, int) or not 0 <= index < len(session.extracted_invoices):
+                    raise ValueError(f"Invalid invoice index: {index}")
+                if not isinstance(change.get("fields"), dict):
+                    raise ValueError(f"Invoice {index}: 'fields' must be an object")
+            for change in changes:
+                session.extracted_invoices[change["index"]].update(change["fields"])
+        
+        session.duplicates = summarize_duplicates(session.extracted_invoices)
+        session.update_data_version(changes)
+        
+        edited = sorted({change["index"] for change in changes})
+        return json_response(request, {
+            "status": "success",
+            "session_id": session_id,
+            "invoices": [{"index": index, "invoice": session.extracted_invoices[index]} for index in edited],
+            "reconciliation": reconciliation
+        })
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_columnar(
+    format: str = "parquet",
+    client_name: Optional[List[str]] = Query(None),
+    month: Optional[List[str]] = Query(None)
+):
+    """
+    Export extracted invoices and GSTR2B reconciliation results as typed
+    columnar tables (Parquet, Arrow IPC or CSV) for analytics loading.
+    Covers every matching session (filter by client_name and/or month, both
+    repeatable) in one pass and returns a zip with invoices and
+    reconciliation tables. Sessions with GSTR2B data but no stored
+    reconciliation are reconciled on the fly.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    selected = [
+        session for session in processing_jobs.values()
+        if (not client_name or session.client_name in client_name) and (not month or session.month in month)
+    ]
+    if not selected:
+        raise HTTPException(status_code=404, detail="No sessions match the export filters")
+    
+    return await _export_response(selected, format)
+
+
+async def _export_response(selected: List[ProcessingSession], format: str, name: str = "gst_export") -> FileResponse:
+    """Zip of columnar invoice and reconciliation tables across sessions"""
+    def export_rows():
+        for session in selected:
+            reconciliation = (session.mismatch_results or {}).get("reconciliation")
+            if reconciliation is None and session.gstr2b_data and session.extracted_invoices:
+                reconciliation = mismatch_detector.reconcile(session.extracted_invoices, session.get_gstr2b_index())
+            yield {
+                "client_name": session.client_name,
+                "month": session.month,
+                "session_id": session.session_id,
+                "invoices": session.extracted_invoices,
+                "gstr2b_invoices": session.gstr2b_invoices(),
+                "reconciliation": reconciliation
+            }
+    
+    export_dir = tempfile.mkdtemp(prefix="gst_export_")
+    try:
+        export = await asyncio.to_thread(export_sessions, export_rows(), export_dir, format)
+        archive_path = bundle_export(export, os.path.join(export_dir, f"{name}_{format}.zip"))
+    except Exception as e:
+        shutil.rmtree(export_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return FileResponse(
+        archive_path,
+        media_type="application/zip",
+        filename=os.path.basename(archive_path),
+        background=BackgroundTask(shutil.rmtree, export_dir, ignore_errors=True)
+    )
+
+
+@router.get("/carry-forward/{client_name}")
+async def get_carry_forward(client_name: str, request: Request):
+    """
+    Open unmatched invoices of a client across reconciled periods: books
+    invoices still missing in GSTR-2B and GSTR-2B entries still missing in
+    books. Each new period's reconciliation matches against and closes these.
+    """
+    open_items = get_carry_forward_index(client_name, CARRY_FORWARD_DIR).open_items()
+    return json_response(request, {
+        "client_name": client_name,
+        "open_counts": {side: len(items) for side, items in open_items.items()},
+        "open_items": open_items
+    })
+
+
 @router.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete a processing session"""
@@ -553,6 +1075,7 @@ async def delete_session(session_id: str):
         raise HTTPException(status_code=404, detail="Session not found")
     
     del processing_jobs[session_id]
+    report_cache.invalidate(session_id)
     
     return {
         "status": "success",
@@ -3,6 +3,7 @@ import sys
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from typing import List
 from app.config import UPLOAD_DIR
+from app.services.stage_metrics import get_stage_metrics, timed_stage, upload_timings
 
 router = APIRouter()
 
@@ -37,6 +38,9 @@ async def upload_invoices(
         print(f"[UPLOAD] Directory created successfully", file=sys.stderr)
 
         saved_files = []
+        # Picked up by the session that later processes this directory
+        timings = upload_timings(client_path)
+        metrics = get_stage_metrics()
 
         for file in files:
             # Normalize path (Windows safety)
@@ -52,7 +56,7 @@ async def upload_invoices(
             content = await file.read()
             print(f"[UPLOAD] Read {len(content)} bytes from {file.filename}", file=sys.stderr)
 
-            with open(file_path, "wb") as f:
+            with timed_stage("upload_write", os.path.basename(relative_path), timings=timings), open(file_path, "wb") as f:
                 bytes_written = f.write(content)
                 print(f"[UPLOAD] Wrote {bytes_written} bytes to {file_path}", file=sys.stderr)
 
@@ -64,6 +68,9 @@ async def upload_invoices(
             file_size = os.path.getsize(file_path)
             print(f"[UPLOAD] File verified on disk: {file_path} ({file_size} bytes)", file=sys.stderr)
 
+            metrics.increment("gst_uploaded_files_total", help_text="Documents written by /upload")
+            metrics.increment("gst_upload_bytes_total", len(content), help_text="Bytes written by /upload")
+
             saved_files.append({
                 "filename": file.filename,
                 "size": len(content),
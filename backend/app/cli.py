@@ -0,0 +1,281 @@
+"""
+Headless batch run of the whole pipeline over a directory tree.
+
+    cd backend
+    python -m app.cli app/data/uploads --output runs/2026_01 --workers 4
+
+The tree is laid out like the upload directory, root/<client>/<month>/,
+holding the bills (PDF/images, nested folders allowed) and optionally the
+month's GSTR-2B as a file named gstr2b*.xlsx / .xls / .json. For every
+client-month it extracts invoices, parses the GSTR-2B, reconciles (with
+cross-period carry-forward) and writes invoices.xlsx and reconciliation.csv
+under output/<client>/<month>/, then a run_summary.json with per-stage
+timings for every client-month.
+
+Clients run in parallel on a process pool, each client's months in order so
+carry-forward sees the periods as they happened. Extractions are kept in an
+on-disk cache (output/.extraction_cache unless --cache-dir is given), so a
+rerun after a crash or a fix only calls Gemini for documents it has not
+finished.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+GSTR2B_EXTENSIONS = (".xlsx", ".xls", ".json")
+
+
+def _gstr2b_file(month_dir: str) -> Optional[str]:
+    """The month's GSTR-2B export: a top-level gstr2b*/gstr-2b* Excel or JSON file"""
+    for name in sorted(os.listdir(month_dir)):
+        lowered = name.lower().replace("-", "").replace("_", "")
+        path = os.path.join(month_dir, name)
+        if lowered.startswith("gstr2b") and lowered.endswith(GSTR2B_EXTENSIONS) and os.path.isfile(path):
+            return path
+    return None
+
+
+def _document_count(month_dir: str) -> int:
+    from app.api.processing import DOCUMENT_EXTENSIONS
+    return sum(
+        1 for _, _, files in os.walk(month_dir)
+        for name in files if name.lower().endswith(DOCUMENT_EXTENSIONS)
+    )
+
+
+def discover_jobs(root: str, clients: Optional[List[str]] = None, months: Optional[List[str]] = None) -> List[Dict]:
+    """Client -> months to run, one entry per client with its months in period order"""
+    jobs = []
+    for client_name in sorted(os.listdir(root)):
+        client_dir = os.path.join(root, client_name)
+        if not os.path.isdir(client_dir) or client_name.startswith(".") or (clients and client_name not in clients):
+            continue
+        client_months = []
+        for month in sorted(os.listdir(client_dir)):
+            month_dir = os.path.join(client_dir, month)
+            if not os.path.isdir(month_dir) or month.startswith(".") or (months and month not in months):
+                continue
+            client_months.append({
+                "month": month,
+                "documents_dir": month_dir,
+                "gstr2b_file": _gstr2b_file(month_dir),
+                "document_count": _document_count(month_dir)
+            })
+        if client_months:
+            jobs.append({"client_name": client_name, "months": client_months})
+    return jobs
+
+
+def run_client(job: Dict, output_dir: str) -> List[Dict]:
+    """Run every month of one client in order; one run summary entry per month"""
+    return asyncio.run(_run_client(job, output_dir))
+
+
+async def _run_client(job: Dict, output_dir: str) -> List[Dict]:
+    results = []
+    for month_job in job["months"]:
+        results.append(await _run_month(job["client_name"], month_job, output_dir))
+    return results
+
+
+async def _run_month(client_name: str, job: Dict, output_dir: str) -> Dict:
+    """Extract, reconcile and write reports for one client-month"""
+    from app.api.processing import (
+        ProcessingSession, _document_paths, _load_gstr2b_file, _attach_gstr2b, _reconcile_session
+    )
+    from app.services.document_processor import DocumentProcessor
+    from app.services.duplicate_detector import get_duplicate_detector
+    from app.services.excel_generator import ExcelGenerator
+    from app.services.extraction_cache import get_extraction_cache
+    from app.services.report_streams import reconciliation_rows, stream_csv, RECONCILIATION_COLUMNS
+    from app.services.report_cache import write_chunks
+    from app.services.stage_metrics import session_timings, timed_stage
+    from pathlib import Path
+    
+    month = job["month"]
+    report_dir = os.path.join(output_dir, client_name, month)
+    timings: Dict[str, float] = {}
+    cache = get_extraction_cache()
+    cache_before = dict(cache.stats)
+    summary = {
+        "client_name": client_name,
+        "month": month,
+        "documents_dir": job["documents_dir"],
+        "gstr2b_file": job["gstr2b_file"],
+        "status": "running",
+        "error": None,
+        "timings": timings,
+        "reports": {}
+    }
+    print(f"[CLI] {client_name} {month}: starting", file=sys.stderr)
+    started = time.perf_counter()
+    session = ProcessingSession(str(uuid.uuid4()), client_name, month)
+    
+    try:
+        stage = time.perf_counter()
+        file_paths = _document_paths(job["documents_dir"])
+        with session_timings(session.timings):
+            result = await DocumentProcessor().process_documents(
+                file_paths, duplicate_detector=get_duplicate_detector(client_name)
+            )
+        session.extracted_invoices = result.get("invoices", [])
+        session.duplicates = result.get("duplicates", [])
+        session.update_data_version()
+        timings["extraction"] = time.perf_counter() - stage
+        summary["file_count"] = len(file_paths)
+        summary["extracted_count"] = len(session.extracted_invoices)
+        summary["duplicate_count"] = len(session.duplicates)
+        # Failed or unreadable documents, left for manual review
+        summary["needs_review"] = sum(
+            1 for inv in session.extracted_invoices if inv.get("status") in ("error", "pending_review")
+        )
+        
+        if job["gstr2b_file"]:
+            stage = time.perf_counter()
+            with session_timings(session.timings):
+                _attach_gstr2b(session, _load_gstr2b_file(job["gstr2b_file"]))
+            timings["gstr2b_parse"] = time.perf_counter() - stage
+            
+            stage = time.perf_counter()
+            reconciliation = await _reconcile_session(session)
+            timings["reconciliation"] = time.perf_counter() - stage
+            summary["reconciliation_summary"] = reconciliation["summary"]
+        
+        stage = time.perf_counter()
+        os.makedirs(report_dir, exist_ok=True)
+        invoices_path = os.path.join(report_dir, "invoices.xlsx")
+        with timed_stage("excel_build", timings=session.timings):
+            write_chunks(Path(invoices_path), ExcelGenerator().stream_invoice_sheet(session.extracted_invoices))
+        summary["reports"]["invoices"] = invoices_path
+        if session.mismatch_results:
+            reconciliation_path = os.path.join(report_dir, "reconciliation.csv")
+            write_chunks(Path(reconciliation_path), stream_csv(
+                reconciliation_rows(
+                    session.mismatch_results["reconciliation"],
+                    session.extracted_invoices,
+                    session.gstr2b_invoices()
+                ),
+                RECONCILIATION_COLUMNS
+            ))
+            summary["reports"]["reconciliation"] = reconciliation_path
+        timings["reports"] = time.perf_counter() - stage
+        
+        summary["status"] = "completed" if job["gstr2b_file"] else "extracted"
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = str(e)
+        print(f"[CLI] {client_name} {month}: ✗ {str(e)}", file=sys.stderr)
+    
+    timings["total"] = time.perf_counter() - started
+    for stage_name in timings:
+        timings[stage_name] = round(timings[stage_name], 3)
+    # Where the time went inside the stages above, summed over files
+    summary["pipeline_stages"] = session.timings.to_dict()["stages"]
+    summary["extraction_cache"] = {
+        key: cache.stats[key] - cache_before.get(key, 0) for key in ("hits", "misses", "disk_hits")
+    }
+    print(f"[CLI] {client_name} {month}: {summary['status']} in {timings['total']:.1f}s", file=sys.stderr)
+    return summary
+
+
+def _run_summary(results: List[Dict], args, started_at: str, wall_seconds: float) -> Dict:
+    statuses: Dict[str, int] = {}
+    stage_seconds: Dict[str, float] = {}
+    pipeline_stage_seconds: Dict[str, float] = {}
+    totals = {"files": 0, "invoices": 0, "duplicates": 0, "needs_review": 0, "matched": 0, "missing_in_gstr2b": 0, "missing_in_books": 0}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        for stage, seconds in result["timings"].items():
+            stage_seconds[stage] = round(stage_seconds.get(stage, 0.0) + seconds, 3)
+        for stage, stage_totals in result.get("pipeline_stages", {}).items():
+            pipeline_stage_seconds[stage] = round(pipeline_stage_seconds.get(stage, 0.0) + stage_totals["seconds"], 3)
+        totals["files"] += result.get("file_count", 0)
+        totals["invoices"] += result.get("extracted_count", 0)
+        totals["duplicates"] += result.get("duplicate_count", 0)
+        totals["needs_review"] += result.get("needs_review", 0)
+        reconciliation = result.get("reconciliation_summary") or {}
+        for key in ("matched", "missing_in_gstr2b", "missing_in_books"):
+            totals[key] += reconciliation.get(key, 0)
+    
+    return {
+        "started_at": started_at,
+        "finished_at": datetime.now().isoformat(),
+        "root": os.path.abspath(args.root),
+        "output": os.path.abspath(args.output),
+        "workers": args.workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "client_months": len(results),
+        "status_counts": statuses,
+        "totals": totals,
+        "stage_seconds": stage_seconds,
+        "pipeline_stage_seconds": pipeline_stage_seconds,
+        "results": results
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run extraction, GSTR-2B reconciliation and reports over root/<client>/<month>/")
+    parser.add_argument("root", help="Directory tree of clients and months (e.g. app/data/uploads)")
+    parser.add_argument("--output", required=True, help="Directory for reports and run_summary.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Clients processed in parallel (processes)")
+    parser.add_argument("--client", action="append", help="Only this client (repeatable)")
+    parser.add_argument("--month", action="append", help="Only this month (repeatable)")
+    parser.add_argument("--cache-dir", default=None, help="On-disk extraction cache; defaults to OUTPUT/.extraction_cache")
+    args = parser.parse_args(argv)
+    
+    if not os.path.isdir(args.root):
+        parser.error(f"Not a directory: {args.root}")
+    os.makedirs(args.output, exist_ok=True)
+    # Read by the extraction cache on import, here and in every worker
+    os.environ["EXTRACTION_CACHE_DIR"] = os.path.abspath(args.cache_dir or os.path.join(args.output, ".extraction_cache"))
+    
+    jobs = discover_jobs(args.root, args.client, args.month)
+    if not jobs:
+        print(f"[CLI] No client/month directories under {args.root}", file=sys.stderr)
+        return 1
+    # Largest clients first so one big client does not start last and trail the run
+    jobs.sort(key=lambda job: -sum(month["document_count"] for month in job["months"]))
+    args.workers = max(1, min(args.workers, len(jobs)))
+    print(f"[CLI] {sum(len(job['months']) for job in jobs)} client-months across {len(jobs)} clients, {args.workers} worker(s)", file=sys.stderr)
+    
+    started_at = datetime.now().isoformat()
+    started = time.perf_counter()
+    results: List[Dict] = []
+    if args.workers == 1:
+        for job in jobs:
+            results.extend(run_client(job, args.output))
+    else:
+        # Spawned, not forked: workers start without the parent's threads and event loop
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(run_client, job, args.output): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    print(f"[CLI] {job['client_name']}: worker failed: {str(e)}", file=sys.stderr)
+                    results.extend(
+                        {"client_name": job["client_name"], "month": month["month"], "status": "error", "error": str(e), "timings": {}}
+                        for month in job["months"]
+                    )
+    
+    results.sort(key=lambda result: (result["client_name"], result["month"]))
+    run_summary = _run_summary(results, args, started_at, time.perf_counter() - started)
+    summary_path = os.path.join(args.output, "run_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(run_summary, f, ensure_ascii=False, indent=2, default=str)
+    
+    print(f"[CLI] Wrote {summary_path}: {run_summary['status_counts']} in {run_summary['wall_seconds']:.1f}s", file=sys.stderr)
+    return 1 if run_summary["status_counts"].get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
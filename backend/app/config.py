@@ -9,11 +9,15 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent
 
 # 🔹 Directories
-UPLOAD_DIR = BASE_DIR / "data" / "uploads"
-EXCEL_DIR = BASE_DIR / "data" / "excel"
+# All can point elsewhere, e.g. a scratch directory for load tests
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR") or BASE_DIR / "data" / "uploads")
+EXCEL_DIR = Path(os.getenv("EXCEL_DIR") or BASE_DIR / "data" / "excel")
+# Per-client carry-forward indexes, kept across sessions and restarts
+CARRY_FORWARD_DIR = Path(os.getenv("CARRY_FORWARD_DIR") or BASE_DIR / "data" / "carry_forward")
 
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 EXCEL_DIR.mkdir(parents=True, exist_ok=True)
+CARRY_FORWARD_DIR.mkdir(parents=True, exist_ok=True)
 
 # 🔹 Gemini API Key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
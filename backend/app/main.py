@@ -3,6 +3,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.upload import router as upload_router
 from app.api.processing import router as processing_router
+from app.api.batch import router as batch_router
+from app.api.metrics import router as metrics_router
 
 
 app = FastAPI(title="AI GST Document Processing API")
@@ -24,6 +26,8 @@ app.add_middleware(
 
 app.include_router(upload_router, prefix="/upload")
 app.include_router(processing_router, prefix="/process")
+app.include_router(batch_router, prefix="/batch")
+app.include_router(metrics_router)
 
 @app.get("/")
 def health_check():
@@ -0,0 +1,160 @@
+import os
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+# Connected components with more candidate pairs than this keep the greedy
+# pairing instead of going to the solver, which bounds the time spent on
+# one pathological partition (e.g. a supplier reusing one invoice number).
+# Solve time grows faster than linearly; 20k pairs is about 2 s at worst.
+ASSIGNMENT_MAX_EDGES = int(os.getenv("ASSIGNMENT_MAX_EDGES", "20000"))
+
+# Candidate graph: row -> [(column, weight)], rows in priority order
+Candidates = Dict[Hashable, List[Tuple[Hashable, float]]]
+
+
+def greedy_assignment(candidates: Candidates) -> Dict:
+    """
+    First-come matching: rows in order, each taking its best still-free
+    column (the earliest listed on ties). This is what the matchers did
+    before the assignment stage, so it is the baseline reported against.
+    """
+    used = set()
+    pairs = {}
+    for row, edges in candidates.items():
+        best = None
+        for column, weight in edges:
+            if column not in used and (best is None or weight > best[1]):
+                best = (column, weight)
+        if best is not None:
+            used.add(best[0])
+            pairs[row] = best[0]
+    return pairs
+
+
+def assign(
+    candidates: Candidates,
+    baseline: Optional[Dict] = None,
+    max_edges: int = ASSIGNMENT_MAX_EDGES
+) -> Dict:
+    """
+    Maximum-weight one-to-one matching over a sparse candidate graph.
+    
+    The graph is split into connected components and each is solved on its
+    own with scipy's sparse Jonker-Volgenant solver (LAPJVsp). A component
+    keeps the baseline pairing (greedy_assignment unless given) unless the
+    optimum is strictly better, so results only move where first-come
+    matching actually lost quality. Components over max_edges candidate
+    pairs keep the baseline.
+    
+    Args:
+        candidates: row -> [(column, weight)]; weights must be positive
+        baseline: row -> column pairing to compare against and fall back to
+    
+    Returns:
+        {"pairs": {row: column}, "score": total weight, "greedy_score":
+        total weight of the baseline, "reassigned": rows paired differently
+        from the baseline, "oversized_components": components left greedy}
+    """
+    if baseline is None:
+        baseline = greedy_assignment(candidates)
+    weights = {(row, column): weight for row, edges in candidates.items() for column, weight in edges}
+    
+    pairs = {}
+    score = greedy_score = 0.0
+    oversized = 0
+    for rows, columns, edge_count in _components(candidates):
+        component_baseline = {row: baseline[row] for row in rows if row in baseline}
+        baseline_score = sum(weights[row, column] for row, column in component_baseline.items())
+        greedy_score += baseline_score
+        
+        chosen, chosen_score = component_baseline, baseline_score
+        if len(rows) == 1:
+            # One row: its best edge is optimal
+            row = rows[0]
+            column, weight = max(candidates[row], key=lambda edge: edge[1])
+            if weight > baseline_score + 1e-9:
+                chosen, chosen_score = {row: column}, weight
+        elif edge_count > max_edges:
+            oversized += 1
+        else:
+            optimal = _solve(rows, columns, candidates)
+            optimal_score = sum(weights[row, column] for row, column in optimal.items())
+            if optimal_score > baseline_score + 1e-9:
+                chosen, chosen_score = optimal, optimal_score
+        
+        pairs.update(chosen)
+        score += chosen_score
+    
+    return {
+        "pairs": pairs,
+        "score": score,
+        "greedy_score": greedy_score,
+        "reassigned": sum(1 for row, column in pairs.items() if baseline.get(row) != column)
+        + sum(1 for row in baseline if row not in pairs),
+        "oversized_components": oversized
+    }
+
+
+def _components(candidates: Candidates) -> List[Tuple[List, List, int]]:
+    """(rows, columns, edge count) per connected component, rows in priority order"""
+    parent: Dict[Tuple[int, Hashable], Tuple[int, Hashable]] = {}
+    
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+    
+    for row, edges in candidates.items():
+        row_root = find((0, row))
+        for column, _ in edges:
+            column_root = find((1, column))
+            if column_root != row_root:
+                parent[column_root] = row_root
+    
+    components: Dict[Tuple[int, Hashable], Tuple[List, List, List[int]]] = {}
+    for row, edges in candidates.items():
+        if edges:
+            component = components.setdefault(find((0, row)), ([], [], [0]))
+            component[0].append(row)
+            component[2][0] += len(edges)
+    for node in parent:
+        if node[0] == 1:
+            components[find(node)][1].append(node[1])
+    return [(rows, columns, count[0]) for rows, columns, count in components.values()]
+
+
+def _solve(rows: List, columns: List, candidates: Candidates) -> Dict:
+    """
+    Maximum-weight matching of one component. Every row also gets a private
+    dummy column standing for "unmatched", which turns it into the full
+    rectangular assignment LAPJVsp solves; costs are offset so every real
+    edge stays positive (scipy treats stored zeros as missing edges).
+    """
+    column_ids = {column: i for i, column in enumerate(columns)}
+    offset = 1.0 + max(weight for row in rows for _, weight in candidates[row])
+    
+    data, indices, indptr = [], [], [0]
+    for i, row in enumerate(rows):
+        for column, weight in candidates[row]:
+            data.append(offset - weight)
+            indices.append(column_ids[column])
+        data.append(offset)
+        indices.append(len(columns) + i)
+        indptr.append(len(data))
+    
+    matrix = csr_matrix(
+        (np.asarray(data), np.asarray(indices), np.asarray(indptr)),
+        shape=(len(rows), len(columns) + len(rows))
+    )
+    row_ind, col_ind = min_weight_full_bipartite_matching(matrix)
+    return {
+        rows[i]: columns[j]
+        for i, j in zip(row_ind.tolist(), col_ind.tolist())
+        if j < len(columns)
+    }
@@ -0,0 +1,94 @@
+import os
+import sys
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+# Entries of batch jobs running at once across all batches. Each entry is a
+# full extract -> reconcile pipeline run as a task on the app's event loop;
+# they overlap only because every blocking step inside one (OCR, GSTR2B
+# parsing, reconciler build, Excel build) runs in a worker thread. OCR
+# parallelism is capped separately by OCR_WORKERS and the Gemini calls by
+# the shared rate limiter, so this mainly bounds memory and queued work.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+class FairScheduler:
+    """
+    Runs queued jobs on a fixed pool of asyncio workers, taking clients in
+    turn: each free worker picks the next job of the next client in
+    round-robin order, so a firm submitting fifty client-months does not
+    hold up the one after it until all fifty are done.
+    """
+    
+    def __init__(self, concurrency: int = BATCH_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        # client -> jobs waiting, oldest first
+        self._queues: Dict[str, Deque[Callable[[], Awaitable]]] = {}
+        # Clients with waiting jobs, in the order they get their next turn
+        self._turns: Deque[str] = deque()
+        self.running: Dict[str, int] = {}
+        self._available: Optional[asyncio.Semaphore] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def submit(self, client: str, job: Callable[[], Awaitable]):
+        """Queue a coroutine function for a client; must be called from the event loop"""
+        self._ensure_workers()
+        queue = self._queues.get(client)
+        if queue is None:
+            queue = self._queues[client] = deque()
+            self._turns.append(client)
+        queue.append(job)
+        self._available.release()
+    
+    def pending(self) -> Dict[str, int]:
+        """Waiting jobs per client"""
+        return {client: len(queue) for client, queue in self._queues.items()}
+    
+    def _ensure_workers(self):
+        # Workers are tied to the loop that started them; a new loop (e.g.
+        # a test client per test) gets a fresh pool that also picks up jobs
+        # left queued on the old one
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._available = asyncio.Semaphore(sum(len(queue) for queue in self._queues.values()))
+        self.running = {}
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+    
+    def _next(self):
+        client = self._turns.popleft()
+        queue = self._queues[client]
+        job = queue.popleft()
+        if queue:
+            self._turns.append(client)
+        else:
+            del self._queues[client]
+        return client, job
+    
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            client, job = self._next()
+            self.running[client] = self.running.get(client, 0) + 1
+            try:
+                await job()
+            except Exception as e:
+                print(f"[BATCH] Job for {client} failed: {str(e)}", file=sys.stderr)
+            finally:
+                self.running[client] -= 1
+                if not self.running[client]:
+                    del self.running[client]
+
+
+_scheduler: Optional[FairScheduler] = None
+
+
+def get_batch_scheduler() -> FairScheduler:
+    """Return the process-wide batch scheduler, creating it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler()
+    return _scheduler
@@ -0,0 +1,274 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+
+# Invoices left unmatched in one period often match in another: a bill
+# booked in January shows up in February's GSTR-2B when the supplier files
+# late, or a GSTR-2B entry is booked by the client a month after. Each
+# client keeps an index of its open unmatched invoices from every
+# reconciled period, keyed like the primary match (supplier_gstin,
+# invoice_no, document_type), which later periods look up and close.
+
+MatchKey = Tuple[str, str, str]
+
+# Side an open item came from, and the side it can be closed by
+BOOKS, GSTR2B = "books", "gstr2b"
+_OTHER_SIDE = {BOOKS: GSTR2B, GSTR2B: BOOKS}
+
+# Invoice fields kept with an item, as shown in reconciliation results
+INVOICE_FIELDS = (
+    "invoice_number", "invoice_date", "supplier_gstin", "document_type", "taxable_value",
+    "cgst", "sgst", "igst", "total_amount", "gstr2b_section", "itc_eligibility"
+)
+
+
+class CarryForwardIndex:
+    """
+    Unmatched invoices of one client across periods, persisted as one JSON file.
+    
+    Items stay in the index once closed, tagged with the period that closed
+    them, so reconciling a period again first undoes what its previous run
+    opened and closed and the result does not depend on how often a month
+    was re-run.
+    """
+    
+    def __init__(self, client_name: str, path: Path):
+        self.client_name = client_name
+        self.path = path
+        self._lock = threading.Lock()
+        # side -> match key -> items, oldest first
+        self._items: Dict[str, Dict[MatchKey, List[Dict]]] = {BOOKS: {}, GSTR2B: {}}
+        # period -> items it opened / closed
+        self._opened_in: Dict[str, List[Dict]] = {}
+        self._closed_in: Dict[str, List[Dict]] = {}
+        self.open_count = 0
+        self._dirty = False
+        self._load()
+    
+    def apply(
+        self,
+        month: str,
+        reconciliation: Dict,
+        books_invoices: List[Dict],
+        gstr2b_invoices: List[Dict]
+    ) -> Dict:
+        """
+        Match one period's unmatched results against open items from other
+        periods, then record what is still open.
+        
+        Books invoices missing in GSTR-2B are looked up among GSTR-2B
+        entries left over from other periods and vice versa; a hit closes
+        the item and the result gets a carry_forward block naming the
+        period it matched. Returns a copy of the reconciliation with those
+        results annotated and summary["carry_forward"] added.
+        """
+        with self._lock:
+            self._dirty = False
+            previous, reopened = self._reset_period(month)
+            stats = {"matched_books": 0, "matched_gstr2b": 0, "opened": 0}
+            
+            books_results = []
+            for result in reconciliation.get("books_reconciliation", []):
+                if result.get("status") == "Missing in GSTR-2B":
+                    invoice = books_invoices[result["books_index"]]
+                    result = self._carry(month, BOOKS, invoice, result, stats, previous, reopened)
+                books_results.append(result)
+            
+            gstr2b_results = [
+                self._carry(month, GSTR2B, gstr2b_invoices[result["gstr2b_index"]], result, stats, previous, reopened)
+                for result in reconciliation.get("gstr2b_unmatched", [])
+            ]
+            
+            # Left over from the previous run: dropped, or no longer closed here
+            if any(previous.values()) or any(item["closed_in"] is None for item in reopened.values()):
+                self._dirty = True
+            stats["open_items"] = self.open_count
+            # Re-running an unchanged period (every incremental edit does)
+            # leaves the index as it was; only real changes are written
+            if self._dirty:
+                self._save()
+        
+        return {
+            **reconciliation,
+            "summary": {**reconciliation.get("summary", {}), "carry_forward": stats},
+            "books_reconciliation": books_results,
+            "gstr2b_unmatched": gstr2b_results
+        }
+    
+    def open_items(self) -> Dict[str, List[Dict]]:
+        """Open items per side, oldest period first"""
+        with self._lock:
+            return {
+                side: [item for items in by_key.values() for item in items if item["closed_in"] is None]
+                for side, by_key in self._items.items()
+            }
+    
+    def _carry(
+        self,
+        month: str,
+        side: str,
+        invoice: Dict,
+        result: Dict,
+        stats: Dict,
+        previous: Dict[Tuple[str, MatchKey], List[Dict]],
+        reopened: Dict[int, Dict]
+    ) -> Dict:
+        """Close a matching item from another period, or open one for this invoice"""
+        key = GSTRReconciliationEngine.match_key(invoice)
+        candidates = previous.get((side, key)) or []
+        
+        # Opened by an earlier run of this period and since closed by another
+        for position, item in enumerate(candidates):
+            if item["closed_in"] is not None:
+                del candidates[position]
+                self._update_invoice(item, invoice)
+                self._add(item)
+                return {**result, "carry_forward": {"closed_in": item["closed_in"]}}
+        
+        for item in self._items[_OTHER_SIDE[side]].get(key, ()):
+            if item["closed_in"] is None and item["month"] != month:
+                item["closed_in"] = month
+                self._closed_in.setdefault(month, []).append(item)
+                self.open_count -= 1
+                if id(item) not in reopened:
+                    self._dirty = True
+                stats["matched_books" if side == BOOKS else "matched_gstr2b"] += 1
+                return self._annotate(result, side, item)
+        
+        if candidates:
+            item = candidates.pop(0)
+            self._update_invoice(item, invoice)
+        else:
+            item = {
+                "side": side,
+                "key": list(key),
+                "month": month,
+                "invoice": self._invoice_fields(invoice),
+                "opened_at": datetime.now().isoformat(),
+                "closed_in": None
+            }
+            self._dirty = True
+        self._add(item)
+        stats["opened"] += 1
+        return result
+    
+    @staticmethod
+    def _invoice_fields(invoice: Dict) -> Dict:
+        return {field: invoice.get(field) for field in INVOICE_FIELDS}
+    
+    def _update_invoice(self, item: Dict, invoice: Dict):
+        fields = self._invoice_fields(invoice)
+        if fields != item["invoice"]:
+            item["invoice"] = fields
+            self._dirty = True
+    
+    @staticmethod
+    def _annotate(result: Dict, side: str, item: Dict) -> Dict:
+        if side == BOOKS:
+            probable_reason = f"Reported in GSTR-2B for period {item['month']}"
+            action_required = f"Verify ITC was claimed against the {item['month']} GSTR-2B"
+        else:
+            probable_reason = f"Recorded in books for period {item['month']}; supplier filed late"
+            action_required = "Claim ITC in this period"
+        return {
+            **result,
+            "probable_reason": probable_reason,
+            "action_required": action_required,
+            "carry_forward": {
+                "matched_period": item["month"],
+                "matched_side": item["side"],
+                "invoice": item["invoice"]
+            }
+        }
+    
+    def _reset_period(self, month: str) -> Tuple[Dict[Tuple[str, MatchKey], List[Dict]], Dict[int, Dict]]:
+        """
+        Undo a previous run of this period. Items it opened are taken out of
+        the index and returned by (side, key), to be put back as they are if
+        the invoice is still unmatched, so an item another period has since
+        closed stays closed. Items it closed are reopened and returned by id.
+        """
+        previous: Dict[Tuple[str, MatchKey], List[Dict]] = {}
+        for item in self._opened_in.pop(month, []):
+            previous.setdefault((item["side"], tuple(item["key"])), []).append(item)
+            if item["closed_in"] is not None:
+                self._closed_in[item["closed_in"]] = [
+                    other for other in self._closed_in[item["closed_in"]] if other is not item
+                ]
+            else:
+                self.open_count -= 1
+        for side, key in previous:
+            items = [item for item in self._items[side][key] if item["month"] != month]
+            if items:
+                self._items[side][key] = items
+            else:
+                del self._items[side][key]
+        
+        reopened = {}
+        for item in self._closed_in.pop(month, []):
+            item["closed_in"] = None
+            self.open_count += 1
+            reopened[id(item)] = item
+        return previous, reopened
+    
+    def _add(self, item: Dict):
+        self._items[item["side"]].setdefault(tuple(item["key"]), []).append(item)
+        self._opened_in.setdefault(item["month"], []).append(item)
+        if item["closed_in"] is not None:
+            self._closed_in.setdefault(item["closed_in"], []).append(item)
+        else:
+            self.open_count += 1
+    
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[CARRY_FORWARD] Could not read {self.path}: {str(e)}", file=sys.stderr)
+            return
+        for item in data.get("items", []):
+            self._add(item)
+    
+    def _save(self):
+        data = {
+            "client_name": self.client_name,
+            "updated_at": datetime.now().isoformat(),
+            "items": [item for by_key in self._items.values() for items in by_key.values() for item in items]
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so a crash never leaves a truncated index
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # dumps, unlike dump, runs on the C encoder
+            f.write(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp_path, self.path)
+
+
+_indexes: Dict[Path, CarryForwardIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def carry_forward_path(client_name: str, directory: Path) -> Path:
+    """Index file for a client; the name is made filesystem-safe and kept unique by a hash suffix"""
+    safe_name = re.sub(r"[^A-Za-z0-9_-]+", "_", client_name).strip("_")[:64] or "client"
+    suffix = hashlib.sha256(client_name.encode("utf-8")).hexdigest()[:8]
+    return directory / f"{safe_name}_{suffix}.json"
+
+
+def get_carry_forward_index(client_name: str, directory: Path) -> CarryForwardIndex:
+    """Return the process-wide index of a client, loading it from disk on first use"""
+    path = carry_forward_path(client_name, Path(directory))
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = CarryForwardIndex(client_name, path)
+        return index
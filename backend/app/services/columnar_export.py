@@ -0,0 +1,286 @@
+import os
+import sys
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.utils.dates import date_ordinal, ordinal_date
+
+# Typed columnar exports of extracted invoices and reconciliation results
+# for loading into an analytics warehouse without re-parsing Excel reports.
+# Every row carries client_name / month / session_id, so many sessions can be
+# written into one file per table in a single pass.
+
+EXPORT_FORMATS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "csv": ".csv"
+}
+
+AMOUNT_FIELDS = ["taxable_value", "cgst", "sgst", "igst", "total_amount"]
+TAX_DIFFERENCE_FIELDS = ["taxable_value", "cgst", "sgst", "igst"]
+
+SESSION_FIELDS = [
+    pa.field("client_name", pa.string()),
+    pa.field("month", pa.string()),
+    pa.field("session_id", pa.string())
+]
+
+INVOICE_SCHEMA = pa.schema(SESSION_FIELDS + [
+    pa.field("file", pa.string()),
+    pa.field("supplier_gstin", pa.string()),
+    pa.field("invoice_number", pa.string()),
+    pa.field("invoice_date", pa.date32()),
+    pa.field("invoice_date_raw", pa.string()),
+    pa.field("document_type", pa.string()),
+    *[pa.field(name, pa.float64()) for name in AMOUNT_FIELDS],
+    pa.field("expense_category", pa.string()),
+    pa.field("itc_eligibility", pa.bool_()),
+    pa.field("gstr2b_section", pa.string()),
+    pa.field("status", pa.string()),
+    pa.field("error", pa.string()),
+    pa.field("page_start", pa.int32()),
+    pa.field("page_end", pa.int32()),
+    pa.field("duplicate_of", pa.string())
+])
+
+RECONCILIATION_SCHEMA = pa.schema(SESSION_FIELDS + [
+    pa.field("source", pa.string()),
+    pa.field("status", pa.string()),
+    pa.field("supplier_gstin", pa.string()),
+    pa.field("books_invoice_number", pa.string()),
+    pa.field("gstr2b_invoice_number", pa.string()),
+    pa.field("books_invoice_date", pa.date32()),
+    pa.field("gstr2b_invoice_date", pa.date32()),
+    *[pa.field(f"{side}_{name}", pa.float64()) for name in AMOUNT_FIELDS for side in ("books", "gstr2b")],
+    pa.field("amount_mismatch", pa.bool_()),
+    *[pa.field(f"{name}_difference", pa.float64()) for name in TAX_DIFFERENCE_FIELDS],
+    pa.field("taxable_value_difference_percent", pa.float64()),
+    pa.field("tax_structure_mismatch", pa.bool_()),
+    pa.field("books_tax_structure", pa.string()),
+    pa.field("gstr2b_tax_structure", pa.string()),
+    pa.field("date_mismatch", pa.bool_()),
+    pa.field("date_difference_days", pa.int32()),
+    pa.field("invoice_number_similarity", pa.float64()),
+    pa.field("probable_reason", pa.string()),
+    pa.field("action_required", pa.string())
+])
+
+
+def _to_float(value) -> Optional[float]:
+    return GSTRReconciliationEngine._get_numeric(value)
+
+
+def _to_date(value):
+    return ordinal_date(date_ordinal(value))
+
+
+def _to_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "yes", "eligible", "y"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "no", "ineligible", "n"):
+        return False
+    return None
+
+
+def _to_str(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+def invoice_rows(invoices: List[Dict], session_info: Dict) -> List[Dict]:
+    """Typed INVOICE_SCHEMA rows for one session's extracted invoices"""
+    rows = []
+    for inv in invoices:
+        row = {
+            **session_info,
+            "file": _to_str(inv.get("file")),
+            "supplier_gstin": _to_str(inv.get("supplier_gstin")),
+            "invoice_number": _to_str(inv.get("invoice_number")),
+            "invoice_date": _to_date(inv.get("invoice_date")),
+            "invoice_date_raw": _to_str(inv.get("invoice_date")),
+            "document_type": _to_str(inv.get("document_type")),
+            "expense_category": _to_str(inv.get("expense_category")),
+            "itc_eligibility": _to_bool(inv.get("itc_eligibility")),
+            "gstr2b_section": _to_str(inv.get("gstr2b_section")),
+            "status": _to_str(inv.get("status")),
+            "error": _to_str(inv.get("error")),
+            "page_start": _to_int(inv.get("page_start")),
+            "page_end": _to_int(inv.get("page_end")),
+            "duplicate_of": _to_str(inv.get("duplicate_of"))
+        }
+        for name in AMOUNT_FIELDS:
+            row[name] = _to_float(inv.get(name))
+        rows.append(row)
+    return rows
+
+
+def reconciliation_table_rows(
+    reconciliation: Dict,
+    session_info: Dict,
+    books_invoices: List[Dict],
+    gstr2b_invoices: List[Dict]
+) -> List[Dict]:
+    """
+    Typed RECONCILIATION_SCHEMA rows for one reconciliation result, with the
+    referenced invoices resolved and the nested field_differences flattened
+    into their own columns.
+    """
+    rows = []
+    results = (
+        [("books", result) for result in reconciliation.get("books_reconciliation", [])]
+        + [("gstr2b", result) for result in reconciliation.get("gstr2b_unmatched", [])]
+    )
+    
+    for source, result in results:
+        books_index = result.get("books_index")
+        gstr2b_index = result.get("gstr2b_index")
+        books = books_invoices[books_index] if books_index is not None else {}
+        gstr2b = gstr2b_invoices[gstr2b_index] if gstr2b_index is not None else {}
+        differences = result.get("field_differences") or {}
+        amount = differences.get("amount", {}).get("details", {})
+        tax_structure = differences.get("tax_structure", {})
+        date = differences.get("date", {})
+        invoice_number = differences.get("invoice_number", {})
+        
+        row = {
+            **session_info,
+            "source": source,
+            "status": result.get("status"),
+            "supplier_gstin": _to_str(result.get("supplier_gstin")),
+            "books_invoice_number": _to_str(books.get("invoice_number")),
+            "gstr2b_invoice_number": _to_str(gstr2b.get("invoice_number")),
+            "books_invoice_date": _to_date(books.get("invoice_date")),
+            "gstr2b_invoice_date": _to_date(gstr2b.get("invoice_date")),
+            "amount_mismatch": bool(amount),
+            "taxable_value_difference_percent": _to_float(amount.get("taxable_value", {}).get("difference_percent")),
+            "tax_structure_mismatch": bool(tax_structure),
+            "books_tax_structure": tax_structure.get("books_structure"),
+            "gstr2b_tax_structure": tax_structure.get("gstr2b_structure"),
+            "date_mismatch": bool(date),
+            "date_difference_days": _to_int(date.get("difference_days")),
+            "invoice_number_similarity": _to_float(invoice_number.get("similarity")),
+            "probable_reason": result.get("probable_reason"),
+            "action_required": result.get("action_required")
+        }
+        for name in AMOUNT_FIELDS:
+            row[f"books_{name}"] = _to_float(books.get(name))
+            row[f"gstr2b_{name}"] = _to_float(gstr2b.get(name))
+        for name in TAX_DIFFERENCE_FIELDS:
+            row[f"{name}_difference"] = _to_float(amount.get(name, {}).get("difference"))
+        
+        rows.append(row)
+    return rows
+
+
+class _TableWriter:
+    """Appends record batches to one output file in the chosen format"""
+    
+    def __init__(self, path: Path, schema: pa.Schema, fmt: str):
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression="zstd")
+        elif fmt == "arrow":
+            self._sink = pa.OSFile(str(path), "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+        else:
+            self._writer = pa_csv.CSVWriter(str(path), schema)
+    
+    def write(self, rows: List[Dict]):
+        if not rows:
+            return
+        self._writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=self.schema))
+        self.rows += len(rows)
+    
+    def close(self):
+        self._writer.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
+
+
+def export_sessions(sessions: Iterable[Dict], directory: Path, fmt: str = "parquet") -> Dict:
+    """
+    Write invoices and reconciliation tables for many sessions in one pass.
+    
+    Args:
+        sessions: Dicts with client_name, month, session_id, invoices and an
+            optional reconciliation result with the gstr2b_invoices it references
+        directory: Output directory
+        fmt: "parquet", "arrow" or "csv"
+    
+    Returns:
+        Paths and row counts of the written tables
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    extension = EXPORT_FORMATS[fmt]
+    
+    invoices_writer = _TableWriter(directory / f"invoices{extension}", INVOICE_SCHEMA, fmt)
+    reconciliation_writer = _TableWriter(directory / f"reconciliation{extension}", RECONCILIATION_SCHEMA, fmt)
+    session_count = 0
+    
+    try:
+        for session in sessions:
+            session_info = {
+                "client_name": session.get("client_name"),
+                "month": session.get("month"),
+                "session_id": session.get("session_id")
+            }
+            # One record batch per session and table keeps memory bounded by
+            # the largest session rather than the whole export
+            invoices_writer.write(invoice_rows(session.get("invoices") or [], session_info))
+            if session.get("reconciliation"):
+                reconciliation_writer.write(reconciliation_table_rows(
+                    session["reconciliation"],
+                    session_info,
+                    session.get("invoices") or [],
+                    session.get("gstr2b_invoices") or []
+                ))
+            session_count += 1
+    finally:
+        invoices_writer.close()
+        reconciliation_writer.close()
+    
+    print(
+        f"[EXPORT] {session_count} sessions -> {invoices_writer.rows} invoice rows, "
+        f"{reconciliation_writer.rows} reconciliation rows ({fmt})",
+        file=sys.stderr
+    )
+    
+    return {
+        "format": fmt,
+        "sessions": session_count,
+        "exported_at": datetime.now().isoformat(),
+        "tables": {
+            "invoices": {"path": str(invoices_writer.path), "rows": invoices_writer.rows},
+            "reconciliation": {"path": str(reconciliation_writer.path), "rows": reconciliation_writer.rows}
+        }
+    }
+
+
+def bundle_export(export: Dict, archive_path: Path) -> Path:
+    """Package exported tables into one zip (Parquet is stored as-is, already compressed)"""
+    compression = zipfile.ZIP_STORED if export["format"] == "parquet" else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(archive_path, "w", compression=compression) as archive:
+        for table in export["tables"].values():
+            archive.write(table["path"], os.path.basename(table["path"]))
+    return archive_path
@@ -0,0 +1,278 @@
+import re
+import sys
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_path
+from app.services.pdf_segmenter import INVOICE_NO_PATTERN
+
+# MinHash signature split into LSH bands of a few rows each. A pair lands in
+# a shared bucket with probability 1 - (1 - J^rows)^bands: about 1 - 2e-8 at
+# the lowest threshold used (J = 0.7) and under 0.05 for J <= 0.1, so only
+# likely duplicates get the exact Jaccard check.
+MINHASH_BANDS = 42
+MINHASH_ROWS = 3
+_minhash_rng = np.random.default_rng(20240601)
+# Odd multipliers and offsets of the multiply-shift hash family, one per row
+_MINHASH_A = _minhash_rng.integers(1, 2 ** 63, MINHASH_BANDS * MINHASH_ROWS, dtype=np.uint64) | np.uint64(1)
+_MINHASH_B = _minhash_rng.integers(0, 2 ** 63, MINHASH_BANDS * MINHASH_ROWS, dtype=np.uint64)
+
+
+class DuplicateDetector:
+    """
+    Detects duplicate documents of one client before extraction.
+
+    Three signals, cheapest first:
+    - exact SHA-256 of the file bytes (same file uploaded twice)
+    - perceptual dHash of the first page (same bill, re-rendered or re-scanned)
+    - word-shingle Jaccard similarity of the OCR text (email PDF vs phone photo)
+
+    Files are registered in order, so the first copy seen is the canonical one
+    and later copies are linked to it instead of being re-extracted. Texts are
+    indexed by MinHash LSH buckets, so each check only compares against the
+    few earlier files sharing a bucket instead of every earlier file.
+
+    One detector is kept per client (see get_duplicate_detector), so a bill
+    uploaded again in a later batch is linked to the copy from the earlier
+    one. Checking a path that was registered before replaces its old
+    registration: re-processing a folder never links a file to itself.
+    """
+
+    def __init__(self):
+        self.hash_distance_threshold = 6  # Hamming bits out of 64
+        self.text_similarity_threshold = 0.9
+        # Lower bar when the first pages already look alike
+        self.text_similarity_threshold_with_hash = 0.7
+        self.shingle_size = 5
+
+        self._exact_hashes: Dict[str, str] = {}
+        # SHA-256 of every file checked, also the extraction cache key
+        self.digests: Dict[str, str] = {}
+        self._perceptual_hashes: Dict[str, Optional[int]] = {}
+        self._texts: Dict[str, Dict] = {}
+        # (band, band signature) -> files registered under it, in order
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = {}
+        self._registered = 0
+        self._lock = threading.Lock()
+
+    def fingerprint(self, file_path: str) -> Tuple[str, Optional[int]]:
+        """
+        Content digest and first-page perceptual hash of a file. Reads and
+        renders without touching the detector's state, so files can be
+        fingerprinted in worker threads and registered in order afterwards.
+        """
+        return self._file_digest(file_path), self._perceptual_hash(file_path)
+
+    def check_file(self, file_path: str, fingerprint: Optional[Tuple[str, Optional[int]]] = None) -> Optional[Dict]:
+        """
+        Register a file by content hash and first-page perceptual hash.
+
+        Returns a duplicate link if the exact bytes were already seen.
+        """
+        digest, perceptual_hash = fingerprint or self.fingerprint(file_path)
+        with self._lock:
+            self._forget(file_path)
+            self.digests[file_path] = digest
+            canonical = self._exact_hashes.get(digest)
+            if canonical is not None:
+                return self._link(canonical, "exact_hash", 1.0)
+
+            self._exact_hashes[digest] = file_path
+            self._perceptual_hashes[file_path] = perceptual_hash
+            return None
+
+    def check_text(self, file_path: str, text: str) -> Optional[Dict]:
+        """
+        Compare OCR text against previously registered files.
+
+        Returns a duplicate link for the most similar earlier file above
+        threshold; otherwise registers this file's text and returns None.
+        """
+        shingles = self._shingles(text)
+        invoice_number = self._invoice_number(text)
+        bands = self._band_keys(shingles)
+        with self._lock:
+            self._forget_text(file_path)
+            return self._check_text(file_path, shingles, invoice_number, bands)
+
+    def _check_text(self, file_path: str, shingles: Set[int], invoice_number: Optional[str],
+                    bands: List[Tuple[int, bytes]]) -> Optional[Dict]:
+        own_hash = self._perceptual_hashes.get(file_path)
+        best = None
+        for other_path in self._candidates(bands):
+            other = self._texts[other_path]
+            # Two different invoice numbers means two different invoices,
+            # however similar the vendor's template is
+            if invoice_number and other["invoice_number"] and invoice_number != other["invoice_number"]:
+                continue
+
+            similarity = self._jaccard(shingles, other["shingles"])
+            hash_close = self._hashes_close(own_hash, self._perceptual_hashes.get(other_path))
+            threshold = self.text_similarity_threshold_with_hash if hash_close else self.text_similarity_threshold
+
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                method = "perceptual_hash+text_shingles" if hash_close else "text_shingles"
+                best = (other_path, similarity, method)
+
+        if best is not None:
+            return self._link(best[0], best[2], best[1])
+
+        self._texts[file_path] = {
+            "shingles": shingles, "invoice_number": invoice_number, "bands": bands, "order": self._registered
+        }
+        self._registered += 1
+        for key in bands:
+            self._buckets.setdefault(key, []).append(file_path)
+        return None
+
+    def _forget(self, file_path: str):
+        """Drop what an earlier check registered for this path"""
+        digest = self.digests.pop(file_path, None)
+        if digest is not None and self._exact_hashes.get(digest) == file_path:
+            del self._exact_hashes[digest]
+        self._perceptual_hashes.pop(file_path, None)
+        self._forget_text(file_path)
+
+    def _forget_text(self, file_path: str):
+        entry = self._texts.pop(file_path, None)
+        if entry is None:
+            return
+        for key in entry["bands"]:
+            bucket = self._buckets[key]
+            bucket.remove(file_path)
+            if not bucket:
+                del self._buckets[key]
+
+    def _candidates(self, bands: List[Tuple[int, bytes]]) -> List[str]:
+        """Earlier files sharing at least one LSH bucket, in registration order"""
+        found: Set[str] = set()
+        for key in bands:
+            found.update(self._buckets.get(key, ()))
+        return sorted(found, key=lambda path: self._texts[path]["order"])
+
+    @staticmethod
+    def _band_keys(shingles: Set[int]) -> List[Tuple[int, bytes]]:
+        """LSH bucket keys of a shingle set's MinHash signature"""
+        if not shingles:
+            return []
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # Multiply-shift hash of every shingle under every row's function (wraps mod 2^64)
+        hashed = (values[:, None] * _MINHASH_A[None, :] + _MINHASH_B[None, :]) >> np.uint64(32)
+        signature = hashed.min(axis=0).reshape(MINHASH_BANDS, MINHASH_ROWS)
+        return [(band, signature[band].tobytes()) for band in range(MINHASH_BANDS)]
+
+    @staticmethod
+    def _link(canonical_path: str, method: str, similarity: float) -> Dict:
+        return {
+            "duplicate_of": Path(canonical_path).name,
+            "duplicate_of_path": canonical_path,
+            "method": method,
+            "similarity": round(similarity, 3)
+        }
+
+    @staticmethod
+    def _file_digest(file_path: str) -> str:
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    @staticmethod
+    def _perceptual_hash(file_path: str) -> Optional[int]:
+        """64-bit difference hash of the first page, or None if it can't be rendered"""
+        try:
+            if Path(file_path).suffix.lower() == ".pdf":
+                pages = convert_from_path(file_path, dpi=50, first_page=1, last_page=1)
+                if not pages:
+                    return None
+                image = pages[0]
+            else:
+                image = Image.open(file_path)
+
+            pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+            value = 0
+            for row in range(8):
+                for col in range(8):
+                    left = pixels[row * 9 + col]
+                    right = pixels[row * 9 + col + 1]
+                    value = (value << 1) | (1 if left > right else 0)
+            return value
+        except Exception as e:
+            print(f"[DEDUP] Could not compute perceptual hash for {file_path}: {str(e)}", file=sys.stderr)
+            return None
+
+    def _hashes_close(self, hash1: Optional[int], hash2: Optional[int]) -> bool:
+        if hash1 is None or hash2 is None:
+            return False
+        return bin(hash1 ^ hash2).count("1") <= self.hash_distance_threshold
+
+    def _shingles(self, text: str) -> Set[int]:
+        tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
+        size = self.shingle_size
+        if len(tokens) < size:
+            return {_stable_hash(" ".join(tokens))} if tokens else set()
+        return {_stable_hash(" ".join(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+    @staticmethod
+    def _jaccard(set1: Set[int], set2: Set[int]) -> float:
+        if not set1 or not set2:
+            return 0.0
+        if len(set1) > len(set2):
+            set1, set2 = set2, set1
+        intersection = sum(1 for item in set1 if item in set2)
+        return intersection / (len(set1) + len(set2) - intersection)
+
+    @staticmethod
+    def _invoice_number(text: str) -> Optional[str]:
+        match = INVOICE_NO_PATTERN.search(text or "")
+        if not match:
+            return None
+        # OCR often confuses O/0 and I/1; compare on a folded form
+        return match.group(1).upper().replace("O", "0").replace("I", "1")
+
+
+def _stable_hash(shingle: str) -> int:
+    """Unsigned 64-bit shingle hash; unlike hash() it is the same in every process"""
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+_detectors: Dict[str, DuplicateDetector] = {}
+_detectors_lock = threading.Lock()
+
+
+def get_duplicate_detector(client_name: str) -> DuplicateDetector:
+    """Return the process-wide detector of a client, shared by all of its batches"""
+    with _detectors_lock:
+        detector = _detectors.get(client_name)
+        if detector is None:
+            detector = _detectors[client_name] = DuplicateDetector()
+        return detector
+
+
+def duplicate_record(file_path: str, link: Dict) -> Dict:
+    """Extraction record for a document linked to an earlier copy"""
+    return {
+        "file": Path(file_path).name,
+        "status": "duplicate",
+        "duplicate_of": link["duplicate_of"],
+        "duplicate_method": link["method"],
+        "duplicate_similarity": link["similarity"]
+    }
+
+
+def summarize_duplicates(invoices: List[Dict]) -> List[Dict]:
+    """Duplicate links in a list of extraction records, for the session view"""
+    return [
+        {
+            "file": inv.get("file"),
+            "duplicate_of": inv.get("duplicate_of"),
+            "method": inv.get("duplicate_method"),
+            "similarity": inv.get("duplicate_similarity")
+        }
+        for inv in invoices
+        if inv.get("status") == "duplicate"
+    ]
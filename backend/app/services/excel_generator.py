@@ -1,17 +1,28 @@
-from typing import Dict, List, Tuple
-import pandas as pd
+from typing import Dict, Iterator, List, Tuple
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
+from app.services.xlsx_stream import stream_xlsx
 import io
 
+INVOICE_COLUMNS = [
+    "File", "Supplier GSTIN", "Invoice No", "Invoice Date", "Document Type",
+    "Taxable Value", "CGST", "SGST", "IGST", "Total Amount",
+    "Expense Category", "ITC Eligibility", "GSTR2B Section", "Status"
+]
+
+
 class ExcelGenerator:
     """Handles generation and manipulation of Excel sheets"""
     
-    def __init__(self):
+    def __init__(self, write_only: bool = True):
         self.highlight_color = "FFFF00"  # Yellow for mismatches
         self.error_color = "FF0000"  # Red for errors
         self.match_color = "00B050"  # Green for matches
+        # Write-only workbooks stream rows to disk instead of keeping every
+        # cell in memory; set False when the workbook must be edited after writing
+        self.write_only = write_only
     
     def generate_invoice_sheet(self, invoices: List[Dict], title: str = "Extracted Invoices") -> Tuple[bytes, str]:
         """
@@ -20,45 +31,26 @@ class ExcelGenerator:
         Returns:
             Tuple of (excel_bytes, filename)
         """
-        df = self._prepare_dataframe(invoices)
-        
-        workbook = Workbook()
-        worksheet = workbook.active
-        worksheet.title = "Invoices"
-        
-        # Write headers
-        for col_num, column_title in enumerate(df.columns, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = column_title
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Write data
-        for row_num, row_data in enumerate(df.values, 2):
-            for col_num, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = value
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                cell.border = Border(
-                    left=Side(style='thin'),
-                    right=Side(style='thin'),
-                    top=Side(style='thin'),
-                    bottom=Side(style='thin')
-                )
-        
-        # Adjust column widths
-        for col_num, column_title in enumerate(df.columns, 1):
-            column_letter = get_column_letter(col_num)
-            max_length = len(str(column_title)) + 2
-            worksheet.column_dimensions[column_letter].width = min(max_length + 5, 50)
-        
-        # Save to bytes
         excel_bytes = io.BytesIO()
-        workbook.save(excel_bytes)
-        excel_bytes.seek(0)
+        filename = self.write_invoice_sheet(invoices, excel_bytes, title)
+        return excel_bytes.getvalue(), filename
+    
+    def write_invoice_sheet(self, invoices: List[Dict], output, title: str = "Extracted Invoices") -> str:
+        """
+        Write the invoice sheet to a path or binary file object
         
-        return excel_bytes.getvalue(), "invoices.xlsx"
+        Returns:
+            Suggested download filename
+        """
+        self._write_sheets(self._invoice_sheets(invoices), output)
+        return "invoices.xlsx"
+    
+    def stream_invoice_sheet(self, invoices: List[Dict]) -> Iterator[bytes]:
+        """
+        Yield the invoice sheet as .xlsx bytes while rows are still being
+        generated, so downloads start before the workbook is complete
+        """
+        return stream_xlsx(self._invoice_sheets(invoices), self._style_specs())
     
     def generate_mismatch_report_sheet(self, mismatch_data: Dict) -> Tuple[bytes, str]:
         """
@@ -67,53 +59,87 @@ class ExcelGenerator:
         Returns:
             Tuple of (excel_bytes, filename)
         """
-        workbook = Workbook()
+        excel_bytes = io.BytesIO()
+        filename = self.write_mismatch_report(mismatch_data, excel_bytes)
+        return excel_bytes.getvalue(), filename
+    
+    def write_mismatch_report(self, mismatch_data: Dict, output) -> str:
+        """
+        Write the mismatch report to a path or binary file object
         
+        Returns:
+            Suggested download filename
+        """
+        self._write_sheets(self._mismatch_report_sheets(mismatch_data), output)
+        return "mismatch_report.xlsx"
+    
+    def stream_mismatch_report(self, mismatch_data: Dict) -> Iterator[bytes]:
+        """Yield the mismatch report as .xlsx bytes while it is being generated"""
+        return stream_xlsx(self._mismatch_report_sheets(mismatch_data), self._style_specs())
+    
+    # Sheet definitions: each sheet is a dict with a title, column widths
+    # and a lazy iterator of (values, style) rows, shared by the openpyxl
+    # writer and the streaming writer
+    
+    def _invoice_sheets(self, invoices: List[Dict]) -> List[Dict]:
+        return [{
+            "title": "Invoices",
+            "widths": [min(len(column) + 7, 50) for column in INVOICE_COLUMNS],
+            "rows": self._invoice_sheet_rows(invoices)
+        }]
+    
+    def _invoice_sheet_rows(self, invoices: List[Dict]) -> Iterator[Tuple[List, str]]:
+        yield INVOICE_COLUMNS, "gst_header"
+        for row in self._invoice_rows(invoices):
+            yield row, "gst_bordered"
+    
+    def _mismatch_report_sheets(self, mismatch_data: Dict) -> List[Dict]:
         # Sheet 1: Summary
-        summary_ws = workbook.active
-        summary_ws.title = "Summary"
-        self._write_summary_sheet(summary_ws, mismatch_data)
+        sheets = [{
+            "title": "Summary",
+            "widths": [40, 20],
+            "rows": self._summary_rows(mismatch_data)
+        }]
         
         # Sheet 2: Matched Invoices
         if mismatch_data["matched_pairs"]:
-            matched_ws = workbook.create_sheet("Matched")
-            self._write_matched_sheet(matched_ws, mismatch_data["matched_pairs"])
+            sheets.append({
+                "title": "Matched",
+                "widths": [20] * 7,
+                "rows": self._matched_rows(mismatch_data["matched_pairs"])
+            })
         
         # Sheet 3: Mismatches
         if mismatch_data["mismatches"]:
-            mismatch_ws = workbook.create_sheet("Mismatches")
-            self._write_mismatches_sheet(mismatch_ws, mismatch_data["mismatches"])
+            sheets.append({
+                "title": "Mismatches",
+                "widths": [20, 15, 50],
+                "rows": self._mismatch_rows(mismatch_data["mismatches"])
+            })
         
         # Sheet 4: Unmatched Extracted
         if mismatch_data["unmatched_extracted"]:
-            unmatched_ext_ws = workbook.create_sheet("Unmatched Extracted")
-            self._write_unmatched_extracted_sheet(unmatched_ext_ws, mismatch_data["unmatched_extracted"])
+            sheets.append({
+                "title": "Unmatched Extracted",
+                "widths": [20] * 4,
+                "rows": self._unmatched_extracted_rows(mismatch_data["unmatched_extracted"])
+            })
         
         # Sheet 5: Unmatched GSTR2B
         if mismatch_data["unmatched_gstr2b"]:
-            unmatched_gstr_ws = workbook.create_sheet("Unmatched GSTR2B")
-            self._write_unmatched_gstr2b_sheet(unmatched_gstr_ws, mismatch_data["unmatched_gstr2b"])
+            sheets.append({
+                "title": "Unmatched GSTR2B",
+                "widths": [20] * 5,
+                "rows": self._unmatched_gstr2b_rows(mismatch_data["unmatched_gstr2b"])
+            })
         
-        # Save to bytes
-        excel_bytes = io.BytesIO()
-        workbook.save(excel_bytes)
-        excel_bytes.seek(0)
-        
-        return excel_bytes.getvalue(), "mismatch_report.xlsx"
+        return sheets
     
-    def _write_summary_sheet(self, worksheet, mismatch_data: Dict):
-        """Write summary information to worksheet"""
+    def _summary_rows(self, mismatch_data: Dict) -> Iterator[Tuple[List, object]]:
+        """Summary information rows"""
         summary = mismatch_data["summary"]
         
-        worksheet.column_dimensions["A"].width = 40
-        worksheet.column_dimensions["B"].width = 20
-        
-        headers = ["Metric", "Value"]
-        for col_num, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        yield ["Metric", "Value"], "gst_header"
         
         data = [
             ["Total Invoices Extracted", summary["total_extracted"]],
@@ -125,90 +151,47 @@ class ExcelGenerator:
             ["Match Rate (%)", round((summary["matched"] / summary["total_extracted"] * 100) if summary["total_extracted"] > 0 else 0, 2)]
         ]
         
-        for row_num, row_data in enumerate(data, 2):
-            for col_num, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = value
-                if col_num == 2:
-                    cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal="left", vertical="center")
+        for row_data in data:
+            yield row_data, ["gst_label", "gst_value"]
     
-    def _write_matched_sheet(self, worksheet, matched_pairs: List[Dict]):
-        """Write matched invoices to worksheet"""
-        headers = ["Invoice #", "Date", "GSTIN", "Extracted Amount", "GSTR2B Amount", "Match Score", "Issues"]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    def _matched_rows(self, matched_pairs: List[Dict]) -> Iterator[Tuple[List, str]]:
+        """Matched invoice rows"""
+        yield ["Invoice #", "Date", "GSTIN", "Extracted Amount", "GSTR2B Amount", "Match Score", "Issues"], "gst_header"
         
-        for row_num, pair in enumerate(matched_pairs, 2):
+        for pair in matched_pairs:
             ext = pair["extracted"]
             gstr = pair["gstr2b"]
             
             row_data = [
                 ext.get("invoice_number", "N/A"),
                 ext.get("invoice_date", "N/A"),
-                ext.get("gstin", "N/A"),
+                ext.get("supplier_gstin", "N/A"),
                 ext.get("total_amount", 0),
                 gstr.get("total_amount", 0),
                 round(pair["match_score"], 3),
                 "; ".join(pair["mismatches"]) if pair["mismatches"] else "No issues"
             ]
             
-            for col_num, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = value
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                
-                # Highlight rows with mismatches
-                if pair["mismatches"]:
-                    cell.fill = PatternFill(start_color=self.highlight_color, end_color=self.highlight_color, fill_type="solid")
-        
-        # Adjust column widths
-        for col_num in range(1, len(headers) + 1):
-            worksheet.column_dimensions[get_column_letter(col_num)].width = 20
+            # Highlight rows with mismatches
+            yield row_data, "gst_highlight" if pair["mismatches"] else "gst_wrapped"
     
-    def _write_mismatches_sheet(self, worksheet, mismatches: List[Dict]):
-        """Write mismatch details to worksheet"""
-        headers = ["Invoice #", "Match Score", "Issues"]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="C00000", end_color="C00000", fill_type="solid")
+    def _mismatch_rows(self, mismatches: List[Dict]) -> Iterator[Tuple[List, str]]:
+        """Mismatch detail rows"""
+        yield ["Invoice #", "Match Score", "Issues"], "gst_header_red"
         
-        for row_num, mismatch in enumerate(mismatches, 2):
+        for mismatch in mismatches:
             row_data = [
                 mismatch["invoice_number"],
                 round(mismatch["match_score"], 3),
                 "\n".join(mismatch["issues"])
             ]
-            
-            for col_num, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = value
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                cell.fill = PatternFill(start_color=self.highlight_color, end_color=self.highlight_color, fill_type="solid")
-        
-        # Adjust column widths
-        worksheet.column_dimensions["A"].width = 20
-        worksheet.column_dimensions["B"].width = 15
-        worksheet.column_dimensions["C"].width = 50
+            yield row_data, "gst_highlight"
     
-    def _write_unmatched_extracted_sheet(self, worksheet, unmatched: List[Dict]):
-        """Write unmatched extracted invoices"""
-        headers = ["File", "Invoice #", "Amount", "Reason"]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="FF8C00", end_color="FF8C00", fill_type="solid")
+    def _unmatched_extracted_rows(self, unmatched: List[Dict]) -> Iterator[Tuple[List, str]]:
+        """Unmatched extracted invoice rows"""
+        yield ["File", "Invoice #", "Amount", "Reason"], "gst_header_orange"
         
-        for row_num, item in enumerate(unmatched, 2):
+        for item in unmatched:
             inv = item["invoice"]
             row_data = [
                 inv.get("file", "N/A"),
@@ -216,84 +199,136 @@ class ExcelGenerator:
                 inv.get("total_amount", 0),
                 item["reason"]
             ]
-            
-            for col_num, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = value
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                cell.fill = PatternFill(start_color=self.error_color, end_color=self.error_color, fill_type="solid")
-                cell.font = Font(color="FFFFFF")
-        
-        for col_num in range(1, len(headers) + 1):
-            worksheet.column_dimensions[get_column_letter(col_num)].width = 20
+            yield row_data, "gst_error"
     
-    def _write_unmatched_gstr2b_sheet(self, worksheet, unmatched: List[Dict]):
-        """Write unmatched GSTR2B invoices"""
-        headers = ["Invoice #", "Date", "GSTIN", "Amount", "Status"]
-        
-        for col_num, header in enumerate(headers, 1):
-            cell = worksheet.cell(row=1, column=col_num)
-            cell.value = header
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="FF8C00", end_color="FF8C00", fill_type="solid")
+    def _unmatched_gstr2b_rows(self, unmatched: List[Dict]) -> Iterator[Tuple[List, str]]:
+        """Unmatched GSTR2B invoice rows"""
+        yield ["Invoice #", "Date", "GSTIN", "Amount", "Status"], "gst_header_orange"
         
-        for row_num, inv in enumerate(unmatched, 2):
+        for inv in unmatched:
             row_data = [
                 inv.get("invoice_number", "N/A"),
                 inv.get("invoice_date", "N/A"),
-                inv.get("gstin", "N/A"),
+                inv.get("supplier_gstin", "N/A"),
                 inv.get("total_amount", 0),
                 "Not found in extracted invoices"
             ]
-            
-            for col_num, value in enumerate(row_data, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = value
-                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-                cell.fill = PatternFill(start_color=self.error_color, end_color=self.error_color, fill_type="solid")
-                cell.font = Font(color="FFFFFF")
-        
-        for col_num in range(1, len(headers) + 1):
-            worksheet.column_dimensions[get_column_letter(col_num)].width = 20
+            yield row_data, "gst_error"
     
-    def _prepare_dataframe(self, invoices: List[Dict]) -> pd.DataFrame:
-        """Prepare dataframe from invoice list with all GST and reconciliation fields"""
-        data = []
-        
+    # Workbook plumbing
+    
+    def _write_sheets(self, sheets: List[Dict], output):
+        """Write sheet definitions to an openpyxl workbook and save it"""
+        workbook = Workbook(write_only=self.write_only)
+        if not self.write_only:
+            # Normal workbooks start with an empty default sheet
+            workbook.remove(workbook.active)
+        for style in self._named_styles():
+            workbook.add_named_style(style)
+        
+        for sheet in sheets:
+            worksheet = workbook.create_sheet(sheet["title"])
+            # Column widths must be set before rows are streamed
+            for col_num, width in enumerate(sheet["widths"], 1):
+                worksheet.column_dimensions[get_column_letter(col_num)].width = width
+            for values, style in sheet["rows"]:
+                self._append(worksheet, values, style)
+        
+        workbook.save(output)
+    
+    def _style_specs(self) -> Dict[str, Dict]:
+        """
+        Shared cell styles by name. Every cell references one of these
+        instead of allocating Font/PatternFill/Alignment/Border objects
+        """
+        header = {"bold": True, "font_color": "FFFFFF", "horizontal": "center", "vertical": "center"}
+        wrapped = {"horizontal": "left", "vertical": "center", "wrap_text": True}
+        
+        return {
+            "gst_header": {**header, "fill": "366092"},
+            "gst_header_red": {**header, "fill": "C00000"},
+            "gst_header_orange": {**header, "fill": "FF8C00"},
+            "gst_wrapped": wrapped,
+            "gst_bordered": {**wrapped, "border": True},
+            "gst_highlight": {**wrapped, "fill": self.highlight_color},
+            "gst_error": {**wrapped, "fill": self.error_color, "font_color": "FFFFFF"},
+            "gst_label": {"horizontal": "left", "vertical": "center"},
+            "gst_value": {"bold": True, "horizontal": "left", "vertical": "center"}
+        }
+    
+    def _named_styles(self) -> List[NamedStyle]:
+        """openpyxl NamedStyles built from _style_specs"""
+        thin = Side(style="thin")
+        styles = []
+        
+        for name, spec in self._style_specs().items():
+            style = NamedStyle(name=name)
+            if spec.get("bold") or spec.get("font_color"):
+                style.font = Font(bold=spec.get("bold", False), color=spec.get("font_color"))
+            if spec.get("fill"):
+                style.fill = PatternFill(start_color=spec["fill"], end_color=spec["fill"], fill_type="solid")
+            style.alignment = Alignment(
+                horizontal=spec.get("horizontal"),
+                vertical=spec.get("vertical"),
+                wrap_text=spec.get("wrap_text", False)
+            )
+            if spec.get("border"):
+                style.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            styles.append(style)
+        
+        return styles
+    
+    def _append(self, worksheet, values: List, style):
+        """
+        Append one styled row. `style` is a named style for the whole row
+        or a list with one named style per column.
+        """
+        styles = style if isinstance(style, list) else None
+        # Write-only sheets need WriteOnlyCell; both kinds get styled before
+        # they are appended so no cell lookup is needed afterwards
+        cell_class = WriteOnlyCell if self.write_only else Cell
+        
+        cells = []
+        for col_index, value in enumerate(values):
+            cell = cell_class(worksheet, value=value)
+            cell.style = styles[col_index] if styles else style
+            cells.append(cell)
+        worksheet.append(cells)
+    
+    def _invoice_rows(self, invoices: List[Dict]) -> Iterator[List]:
+        """Yield one row per invoice in INVOICE_COLUMNS order"""
         for inv in invoices:
             if inv.get("status") == "error":
-                data.append({
-                    "File": inv.get("file", "N/A"),
-                    "Supplier GSTIN": "ERROR",
-                    "Invoice No": "ERROR",
-                    "Invoice Date": "ERROR",
-                    "Document Type": "ERROR",
-                    "Taxable Value": 0,
-                    "CGST": 0,
-                    "SGST": 0,
-                    "IGST": 0,
-                    "Total Amount": 0,
-                    "Expense Category": inv.get("error", "Unknown error"),
-                    "ITC Eligibility": "N/A",
-                    "GSTR2B Section": "N/A",
-                    "Status": "error"
-                })
+                yield [
+                    inv.get("file", "N/A"),
+                    "ERROR",
+                    "ERROR",
+                    "ERROR",
+                    "ERROR",
+                    0,
+                    0,
+                    0,
+                    0,
+                    0,
+                    inv.get("error", "Unknown error"),
+                    "N/A",
+                    "N/A",
+                    "error"
+                ]
             else:
-                data.append({
-                    "File": inv.get("file", "N/A"),
-                    "Supplier GSTIN": inv.get("supplier_gstin", "N/A"),
-                    "Invoice No": inv.get("invoice_number", "N/A"),
-                    "Invoice Date": inv.get("invoice_date", "N/A"),
-                    "Document Type": inv.get("document_type", "Invoice"),
-                    "Taxable Value": inv.get("taxable_value", 0),
-                    "CGST": inv.get("cgst", 0),
-                    "SGST": inv.get("sgst", 0),
-                    "IGST": inv.get("igst", 0),
-                    "Total Amount": inv.get("total_amount", 0),
-                    "Expense Category": inv.get("expense_category", "N/A"),
-                    "ITC Eligibility": inv.get("itc_eligibility", "N/A"),
-                    "GSTR2B Section": inv.get("gstr2b_section", "N/A"),
-                    "Status": inv.get("status", "unknown")
-                })
-        
-        return pd.DataFrame(data)
+                yield [
+                    inv.get("file", "N/A"),
+                    inv.get("supplier_gstin", "N/A"),
+                    inv.get("invoice_number", "N/A"),
+                    inv.get("invoice_date", "N/A"),
+                    inv.get("document_type", "Invoice"),
+                    inv.get("taxable_value", 0),
+                    inv.get("cgst", 0),
+                    inv.get("sgst", 0),
+                    inv.get("igst", 0),
+                    inv.get("total_amount", 0),
+                    inv.get("expense_category", "N/A"),
+                    inv.get("itc_eligibility", "N/A"),
+                    inv.get("gstr2b_section", "N/A"),
+                    inv.get("status", "unknown")
+                ]
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Extraction results per document, keyed by the SHA-256 of the file bytes and
+# shared by every processing run in the process. Batches for a CA firm often
+# carry the same bill more than once (one supplier invoice filed for several
+# group companies, a month re-run after fixing one entry); a hit skips OCR
+# and the Gemini call entirely.
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "2048"))
+
+# Optional on-disk layer (one JSON file per digest) that outlives the process,
+# so bulk runs resume without re-extracting what an earlier run finished
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR")
+
+# Records in these states are not worth reusing
+UNCACHEABLE_STATUSES = {"error", "pending_review"}
+
+
+class ExtractionCache:
+    """LRU of extraction records, plus the OCR text used for duplicate checks, per file digest"""
+
+    def __init__(self, max_entries: int = EXTRACTION_CACHE_SIZE, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "disk_hits": 0}
+
+    def get(self, digest: Optional[str]) -> Optional[Dict]:
+        """{"records": [...], "text": str} as fresh copies, or None"""
+        if not digest:
+            return None
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.stats["hits"] += 1
+        if entry is None:
+            entry = self._read(digest)
+            with self._lock:
+                if entry is None:
+                    self.stats["misses"] += 1
+                    return None
+                self._remember(digest, entry)
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+        return {"records": [dict(record) for record in entry["records"]], "text": entry["text"]}
+
+    def put(self, digest: Optional[str], records: List[Dict], text: str) -> bool:
+        """Store a file's extraction unless any record failed; returns whether it was stored"""
+        if not digest or self.max_entries <= 0 or not records:
+            return False
+        if any(record.get("status") in UNCACHEABLE_STATUSES for record in records):
+            return False
+
+        entry = {"records": [dict(record) for record in records], "text": text}
+        with self._lock:
+            self._remember(digest, entry)
+            self.stats["stores"] += 1
+        self._write(digest, entry)
+        return True
+
+    def _remember(self, digest: str, entry: Dict):
+        self._entries[digest] = entry
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.json"
+
+    def _read(self, digest: str) -> Optional[Dict]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[EXTRACTION_CACHE] Unreadable entry {digest[:12]}: {str(e)}", file=sys.stderr)
+            return None
+
+    def _write(self, digest: str, entry: Dict):
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so a crashed run never leaves a partial entry
+            tmp_path = self._path(digest).with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, default=str))
+            os.replace(tmp_path, self._path(digest))
+        except OSError as e:
+            print(f"[EXTRACTION_CACHE] Could not store entry {digest[:12]}: {str(e)}", file=sys.stderr)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Return the process-wide extraction cache, creating it on first use"""
+    global _cache
+    if _cache is None:
+        _cache = ExtractionCache(directory=EXTRACTION_CACHE_DIR)
+    return _cache
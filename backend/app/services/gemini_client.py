@@ -0,0 +1,60 @@
+import os
+import sys
+import threading
+from typing import Optional
+from google import genai
+from google.genai import types
+
+# One client per API key for the whole process. genai.Client wraps an
+# httpx client, so sharing it shares the connection pool and keep-alive
+# connections across every job instead of reconnecting per processor.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _build_client(api_key: str) -> genai.Client:
+    max_connections = int(os.getenv("GEMINI_MAX_CONNECTIONS", "16"))
+    keepalive_expiry = float(os.getenv("GEMINI_KEEPALIVE_SECONDS", "60"))
+    # Lets perf/CI runs target the local stub server (app.services.llm_stub_server)
+    base_url = os.getenv("GEMINI_BASE_URL")
+
+    try:
+        import httpx
+        http_options = types.HttpOptions(
+            client_args={
+                "limits": httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=keepalive_expiry
+                )
+            },
+            base_url=base_url
+        )
+        return genai.Client(api_key=api_key, http_options=http_options)
+    except Exception as e:
+        # Older SDKs don't accept client_args; their default pool still applies
+        print(f"[GEMINI] Custom connection pool not supported, using defaults: {str(e)}", file=sys.stderr)
+        if base_url:
+            return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=base_url))
+        return genai.Client(api_key=api_key)
+
+
+def get_gemini_client(api_key: Optional[str] = None) -> Optional[genai.Client]:
+    """
+    Return the shared Gemini client, creating it on first use.
+
+    Returns None when no API key is configured.
+    """
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                print("[GEMINI] Creating shared Gemini client", file=sys.stderr)
+                client = _build_client(api_key)
+                _clients[api_key] = client
+    return client
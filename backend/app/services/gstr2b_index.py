@@ -0,0 +1,98 @@
+from typing import Dict, List, Tuple
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.invoice_record import InvoiceRecord
+
+MatchKey = Tuple[str, str, str]
+
+# Source field names seen across GSTR-2B inputs (portal JSON, govt API,
+# uploaded Excel via _parse_gstr2b_excel), first match wins
+FIELD_ALIASES = {
+    "invoice_number": ["inv_no", "invoice_no", "invoice_number"],
+    "invoice_date": ["inv_dt", "invoice_date"],
+    "supplier_gstin": ["gstin", "supplier_gstin"],
+    "total_amount": ["total_amount", "total_amt"]
+}
+
+AMOUNT_FIELDS = ["taxable_value", "cgst", "sgst", "igst"]
+
+
+def _first(invoice: Dict, names: List[str]):
+    for name in names:
+        value = invoice.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _amount(value) -> float:
+    try:
+        return float(value) if value not in (None, "") else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def normalize_gstr2b_invoice(invoice: Dict) -> InvoiceRecord:
+    """One GSTR-2B invoice in the canonical shape used by every matcher"""
+    normalized = InvoiceRecord({
+        "invoice_number": _first(invoice, FIELD_ALIASES["invoice_number"]),
+        "invoice_date": _first(invoice, FIELD_ALIASES["invoice_date"]),
+        "supplier_gstin": _first(invoice, FIELD_ALIASES["supplier_gstin"]),
+        "document_type": invoice.get("document_type", "Invoice"),
+        "total_amount": _amount(_first(invoice, FIELD_ALIASES["total_amount"])),
+        "gstr2b_section": invoice.get("gstr2b_section", "B2B"),
+        "itc_eligibility": invoice.get("itc_eligibility", True),
+        "source": "gstr2b"
+    })
+    for field in AMOUNT_FIELDS:
+        normalized[field] = _amount(invoice.get(field))
+    return normalized
+
+
+def gstr2b_raw_invoices(gstr2b_data) -> List[Dict]:
+    """Invoice list from any of the accepted GSTR-2B payload layouts"""
+    invoices = []
+    if isinstance(gstr2b_data, dict):
+        if "invoices" in gstr2b_data:
+            invoices = gstr2b_data["invoices"]
+        elif "data" in gstr2b_data:
+            invoices = gstr2b_data["data"].get("invoices", [])
+    elif isinstance(gstr2b_data, list):
+        invoices = gstr2b_data
+    return [inv for inv in invoices if isinstance(inv, dict)]
+
+
+class GSTR2BIndex:
+    """
+    GSTR-2B data normalized once, with lookup indexes prebuilt.
+    
+    Built when GSTR-2B data is attached to a session and reused by mismatch
+    detection, reconciliation and incremental edits, so no endpoint has to
+    re-parse the raw payload.
+    """
+    
+    def __init__(self, gstr2b_data):
+        self._build([normalize_gstr2b_invoice(inv) for inv in gstr2b_raw_invoices(gstr2b_data)])
+    
+    @classmethod
+    def from_invoices(cls, invoices: List[InvoiceRecord]) -> "GSTR2BIndex":
+        """Index invoices that are already normalized (e.g. one GSTIN partition's)"""
+        index = cls.__new__(cls)
+        index._build(list(invoices))
+        return index
+    
+    def _build(self, invoices: List[InvoiceRecord]):
+        self.invoices: List[InvoiceRecord] = invoices
+        
+        # Positions in self.invoices, ascending
+        self.by_match_key: Dict[MatchKey, List[int]] = {}
+        self.by_gstin: Dict[str, List[int]] = {}
+        
+        for index, invoice in enumerate(self.invoices):
+            self.by_match_key.setdefault(GSTRReconciliationEngine.match_key(invoice), []).append(index)
+            gstin = GSTRReconciliationEngine._normalize_gstin(invoice["supplier_gstin"])
+            self.by_gstin.setdefault(gstin, []).append(index)
+    
+    @classmethod
+    def from_data(cls, gstr2b_data) -> "GSTR2BIndex":
+        """Accept either raw GSTR-2B data or an already built index"""
+        return gstr2b_data if isinstance(gstr2b_data, cls) else cls(gstr2b_data)
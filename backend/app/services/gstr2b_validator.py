@@ -0,0 +1,34 @@
+from typing import Dict
+
+
+def validate_gstr2b_data(gstr2b_data: Dict) -> Dict:
+    """
+    Validate and structure GSTR2B data.
+
+    Pure data check - does not need OCR or the Gemini client, so upload
+    endpoints can call it without building a DocumentProcessor.
+    """
+    try:
+        # Check for required invoices field (others can have defaults)
+        if "invoices" not in gstr2b_data or not gstr2b_data["invoices"]:
+            return {
+                "valid": False,
+                "message": "No invoices found in GSTR2B data. Please ensure the Excel file contains invoice records."
+            }
+
+        # Provide defaults for optional fields
+        if not gstr2b_data.get("period"):
+            gstr2b_data["period"] = "Unknown"
+        if not gstr2b_data.get("gstin"):
+            gstr2b_data["gstin"] = "Not provided"
+
+        return {
+            "valid": True,
+            "message": "GSTR2B data is valid",
+            "data": gstr2b_data
+        }
+    except Exception as e:
+        return {
+            "valid": False,
+            "message": str(e)
+        }
@@ -1,6 +1,11 @@
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
-from difflib import SequenceMatcher
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+from app.services.assignment import ASSIGNMENT_MAX_EDGES, assign
+from app.services.invoice_record import InvoiceRecord
+from app.services.invoice_numbers import normalize_invoice_number, key_similarity
+from app.utils.dates import date_ordinal
 
 
 class GSTRReconciliationEngine:
@@ -21,6 +26,10 @@ class GSTRReconciliationEngine:
         
         # Tolerance for tax components (percentage)
         self.tax_tolerance_percent = 1.0
+        
+        # Second pass: minimum invoice-number similarity (0-1, on normalized
+        # numbers) to pair leftovers that agree on amount and date
+        self.invoice_number_similarity_threshold = 0.8
     
     def reconcile(
         self,
@@ -39,78 +48,82 @@ class GSTRReconciliationEngine:
         """
         reconciliation_results = []
         matched_gstr2b_indices = set()
+        duplicates_skipped = 0
+        # books index -> position in reconciliation_results, filled in once
+        # its key group is paired
+        result_positions = {}
+        books_by_key = defaultdict(list)
+        assignments = []
         
         # Process each book invoice
-        for books_invoice in books_invoices:
-            # Skip invalid extractions
-            if books_invoice.get("status") == "error" or not books_invoice.get("invoice_number"):
-                reconciliation_results.append(
-                    self._create_result(
-                        books_invoice=books_invoice,
-                        status="Invalid Data",
-                        probable_reason="Extraction failed or missing invoice number",
-                        action_required="Verify source document"
-                    )
-                )
+        for books_index, books_invoice in enumerate(books_invoices):
+            # Linked duplicate documents would double-count the same bill
+            if books_invoice.get("status") == "duplicate":
+                duplicates_skipped += 1
                 continue
             
-            # Find matching GSTR-2B invoice
-            match_result = self._find_match(books_invoice, gstr2b_invoices, matched_gstr2b_indices)
+            # Skip invalid extractions
+            if not self.is_reconcilable(books_invoice):
+                reconciliation_results.append(self.invalid_result(books_invoice, books_index))
+                continue
             
-            if match_result["found"]:
-                # Invoice exists in both books and GSTR-2B
-                gstr2b_invoice = match_result["gstr2b_invoice"]
-                matched_gstr2b_indices.add(match_result["index"])
-                
-                # Check for mismatches
-                mismatch_analysis = self._analyze_mismatches(books_invoice, gstr2b_invoice)
-                
-                if mismatch_analysis["has_mismatches"]:
-                    result = self._create_result(
-                        books_invoice=books_invoice,
-                        gstr2b_invoice=gstr2b_invoice,
-                        status=mismatch_analysis["status"],
-                        probable_reason=mismatch_analysis["probable_reason"],
-                        action_required=mismatch_analysis["action_required"],
-                        field_differences=mismatch_analysis["differences"]
+            books_by_key[self.match_key(books_invoice)].append(books_index)
+            result_positions[books_index] = len(reconciliation_results)
+            reconciliation_results.append(None)
+        
+        # Primary match: supplier_gstin + invoice_no + document_type
+        gstr2b_by_key = defaultdict(list)
+        for idx, gstr2b_invoice in enumerate(gstr2b_invoices):
+            gstr2b_by_key[self.match_key(gstr2b_invoice)].append(idx)
+        
+        missing_books = []
+        for key, books_positions in books_by_key.items():
+            assignment = self.assign_key_group(
+                books_invoices, gstr2b_invoices, books_positions, gstr2b_by_key.get(key, [])
+            )
+            assignments.append(assignment)
+            for books_index in books_positions:
+                gstr2b_index = assignment["pairs"].get(books_index)
+                if gstr2b_index is not None:
+                    # Invoice exists in both books and GSTR-2B
+                    matched_gstr2b_indices.add(gstr2b_index)
+                    result = self.pair_result(
+                        books_invoices[books_index], gstr2b_invoices[gstr2b_index], books_index, gstr2b_index
                     )
                 else:
-                    result = self._create_result(
-                        books_invoice=books_invoice,
-                        gstr2b_invoice=gstr2b_invoice,
-                        status="Matched",
-                        probable_reason="Invoice details match GSTR-2B",
-                        action_required="None - verified"
-                    )
-            else:
-                # Invoice in books but not in GSTR-2B
-                result = self._create_result(
-                    books_invoice=books_invoice,
-                    status="Missing in GSTR-2B",
-                    probable_reason="Supplier may not have filed or filed after cutoff date",
-                    action_required="Client/Supplier follow-up required"
-                )
-            
-            reconciliation_results.append(result)
+                    # Invoice in books but not in GSTR-2B
+                    result = self.missing_in_gstr2b_result(books_invoices[books_index], books_index)
+                    missing_books.append(books_index)
+                reconciliation_results[result_positions[books_index]] = result
+        
+        # Second pass: pair leftovers that agree on amount and date and have
+        # a similar invoice number (OCR or typing variants)
+        tolerance = self.tolerance_assignment(
+            [(index, books_invoices[index]) for index in sorted(missing_books)],
+            [(idx, inv) for idx, inv in enumerate(gstr2b_invoices) if idx not in matched_gstr2b_indices]
+        )
+        assignments.append(tolerance)
+        for books_index, gstr2b_index, similarity in tolerance["pairs"]:
+            matched_gstr2b_indices.add(gstr2b_index)
+            reconciliation_results[result_positions[books_index]] = self.tolerance_pair_result(
+                books_invoices[books_index], gstr2b_invoices[gstr2b_index], books_index, gstr2b_index, similarity
+            )
         
         # Find GSTR-2B invoices not in books
-        unmatched_gstr2b_results = []
-        for idx, gstr2b_invoice in enumerate(gstr2b_invoices):
-            if idx not in matched_gstr2b_indices:
-                result = self._create_result(
-                    gstr2b_invoice=gstr2b_invoice,
-                    status="Missing in Books",
-                    probable_reason="Invoice not recorded by client or accounting delay",
-                    action_required="Verify purchase register"
-                )
-                unmatched_gstr2b_results.append(result)
+        unmatched_gstr2b_results = [
+            self.missing_in_books_result(gstr2b_invoice, idx)
+            for idx, gstr2b_invoice in enumerate(gstr2b_invoices)
+            if idx not in matched_gstr2b_indices
+        ]
         
         # Generate summary
         summary = self._generate_summary(
             reconciliation_results,
             unmatched_gstr2b_results,
-            len(books_invoices),
-            len(gstr2b_invoices)
+            len(books_invoices) - duplicates_skipped,
+            len(gstr2b_invoices),
+            duplicates_skipped,
+            self.assignment_quality(assignments)
         )
         
         return {
@@ -121,41 +134,293 @@ class GSTRReconciliationEngine:
             "timestamp": datetime.now().isoformat()
         }
     
-    def _find_match(
+    def is_reconcilable(self, books_invoice: Dict) -> bool:
+        """Failed extractions and invoices without a number cannot be matched"""
+        return books_invoice.get("status") != "error" and bool(books_invoice.get("invoice_number"))
+    
+    def invalid_result(self, books_invoice: Dict, books_index: Optional[int] = None) -> Dict:
+        return self._create_result(
+            books_invoice=books_invoice,
+            books_index=books_index,
+            status="Invalid Data",
+            probable_reason="Extraction failed or missing invoice number",
+            action_required="Verify source document"
+        )
+    
+    def pair_result(
+        self,
+        books_invoice: Dict,
+        gstr2b_invoice: Dict,
+        books_index: Optional[int] = None,
+        gstr2b_index: Optional[int] = None
+    ) -> Dict:
+        """Result for a books invoice matched to a GSTR-2B invoice"""
+        # Check for mismatches
+        mismatch_analysis = self._analyze_mismatches(books_invoice, gstr2b_invoice)
+        
+        if mismatch_analysis["has_mismatches"]:
+            return self._create_result(
+                books_invoice=books_invoice,
+                gstr2b_invoice=gstr2b_invoice,
+                books_index=books_index,
+                gstr2b_index=gstr2b_index,
+                status=mismatch_analysis["status"],
+                probable_reason=mismatch_analysis["probable_reason"],
+                action_required=mismatch_analysis["action_required"],
+                field_differences=mismatch_analysis["differences"]
+            )
+        
+        return self._create_result(
+            books_invoice=books_invoice,
+            gstr2b_invoice=gstr2b_invoice,
+            books_index=books_index,
+            gstr2b_index=gstr2b_index,
+            status="Matched",
+            probable_reason="Invoice details match GSTR-2B",
+            action_required="None - verified"
+        )
+    
+    def tolerance_pair_result(
         self,
         books_invoice: Dict,
+        gstr2b_invoice: Dict,
+        books_index: Optional[int] = None,
+        gstr2b_index: Optional[int] = None,
+        similarity: float = 0.0
+    ) -> Dict:
+        """Result for a second-pass pair whose invoice numbers differ"""
+        result = self.pair_result(books_invoice, gstr2b_invoice, books_index, gstr2b_index)
+        result["field_differences"] = {
+            **result["field_differences"],
+            "invoice_number": {
+                "books": books_invoice.get("invoice_number"),
+                "gstr2b": gstr2b_invoice.get("invoice_number"),
+                "similarity": round(similarity, 3)
+            }
+        }
+        if result["status"] == "Matched":
+            result["status"] = "Probable Match"
+            result["probable_reason"] = "Invoice number differs from GSTR-2B (likely OCR or data entry variant)"
+            result["action_required"] = "Confirm invoice number and correct books"
+        return result
+    
+    def missing_in_gstr2b_result(self, books_invoice: Dict, books_index: Optional[int] = None) -> Dict:
+        return self._create_result(
+            books_invoice=books_invoice,
+            books_index=books_index,
+            status="Missing in GSTR-2B",
+            probable_reason="Supplier may not have filed or filed after cutoff date",
+            action_required="Client/Supplier follow-up required"
+        )
+    
+    def missing_in_books_result(self, gstr2b_invoice: Dict, gstr2b_index: Optional[int] = None) -> Dict:
+        return self._create_result(
+            gstr2b_invoice=gstr2b_invoice,
+            gstr2b_index=gstr2b_index,
+            status="Missing in Books",
+            probable_reason="Invoice not recorded by client or accounting delay",
+            action_required="Verify purchase register"
+        )
+    
+    def assign_key_group(
+        self,
+        books_invoices: List[Dict],
         gstr2b_invoices: List[Dict],
-        matched_indices: set
+        books_positions: List[int],
+        gstr2b_positions: List[int]
     ) -> Dict:
         """
-        Find matching GSTR-2B invoice using primary matching criteria.
+        Pair the books and GSTR-2B invoices sharing one exact match key.
+        
+        Keys are nearly always unique on both sides. When one repeats (the
+        same number reused across a year, a duplicate upload), the group is
+        paired to maximize pair_score rather than in input order, so an early
+        invoice cannot take the GSTR-2B row a later one fits exactly. Every
+        possible pair is still made. See assignment.assign for the result
+        shape; scores are in pair_score units, and a one-to-one group is
+        not scored at all.
+        """
+        # First-come pairing, what the exact pass always did
+        baseline = dict(zip(books_positions, gstr2b_positions))
+        pair_count = len(baseline)
+        if len(books_positions) <= 1 and len(gstr2b_positions) <= 1:
+            # No choice to make, so nothing is scored
+            return {"pairs": baseline, "score": 0.0, "greedy_score": 0.0, "reassigned": 0, "oversized_components": 0}
+        
+        if len(books_positions) * len(gstr2b_positions) > ASSIGNMENT_MAX_EDGES:
+            candidates = {
+                books_index: [(gstr2b_index, 1.0 + self.pair_score(books_invoices[books_index], gstr2b_invoices[gstr2b_index]))]
+                for books_index, gstr2b_index in baseline.items()
+            }
+        else:
+            # Weights of at least 1 make every maximum-weight pairing complete
+            candidates = {
+                books_index: [
+                    (gstr2b_index, 1.0 + self.pair_score(books_invoices[books_index], gstr2b_invoices[gstr2b_index]))
+                    for gstr2b_index in gstr2b_positions
+                ]
+                for books_index in books_positions
+            }
+        
+        assignment = assign(candidates, baseline)
+        assignment["score"] -= pair_count
+        assignment["greedy_score"] -= pair_count
+        return assignment
+    
+    def pair_score(self, books_invoice: Dict, gstr2b_invoice: Dict) -> float:
+        """
+        Closeness of two invoices in [0, 1], for choosing between candidate
+        pairs: taxable value (0.5), total tax (0.3) and date (0.2) agreement.
+        Unknown values count as half agreement.
+        """
+        taxable = self._closeness(
+            self._get_numeric(books_invoice.get("taxable_value")),
+            self._get_numeric(gstr2b_invoice.get("taxable_value"))
+        )
+        tax = self._closeness(self._total_tax(books_invoice), self._total_tax(gstr2b_invoice))
+        
+        books_date = self._date_ordinal(books_invoice)
+        gstr2b_date = self._date_ordinal(gstr2b_invoice)
+        if books_date is None or gstr2b_date is None:
+            date = 0.5
+        else:
+            # Falls to zero at twice the date tolerance
+            date = max(0.0, 1 - abs(books_date - gstr2b_date) / (2 * self.date_tolerance_days or 1))
         
-        Primary match: supplier_gstin + invoice_no + document_type
+        return 0.5 * taxable + 0.3 * tax + 0.2 * date
+    
+    def _total_tax(self, invoice: Dict) -> Optional[float]:
+        components = [self._get_numeric(invoice.get(tax_type)) for tax_type in ("cgst", "sgst", "igst")]
+        known = [value for value in components if value is not None]
+        return sum(known) if known else None
+    
+    @staticmethod
+    def _closeness(value1: Optional[float], value2: Optional[float]) -> float:
+        """1 for equal amounts, falling linearly to 0 at a 100% difference"""
+        if value1 is None or value2 is None:
+            return 0.5
+        largest = max(abs(value1), abs(value2))
+        if not largest:
+            return 1.0
+        return max(0.0, 1 - abs(value1 - value2) / largest)
+    
+    def tolerance_assignment(
+        self,
+        books_leftovers: List[Tuple[int, Dict]],
+        gstr2b_leftovers: List[Tuple[int, Dict]]
+    ) -> Dict:
         """
-        books_gstin = self._normalize_gstin(books_invoice.get("supplier_gstin"))
-        books_inv_no = self._normalize_string(books_invoice.get("invoice_number"))
-        books_doc_type = self._normalize_string(books_invoice.get("document_type", "Invoice"))
+        Pair invoices the exact key left unmatched.
+        
+        GSTR-2B leftovers are indexed per (GSTIN, document type) and sorted by
+        taxable value, so each books invoice finds the candidates within
+        amount_tolerance_percent by binary search. Candidates must also be
+        within date_tolerance_days (when both dates are known) and have an
+        invoice number at least invoice_number_similarity_threshold similar.
+        The resulting sparse candidate graph is solved as an assignment
+        (see assignment.assign) weighted by number similarity, with
+        pair_score as a small tie-breaker, instead of letting books
+        invoices pick in input order.
+        O((n + m) log m) plus the candidates inside each amount window.
+        
+        Invoices still unpaired after that are paired on an equal normalized
+        invoice number (see invoice_numbers) within the date tolerance
+        whatever the amounts, so a typo'd number on a changed invoice shows
+        up as a value mismatch rather than as missing on both sides.
         
-        for idx, gstr2b_invoice in enumerate(gstr2b_invoices):
-            if idx in matched_indices:
+        Returns:
+            assignment.assign's result with "pairs" as a list of
+            (books_index, gstr2b_index, similarity), in books order
+        """
+        gstr2b_invoices = dict(gstr2b_leftovers)
+        by_amount = defaultdict(list)
+        by_number = defaultdict(list)
+        for gstr2b_index, invoice in gstr2b_leftovers:
+            partition = self.partition_key(invoice)
+            if not partition[0]:
                 continue
+            taxable = self._get_numeric(invoice.get("taxable_value"))
+            date = self._date_ordinal(invoice)
+            number = normalize_invoice_number(invoice.get("invoice_number"))
+            if taxable:
+                by_amount[partition].append((taxable, gstr2b_index, date, number))
+            if number:
+                by_number[partition, number].append((gstr2b_index, date))
+        
+        amount_index = {}
+        for partition, rows in by_amount.items():
+            rows.sort()
+            amount_index[partition] = ([row[0] for row in rows], rows)
+        
+        tolerance = self.amount_tolerance_percent / 100
+        candidates = {}
+        similarities = {}
+        
+        for books_index, invoice in books_leftovers:
+            partition = self.partition_key(invoice)
+            books_date = self._date_ordinal(invoice)
+            books_number = normalize_invoice_number(invoice.get("invoice_number"))
+            entry = amount_index.get(partition)
+            taxable = self._get_numeric(invoice.get("taxable_value"))
             
-            gstr2b_gstin = self._normalize_gstin(gstr2b_invoice.get("supplier_gstin"))
-            gstr2b_inv_no = self._normalize_string(gstr2b_invoice.get("invoice_number"))
-            gstr2b_doc_type = self._normalize_string(gstr2b_invoice.get("document_type", "Invoice"))
-            
-            # Primary match criteria
-            if (books_gstin == gstr2b_gstin and
-                books_inv_no == gstr2b_inv_no and
-                books_doc_type == gstr2b_doc_type):
-                
-                return {
-                    "found": True,
-                    "gstr2b_invoice": gstr2b_invoice,
-                    "index": idx
-                }
+            edges = []
+            if entry is not None and taxable:
+                # |books - gstr2b| <= tolerance * |gstr2b|, solved for gstr2b
+                bounds = (taxable / (1 + tolerance), taxable / (1 - tolerance) if tolerance < 1 else float("inf"))
+                values, rows = entry
+                for gstr2b_taxable, gstr2b_index, gstr2b_date, gstr2b_number in rows[bisect_left(values, min(bounds)):bisect_right(values, max(bounds))]:
+                    if not self._dates_close(books_date, gstr2b_date):
+                        continue
+                    if not self._within_tolerance(taxable, gstr2b_taxable, self.amount_tolerance_percent):
+                        continue
+                    similarity = key_similarity(books_number, gstr2b_number)
+                    if similarity < self.invoice_number_similarity_threshold:
+                        continue
+                    similarities[books_index, gstr2b_index] = similarity
+                    edges.append((gstr2b_index, similarity + self.pair_score(invoice, gstr2b_invoices[gstr2b_index]) / 100))
+            candidates[books_index] = edges
+        
+        assignment = assign(candidates)
+        pairs = {
+            books_index: (gstr2b_index, similarities[books_index, gstr2b_index])
+            for books_index, gstr2b_index in assignment["pairs"].items()
+        }
+        used = {gstr2b_index for gstr2b_index, _ in pairs.values()}
         
-        return {"found": False}
+        for books_index, invoice in books_leftovers:
+            books_number = normalize_invoice_number(invoice.get("invoice_number"))
+            if books_index in pairs or not books_number:
+                continue
+            books_date = self._date_ordinal(invoice)
+            for gstr2b_index, gstr2b_date in by_number.get((self.partition_key(invoice), books_number), ()):
+                if gstr2b_index not in used and self._dates_close(books_date, gstr2b_date):
+                    used.add(gstr2b_index)
+                    pairs[books_index] = (gstr2b_index, 1.0)
+                    break
+        
+        assignment["pairs"] = [
+            (books_index, *pairs[books_index]) for books_index, _ in books_leftovers if books_index in pairs
+        ]
+        return assignment
+    
+    def _dates_close(self, date1: Optional[int], date2: Optional[int]) -> bool:
+        """Within date_tolerance_days; unknown dates do not rule a pair out"""
+        return date1 is None or date2 is None or abs(date1 - date2) <= self.date_tolerance_days
+    
+    @classmethod
+    def partition_key(cls, invoice: Dict) -> Tuple[str, str]:
+        """(supplier_gstin, document_type): the scope of second-pass matching"""
+        gstin, _, document_type = cls.match_key(invoice)
+        return gstin, document_type
+    
+    @classmethod
+    def match_key(cls, invoice: Dict) -> Tuple[str, str, str]:
+        """Primary match key: (supplier_gstin, invoice_no, document_type), normalized"""
+        return (
+            cls._normalize_gstin(invoice.get("supplier_gstin")),
+            cls._normalize_string(invoice.get("invoice_number")),
+            cls._normalize_string(invoice.get("document_type", "Invoice"))
+        )
     
     def _analyze_mismatches(self, books_invoice: Dict, gstr2b_invoice: Dict) -> Dict:
         """
@@ -280,14 +545,14 @@ class GSTRReconciliationEngine:
         Check if invoice dates match within tolerance.
         Non-critical mismatch.
         """
-        books_date = self._parse_date(books_invoice.get("invoice_date"))
-        gstr2b_date = self._parse_date(gstr2b_invoice.get("invoice_date"))
+        books_date = self._date_ordinal(books_invoice)
+        gstr2b_date = self._date_ordinal(gstr2b_invoice)
         
         mismatch = False
         difference_days = None
         
-        if books_date and gstr2b_date:
-            difference_days = abs((books_date - gstr2b_date).days)
+        if books_date is not None and gstr2b_date is not None:
+            difference_days = abs(books_date - gstr2b_date)
             mismatch = difference_days > self.date_tolerance_days
         
         return {
@@ -302,6 +567,8 @@ class GSTRReconciliationEngine:
         self,
         books_invoice: Optional[Dict] = None,
         gstr2b_invoice: Optional[Dict] = None,
+        books_index: Optional[int] = None,
+        gstr2b_index: Optional[int] = None,
         status: str = "",
         probable_reason: str = "",
         action_required: str = "",
@@ -309,17 +576,47 @@ class GSTRReconciliationEngine:
     ) -> Dict:
         """
         Create standardized reconciliation result.
+        
+        Invoices are referenced by their position in the books / GSTR-2B
+        lists rather than copied into every result; with_invoice_data()
+        adds the sanitized copies when a result is returned to a client.
         """
         return {
             "books_invoice_number": books_invoice.get("invoice_number") if books_invoice else "N/A",
             "gstr2b_invoice_number": gstr2b_invoice.get("invoice_number") if gstr2b_invoice else "N/A",
-            "supplier_gstin": (books_invoice.get("supplier_gstin") or gstr2b_invoice.get("supplier_gstin")) if (books_invoice or gstr2b_invoice) else "N/A",
+            "supplier_gstin": ((books_invoice or {}).get("supplier_gstin") or (gstr2b_invoice or {}).get("supplier_gstin")) if (books_invoice or gstr2b_invoice) else "N/A",
             "status": status,
             "probable_reason": probable_reason,
             "action_required": action_required,
             "field_differences": field_differences or {},
-            "books_data": self._sanitize_invoice(books_invoice) if books_invoice else None,
-            "gstr2b_data": self._sanitize_invoice(gstr2b_invoice) if gstr2b_invoice else None
+            "books_index": books_index,
+            "gstr2b_index": gstr2b_index
+        }
+    
+    @classmethod
+    def with_invoice_data(cls, result: Dict, books_invoices: List[Dict], gstr2b_invoices: List[Dict]) -> Dict:
+        """Copy of a result with the referenced invoices embedded as books_data / gstr2b_data"""
+        books_index = result.get("books_index")
+        gstr2b_index = result.get("gstr2b_index")
+        return {
+            **result,
+            "books_data": cls._sanitize_invoice(books_invoices[books_index]) if books_index is not None else None,
+            "gstr2b_data": cls._sanitize_invoice(gstr2b_invoices[gstr2b_index]) if gstr2b_index is not None else None
+        }
+    
+    @classmethod
+    def expand_reconciliation(cls, reconciliation: Dict, books_invoices: List[Dict], gstr2b_invoices: List[Dict]) -> Dict:
+        """Full reconciliation in its API shape, with invoice data embedded in every result"""
+        return {
+            **reconciliation,
+            "books_reconciliation": [
+                cls.with_invoice_data(result, books_invoices, gstr2b_invoices)
+                for result in reconciliation.get("books_reconciliation", [])
+            ],
+            "gstr2b_unmatched": [
+                cls.with_invoice_data(result, books_invoices, gstr2b_invoices)
+                for result in reconciliation.get("gstr2b_unmatched", [])
+            ]
         }
     
     def _generate_summary(
@@ -327,7 +624,9 @@ class GSTRReconciliationEngine:
         books_results: List[Dict],
         gstr2b_unmatched: List[Dict],
         total_books: int,
-        total_gstr2b: int
+        total_gstr2b: int,
+        duplicates_skipped: int = 0,
+        assignment: Optional[Dict] = None
     ) -> Dict:
         """
         Generate reconciliation summary statistics.
@@ -337,24 +636,62 @@ class GSTRReconciliationEngine:
             status = result["status"]
             status_counts[status] = status_counts.get(status, 0) + 1
         
+        return self.summary_from_counts(
+            status_counts, len(gstr2b_unmatched), total_books, total_gstr2b, duplicates_skipped, assignment
+        )
+    
+    def summary_from_counts(
+        self,
+        status_counts: Dict[str, int],
+        missing_in_books: int,
+        total_books: int,
+        total_gstr2b: int,
+        duplicates_skipped: int = 0,
+        assignment: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Summary statistics from per-status counts of books results, plus
+        the assignment_quality of the pairing when given.
+        """
         matched_count = status_counts.get("Matched", 0)
         value_mismatches = status_counts.get("Value Mismatch", 0)
         tax_mismatches = status_counts.get("Tax Structure Mismatch", 0)
+        probable_matches = status_counts.get("Probable Match", 0)
         missing_in_gstr2b = status_counts.get("Missing in GSTR-2B", 0)
-        missing_in_books = len(gstr2b_unmatched)
         
-        return {
+        summary = {
             "total_books_invoices": total_books,
             "total_gstr2b_invoices": total_gstr2b,
             "matched": matched_count,
+            "probable_matches": probable_matches,
             "value_mismatches": value_mismatches,
             "tax_structure_mismatches": tax_mismatches,
             "missing_in_gstr2b": missing_in_gstr2b,
             "missing_in_books": missing_in_books,
             "invalid_extractions": status_counts.get("Invalid Data", 0),
+            "duplicates_skipped": duplicates_skipped,
             "reconciliation_rate": f"{(matched_count / total_books * 100):.1f}%" if total_books > 0 else "0%",
             "status_breakdown": status_counts
         }
+        if assignment is not None:
+            summary["assignment"] = assignment
+        return summary
+    
+    @staticmethod
+    def assignment_quality(assignments) -> Dict:
+        """
+        Total match quality of the chosen pairing against first-come greedy
+        matching, over the assign_key_group / tolerance_assignment results.
+        Only pairings where there was a choice are scored.
+        """
+        assignments = list(assignments)
+        return {
+            "method": "optimal",
+            "match_quality": round(sum(a["score"] for a in assignments), 4),
+            "greedy_match_quality": round(sum(a["greedy_score"] for a in assignments), 4),
+            "reassigned": sum(a["reassigned"] for a in assignments),
+            "oversized_components": sum(a["oversized_components"] for a in assignments)
+        }
     
     # Utility methods
     
@@ -391,21 +728,18 @@ class GSTRReconciliationEngine:
         difference_percent = abs((value1 - value2) / value2 * 100)
         return difference_percent <= tolerance_percent
     
+    @staticmethod
+    def _date_ordinal(invoice: Dict) -> Optional[int]:
+        """Invoice date as a day ordinal; records carry it pre-parsed"""
+        if isinstance(invoice, InvoiceRecord):
+            return invoice.date_ordinal
+        return date_ordinal(invoice.get("invoice_date"))
+    
     @staticmethod
     def _parse_date(date_string: Optional[str]) -> Optional[datetime]:
         """Parse date string to datetime object."""
-        if not date_string:
-            return None
-        
-        formats = ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(str(date_string).strip(), fmt)
-            except ValueError:
-                continue
-        
-        return None
+        ordinal = date_ordinal(date_string)
+        return datetime.fromordinal(ordinal) if ordinal is not None else None
     
     @staticmethod
     def _sanitize_invoice(invoice: Optional[Dict]) -> Optional[Dict]:
@@ -0,0 +1,437 @@
+import os
+import sys
+import heapq
+import threading
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.gstr2b_index import GSTR2BIndex
+
+MatchKey = Tuple[str, str, str]
+PartitionKey = Tuple[str, str]
+
+# Builds over this many books + GSTR-2B invoices are split by supplier GSTIN
+# across worker processes; below it, pickling the invoices over costs more
+# than the parallelism saves
+PARALLEL_MIN_INVOICES = int(os.getenv("RECONCILE_PARALLEL_MIN_INVOICES", "50000"))
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", str(os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    """
+    Worker pool shared by all builds, started on first use. Workers are
+    spawned rather than forked: the server process has threads (event loop,
+    to_thread workers) that a fork would copy mid-flight.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=RECONCILE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_process_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class IncrementalReconciler:
+    """
+    GSTR-2B reconciliation state that can be patched one invoice at a time.
+    
+    GSTRReconciliationEngine pairs books and GSTR-2B invoices on an exact
+    match key, solving an assignment within each key group, then runs a
+    tolerance pass over the leftovers of each (GSTIN, document type)
+    partition. Exact pairings for
+    one key never depend on another key, and the tolerance pass never looks
+    outside a partition, so an edit can only change results within the
+    edited invoice's old and new keys and their partitions. Only those are
+    recomputed, and the summary counters are adjusted rather than rebuilt.
+    Results are identical to a full GSTRReconciliationEngine.reconcile run.
+    """
+    
+    def __init__(
+        self,
+        books_invoices: List[Dict],
+        gstr2b_index: GSTR2BIndex,
+        engine: Optional[GSTRReconciliationEngine] = None,
+        workers: Optional[int] = None
+    ):
+        """
+        Args:
+            workers: processes for the initial build (default RECONCILE_WORKERS);
+                builds under PARALLEL_MIN_INVOICES always run in-process
+        """
+        self.engine = engine or GSTRReconciliationEngine()
+        # Patched in place, so this is normally the session's own list
+        self.books_invoices = books_invoices
+        self.gstr2b_invoices = gstr2b_index.invoices
+        
+        # Match index: key -> GSTR-2B / books positions, ascending.
+        # The GSTR-2B side is prebuilt by GSTR2BIndex and only read here.
+        self._gstr2b_by_key: Dict[MatchKey, List[int]] = gstr2b_index.by_match_key
+        self._books_by_key: Dict[MatchKey, List[int]] = defaultdict(list)
+        self._books_keys: Dict[int, MatchKey] = {}
+        
+        # Exact-pass leftovers per partition, input to the tolerance pass
+        self._leftover_books: Dict[PartitionKey, Set[int]] = defaultdict(set)
+        self._leftover_gstr2b: Dict[PartitionKey, Set[int]] = defaultdict(set)
+        
+        # Assignment quality per match key (exact pass) and per partition
+        # (tolerance pass), summed into the summary
+        self._assignments: Dict[tuple, Dict] = {}
+        
+        self._books_results: Dict[int, Dict] = {}
+        self._gstr2b_unmatched: Dict[int, Dict] = {}
+        self._status_counts: Dict[str, int] = {}
+        self.duplicates_skipped = 0
+        
+        for index in range(len(books_invoices)):
+            self._register(index)
+        
+        workers = RECONCILE_WORKERS if workers is None else workers
+        if workers > 1 and len(books_invoices) + len(self.gstr2b_invoices) >= PARALLEL_MIN_INVOICES:
+            try:
+                self._build_parallel(gstr2b_index, workers)
+                return
+            except BrokenProcessPool as e:
+                print(f"[RECONCILE] Worker pool failed ({e}), reconciling in-process", file=sys.stderr)
+                _reset_process_pool()
+        
+        keys = set(self._gstr2b_by_key) | set(self._books_by_key)
+        for key in keys:
+            self._reconcile_key(key)
+        for partition in {self._partition(key) for key in keys}:
+            self._rematch_partition(partition)
+    
+    def _build_parallel(self, gstr2b_index: GSTR2BIndex, workers: int):
+        """
+        Initial build with each supplier GSTIN reconciled in a worker process.
+        
+        Matching never crosses GSTINs, so partitions are independent. They
+        are packed largest first into 2 x workers balanced batches, each
+        reconciled by a serial IncrementalReconciler over its own invoices,
+        and the returned state is merged by global position, so the result
+        is identical to an in-process build. Nothing is merged unless every
+        batch succeeds.
+        """
+        books_by_gstin = defaultdict(list)
+        for index, key in self._books_keys.items():
+            books_by_gstin[key[0]].append(index)
+        gstr2b_by_gstin = gstr2b_index.by_gstin
+        
+        sizes = {
+            gstin: len(books_by_gstin.get(gstin, ())) + len(gstr2b_by_gstin.get(gstin, ()))
+            for gstin in set(books_by_gstin) | set(gstr2b_by_gstin)
+        }
+        batches = [([], []) for _ in range(min(2 * workers, len(sizes)))]
+        loads = [(0, i) for i in range(len(batches))]
+        for gstin in sorted(sizes, key=lambda gstin: (-sizes[gstin], gstin)):
+            load, i = heapq.heappop(loads)
+            batches[i][0].extend(books_by_gstin.get(gstin, ()))
+            batches[i][1].extend(gstr2b_by_gstin.get(gstin, ()))
+            heapq.heappush(loads, (load + sizes[gstin], i))
+        
+        pool = _process_pool()
+        futures = []
+        for books_positions, gstr2b_positions in batches:
+            # Positions stay ascending so each batch sees invoices in input order
+            books_positions.sort()
+            gstr2b_positions.sort()
+            futures.append(pool.submit(
+                _reconcile_batch,
+                self.engine,
+                [self.books_invoices[i] for i in books_positions],
+                books_positions,
+                [self.gstr2b_invoices[i] for i in gstr2b_positions],
+                gstr2b_positions
+            ))
+        states = [future.result() for future in futures]
+        
+        for state in states:
+            for index, result in state["books_results"].items():
+                self._set_books_result(index, result)
+            self._gstr2b_unmatched.update(state["gstr2b_unmatched"])
+            for partition, positions in state["leftover_books"].items():
+                self._leftover_books[partition].update(positions)
+            for partition, positions in state["leftover_gstr2b"].items():
+                self._leftover_gstr2b[partition].update(positions)
+            self._assignments.update(state["assignments"])
+    
+    def apply_changes(self, changes: List[Dict]) -> Dict:
+        """
+        Apply per-invoice field edits and recompute the affected pairs.
+        
+        Args:
+            changes: [{"index": books invoice position, "fields": {field: value}}]
+        
+        Returns:
+            Only the result rows that changed, plus the updated summary
+        """
+        for change in changes:
+            index = change.get("index")
+            if not isinstance(index, int) or not 0 <= index < len(self.books_invoices):
+                raise ValueError(f"Invalid invoice index: {index}")
+            if not isinstance(change.get("fields"), dict):
+                raise ValueError(f"Invoice {index}: 'fields' must be an object")
+        
+        affected_keys: Set[MatchKey] = set()
+        changed_books: Set[int] = set()
+        changed_gstr2b: Set[int] = set()
+        
+        for change in changes:
+            index = change["index"]
+            old_key = self._unregister(index)
+            self.books_invoices[index].update(change["fields"])
+            new_key = self._register(index)
+            
+            affected_keys.update(key for key in (old_key, new_key) if key is not None)
+            changed_books.add(index)
+        
+        for key in affected_keys:
+            books_changed, gstr2b_changed = self._reconcile_key(key)
+            changed_books |= books_changed
+            changed_gstr2b |= gstr2b_changed
+        
+        for partition in {self._partition(key) for key in affected_keys}:
+            books_changed, gstr2b_changed = self._rematch_partition(partition)
+            changed_books |= books_changed
+            changed_gstr2b |= gstr2b_changed
+        
+        return {
+            "books_reconciliation": [
+                {"index": index, "result": self._books_results.get(index)}
+                for index in sorted(changed_books)
+            ],
+            # result is None when the GSTR-2B invoice is now matched
+            "gstr2b_unmatched": [
+                {"index": index, "result": self._gstr2b_unmatched.get(index)}
+                for index in sorted(changed_gstr2b)
+            ],
+            "summary": self.summary()
+        }
+    
+    def summary(self) -> Dict:
+        return self.engine.summary_from_counts(
+            dict(self._status_counts),
+            len(self._gstr2b_unmatched),
+            len(self.books_invoices) - self.duplicates_skipped,
+            len(self.gstr2b_invoices),
+            self.duplicates_skipped,
+            self.engine.assignment_quality(self._assignments.values())
+        )
+    
+    def result(self) -> Dict:
+        """
+        Full reconciliation in the same shape as GSTRReconciliationEngine.reconcile
+        (invoices referenced by index; see GSTRReconciliationEngine.expand_reconciliation)
+        """
+        return {
+            "status": "completed",
+            "summary": self.summary(),
+            "books_reconciliation": [self._books_results[i] for i in sorted(self._books_results)],
+            "gstr2b_unmatched": [self._gstr2b_unmatched[i] for i in sorted(self._gstr2b_unmatched)],
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _register(self, index: int) -> Optional[MatchKey]:
+        """Index a books invoice; returns its match key if it takes part in matching"""
+        invoice = self.books_invoices[index]
+        
+        if invoice.get("status") == "duplicate":
+            self.duplicates_skipped += 1
+            return None
+        
+        if not self.engine.is_reconcilable(invoice):
+            self._set_books_result(index, self.engine.invalid_result(invoice, index))
+            return None
+        
+        key = self.engine.match_key(invoice)
+        self._books_keys[index] = key
+        positions = self._books_by_key[key]
+        positions.append(index)
+        positions.sort()
+        return key
+    
+    def _unregister(self, index: int) -> Optional[MatchKey]:
+        invoice = self.books_invoices[index]
+        if invoice.get("status") == "duplicate":
+            self.duplicates_skipped -= 1
+        
+        self._set_books_result(index, None)
+        
+        key = self._books_keys.pop(index, None)
+        if key is not None:
+            self._leftover_books[self._partition(key)].discard(index)
+            self._books_by_key[key].remove(index)
+            if not self._books_by_key[key]:
+                del self._books_by_key[key]
+        return key
+    
+    @staticmethod
+    def _partition(key: MatchKey) -> PartitionKey:
+        return key[0], key[2]
+    
+    def _reconcile_key(self, key: MatchKey) -> Tuple[Set[int], Set[int]]:
+        """
+        Re-pair one key group on the exact key; returns the books and GSTR-2B
+        positions whose result changed. Leftovers are only recorded here,
+        their results come from _rematch_partition.
+        """
+        books_positions = self._books_by_key.get(key, [])
+        gstr2b_positions = self._gstr2b_by_key.get(key, [])
+        leftover_books = self._leftover_books[self._partition(key)]
+        leftover_gstr2b = self._leftover_gstr2b[self._partition(key)]
+        changed_books: Set[int] = set()
+        changed_gstr2b: Set[int] = set()
+        
+        assignment = self.engine.assign_key_group(
+            self.books_invoices, self.gstr2b_invoices, books_positions, gstr2b_positions
+        )
+        pairs = self._set_assignment(key, assignment)
+        
+        for books_index in books_positions:
+            gstr2b_index = pairs.get(books_index)
+            if gstr2b_index is None:
+                leftover_books.add(books_index)
+                continue
+            
+            leftover_books.discard(books_index)
+            result = self.engine.pair_result(
+                self.books_invoices[books_index], self.gstr2b_invoices[gstr2b_index], books_index, gstr2b_index
+            )
+            if self._books_results.get(books_index) != result:
+                self._set_books_result(books_index, result)
+                changed_books.add(books_index)
+        
+        matched_gstr2b = set(pairs.values())
+        for gstr2b_index in gstr2b_positions:
+            if gstr2b_index not in matched_gstr2b:
+                leftover_gstr2b.add(gstr2b_index)
+                continue
+            
+            leftover_gstr2b.discard(gstr2b_index)
+            if self._gstr2b_unmatched.pop(gstr2b_index, None) is not None:
+                changed_gstr2b.add(gstr2b_index)
+        
+        return changed_books, changed_gstr2b
+    
+    def _rematch_partition(self, partition: PartitionKey) -> Tuple[Set[int], Set[int]]:
+        """Rerun the tolerance pass over one partition's exact-pass leftovers"""
+        books_positions = sorted(self._leftover_books.get(partition, ()))
+        gstr2b_positions = sorted(self._leftover_gstr2b.get(partition, ()))
+        changed_books: Set[int] = set()
+        changed_gstr2b: Set[int] = set()
+        
+        pairs = {}
+        assignment = None
+        if books_positions and gstr2b_positions:
+            assignment = self.engine.tolerance_assignment(
+                [(index, self.books_invoices[index]) for index in books_positions],
+                [(index, self.gstr2b_invoices[index]) for index in gstr2b_positions]
+            )
+            pairs = {
+                books_index: (gstr2b_index, similarity)
+                for books_index, gstr2b_index, similarity in assignment["pairs"]
+            }
+        self._set_assignment(partition, assignment)
+        
+        for books_index in books_positions:
+            books_invoice = self.books_invoices[books_index]
+            if books_index in pairs:
+                gstr2b_index, similarity = pairs[books_index]
+                result = self.engine.tolerance_pair_result(
+                    books_invoice, self.gstr2b_invoices[gstr2b_index], books_index, gstr2b_index, similarity
+                )
+            else:
+                result = self.engine.missing_in_gstr2b_result(books_invoice, books_index)
+            
+            if self._books_results.get(books_index) != result:
+                self._set_books_result(books_index, result)
+                changed_books.add(books_index)
+        
+        matched_gstr2b = {gstr2b_index for gstr2b_index, _ in pairs.values()}
+        for gstr2b_index in gstr2b_positions:
+            if gstr2b_index in matched_gstr2b:
+                if self._gstr2b_unmatched.pop(gstr2b_index, None) is not None:
+                    changed_gstr2b.add(gstr2b_index)
+            elif gstr2b_index not in self._gstr2b_unmatched:
+                self._gstr2b_unmatched[gstr2b_index] = self.engine.missing_in_books_result(
+                    self.gstr2b_invoices[gstr2b_index], gstr2b_index
+                )
+                changed_gstr2b.add(gstr2b_index)
+        
+        return changed_books, changed_gstr2b
+    
+    def _set_assignment(self, group: tuple, assignment: Optional[Dict]):
+        """Record a group's assignment quality; returns its pairs"""
+        if not assignment:
+            self._assignments.pop(group, None)
+            return {}
+        quality = {name: value for name, value in assignment.items() if name != "pairs"}
+        # Groups without a choice (nearly all exact keys) score nothing;
+        # keeping them out keeps summary() cheap
+        if any(quality.values()):
+            self._assignments[group] = quality
+        else:
+            self._assignments.pop(group, None)
+        return assignment["pairs"]
+    
+    def _set_books_result(self, index: int, result: Optional[Dict]):
+        previous = self._books_results.pop(index, None)
+        if previous is not None:
+            self._status_counts[previous["status"]] -= 1
+            if not self._status_counts[previous["status"]]:
+                del self._status_counts[previous["status"]]
+        
+        if result is not None:
+            self._books_results[index] = result
+            self._status_counts[result["status"]] = self._status_counts.get(result["status"], 0) + 1
+
+
+def _reconcile_batch(
+    engine: GSTRReconciliationEngine,
+    books_invoices: List[Dict],
+    books_positions: List[int],
+    gstr2b_invoices: List[Dict],
+    gstr2b_positions: List[int]
+) -> Dict:
+    """
+    Worker task for IncrementalReconciler._build_parallel: reconcile some
+    GSTIN partitions and return the reconciler state in global positions.
+    """
+    reconciler = IncrementalReconciler(books_invoices, GSTR2BIndex.from_invoices(gstr2b_invoices), engine, workers=1)
+    
+    def remap(result: Dict) -> Dict:
+        if result["books_index"] is not None:
+            result["books_index"] = books_positions[result["books_index"]]
+        if result["gstr2b_index"] is not None:
+            result["gstr2b_index"] = gstr2b_positions[result["gstr2b_index"]]
+        return result
+    
+    return {
+        "books_results": {books_positions[i]: remap(result) for i, result in reconciler._books_results.items()},
+        "gstr2b_unmatched": {gstr2b_positions[i]: remap(result) for i, result in reconciler._gstr2b_unmatched.items()},
+        "leftover_books": {
+            partition: {books_positions[i] for i in positions}
+            for partition, positions in reconciler._leftover_books.items() if positions
+        },
+        "leftover_gstr2b": {
+            partition: {gstr2b_positions[i] for i in positions}
+            for partition, positions in reconciler._leftover_gstr2b.items() if positions
+        },
+        "assignments": reconciler._assignments
+    }
@@ -0,0 +1,93 @@
+import re
+
+# Invoice numbers as OCR'd from bills differ from the GSTR-2B values in
+# predictable ways: look-alike characters (O/0, I/1), punctuation, a series
+# prefix such as "INV/" on one side only, and the fiscal year ("24-25",
+# "2024-25", "FY24-25") embedded or dropped. normalize_invoice_number folds
+# those away, and key_similarity scores what is left.
+
+# Prefixes that label the document rather than number it; longest first
+DOCUMENT_PREFIXES = ("TAXINVOICE", "INVOICE", "INVNO", "BILLNO", "INV", "BILL", "NO")
+
+# Consecutive years only ("24-25", "2024-25", "2024/2025"), so ranges that are
+# part of the number itself ("12-34") are left alone
+FISCAL_YEAR_PATTERN = re.compile(r"(?:FY)?(?<!\d)((?:20)?\d{2})[-/]((?:20)?\d{2})(?!\d)")
+
+_LOOK_ALIKES = str.maketrans({"O": "0", "I": "1"})
+# Prefixes are compared with digits read back as letters, so an OCR'd "1NV" still counts
+_AS_LETTERS = str.maketrans({"0": "O", "1": "I"})
+
+
+def _strip_fiscal_year(match: re.Match) -> str:
+    start, end = int(match.group(1)[-2:]), int(match.group(2)[-2:])
+    return "" if end == (start + 1) % 100 else match.group(0)
+
+
+def _has_prefix(text: str, prefix: str) -> bool:
+    return len(text) > len(prefix) and text[:len(prefix)].translate(_AS_LETTERS) == prefix
+
+
+def _strip_prefixes(text: str) -> str:
+    """
+    Drop document labels, which can stack ("Tax Invoice No."). A label only
+    counts when digits or another label follow, so series letters such as
+    "NOTE5" survive.
+    """
+    for prefix in DOCUMENT_PREFIXES:
+        if _has_prefix(text, prefix):
+            rest = text[len(prefix):]
+            if rest[0].isdigit() or any(_has_prefix(rest, other) for other in DOCUMENT_PREFIXES):
+                return _strip_prefixes(rest)
+    return text
+
+
+def normalize_invoice_number(value) -> str:
+    """Canonical comparison key for an invoice number ("" if there is none)"""
+    if value is None:
+        return ""
+    text = str(value).upper().strip()
+    text = FISCAL_YEAR_PATTERN.sub(_strip_fiscal_year, text)
+    text = "".join(ch for ch in text if ch.isalnum())
+    text = _strip_prefixes(text).translate(_LOOK_ALIKES)
+    return text.lstrip("0") or ("0" if text else "")
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance"""
+    if a == b:
+        return 0
+    # Shared leading and trailing characters never change the distance;
+    # invoice numbers of one supplier mostly share a series prefix
+    start = 0
+    limit = min(len(a), len(b))
+    while start < limit and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < limit - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a)
+    
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def key_similarity(key_a: str, key_b: str) -> float:
+    """1.0 for equal normalized keys, else 1 - edit distance / longer key length"""
+    if not key_a or not key_b:
+        return 0.0
+    if key_a == key_b:
+        return 1.0
+    return 1.0 - edit_distance(key_a, key_b) / max(len(key_a), len(key_b))
@@ -0,0 +1,133 @@
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from app.utils.dates import date_ordinal
+
+# Fields every pipeline stage reads. They live in __slots__ rather than a
+# per-invoice dict; anything else the extractor returns (items, supplier
+# name, raw text preview, ...) goes to a small overflow dict.
+FIELDS = (
+    "file", "supplier_gstin", "invoice_number", "invoice_date", "document_type",
+    "taxable_value", "cgst", "sgst", "igst", "total_amount",
+    "expense_category", "itc_eligibility", "gstr2b_section", "status", "error",
+    "page_start", "page_end", "duplicate_of", "source"
+)
+
+# Low-cardinality strings repeated across thousands of invoices; interned
+# so every record shares one copy
+INTERNED_FIELDS = frozenset({
+    "supplier_gstin", "document_type", "expense_category", "gstr2b_section", "status", "source"
+})
+
+_FIELD_SET = frozenset(FIELDS)
+
+
+class InvoiceRecord(MutableMapping):
+    """
+    Compact invoice used by extraction, reconciliation and Excel generation.
+    
+    Behaves as a mutable mapping, so code written against invoice dicts
+    (inv.get(...), inv[...] = ..., inv.update(...)) works unchanged. Unset
+    fields are simply absent, as they would be in a dict. Convert with
+    to_dict() only when the invoice leaves the service (API responses,
+    hashing); plain_json() does that for JSON encoders.
+    
+    invoice_date is also kept as an integer ordinal (date_ordinal), parsed
+    whenever the date is set, so matchers compare dates without re-parsing.
+    """
+    
+    __slots__ = FIELDS + ("_extra", "_date_ordinal")
+    
+    def __init__(self, data: Optional[Dict] = None):
+        self._extra = None
+        self._date_ordinal = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+    
+    @classmethod
+    def from_dict(cls, data) -> "InvoiceRecord":
+        return data if isinstance(data, cls) else cls(data)
+    
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return self._extra.get(key, default) if self._extra else default
+    
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            elif key == "invoice_date":
+                self._date_ordinal = date_ordinal(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if key == "invoice_date":
+                self._date_ordinal = None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+    
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+    
+    def __iter__(self) -> Iterator[str]:
+        for name in FIELDS:
+            if hasattr(self, name):
+                yield name
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        return sum(1 for name in FIELDS if hasattr(self, name)) + len(self._extra or ())
+    
+    @property
+    def date_ordinal(self) -> Optional[int]:
+        return self._date_ordinal
+    
+    def __repr__(self) -> str:
+        return f"InvoiceRecord({self.to_dict()!r})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in FIELDS if hasattr(self, name)}
+        if self._extra:
+            data.update(self._extra)
+        return data
+    
+    def copy(self) -> "InvoiceRecord":
+        return InvoiceRecord(self)
+
+
+def as_records(invoices: Iterable[Dict]) -> List[InvoiceRecord]:
+    """Convert invoice dicts at ingest (records pass through unchanged)"""
+    return [InvoiceRecord.from_dict(invoice) for invoice in invoices]
+
+
+def plain_json(value):
+    """`default` hook for JSON encoders: records become dicts, anything else str()"""
+    if isinstance(value, InvoiceRecord):
+        return value.to_dict()
+    return str(value)
@@ -0,0 +1,41 @@
+import math
+import random
+from typing import Optional
+
+# Latency shapes the stub backends (OCR, Gemini) can simulate. Real service
+# times are long-tailed, so lognormal is the one to use for capacity runs;
+# uniform keeps the original "latency +/- jitter" behaviour.
+DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+
+def sample_delay_ms(
+    distribution: str,
+    latency_ms: float,
+    jitter_ms: float = 0.0,
+    rng: Optional[random.Random] = None
+) -> float:
+    """
+    One simulated service time in milliseconds, never negative.
+
+    latency_ms is the mean; jitter_ms is the half-width for uniform and the
+    standard deviation for normal and lognormal. exponential only uses the mean.
+    """
+    rng = rng or random
+    if latency_ms <= 0:
+        return 0.0
+    if distribution == "constant":
+        return latency_ms
+    if distribution == "uniform":
+        return max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms))
+    if distribution == "normal":
+        return max(0.0, rng.gauss(latency_ms, jitter_ms))
+    if distribution == "lognormal":
+        if jitter_ms <= 0:
+            return latency_ms
+        # Parameters of the underlying normal giving this mean and deviation
+        sigma_squared = math.log(1 + (jitter_ms / latency_ms) ** 2)
+        mu = math.log(latency_ms) - sigma_squared / 2
+        return rng.lognormvariate(mu, math.sqrt(sigma_squared))
+    if distribution == "exponential":
+        return rng.expovariate(1.0 / latency_ms)
+    raise ValueError(f"Unknown latency distribution: {distribution} (expected one of {', '.join(DISTRIBUTIONS)})")
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+# Record/replay layer for Gemini generate_content calls.
+#
+# GEMINI_RECORD_MODE:
+#   off    - call Gemini directly (default)
+#   record - call Gemini and store every prompt hash + response on disk
+#   replay - serve stored responses only, never touching the network
+#
+# Replay latency is injected with GEMINI_REPLAY_LATENCY_MS (mean) and
+# GEMINI_REPLAY_JITTER_MS (uniform +/- spread) so perf runs behave like
+# the real API without spending quota.
+
+DEFAULT_RECORDINGS_DIR = Path(__file__).resolve().parent.parent / "data" / "llm_recordings"
+
+
+class ReplayMissError(Exception):
+    """Raised in replay mode when no recording exists for a prompt"""
+
+
+class StoredResponse:
+    """Minimal stand-in for the SDK response object (only `.text` is used)"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def prompt_hash(model: str, prompt: str) -> str:
+    """Stable key for a (model, prompt) pair"""
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def contents_to_text(contents) -> str:
+    """Flatten the `contents` argument of generate_content into prompt text"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        if "parts" in contents:
+            return "".join(contents_to_text(part) for part in contents["parts"])
+        return contents.get("text") or ""
+    if isinstance(contents, (list, tuple)):
+        return "".join(contents_to_text(item) for item in contents)
+    text = getattr(contents, "text", None)
+    if text is not None:
+        return text
+    parts = getattr(contents, "parts", None)
+    if parts is not None:
+        return contents_to_text(parts)
+    return str(contents)
+
+
+class LLMResponseStore:
+    """On-disk store of recorded responses, one JSON file per prompt hash"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv("LLM_RECORDINGS_DIR") or DEFAULT_RECORDINGS_DIR)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, model: str, prompt: str) -> Optional[Dict]:
+        path = self._path(prompt_hash(model, prompt))
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, model: str, prompt: str, response_text: str, latency_ms: Optional[float] = None):
+        key = prompt_hash(model, prompt)
+        record = {
+            "prompt_hash": key,
+            "model": model,
+            "response_text": response_text,
+            "latency_ms": latency_ms,
+            "prompt_chars": len(prompt),
+            "recorded_at": datetime.now().isoformat()
+        }
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp_path = self._path(key).with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._path(key))
+
+    def count(self) -> int:
+        if not self.directory.exists():
+            return 0
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+
+class _RecordingModels:
+    def __init__(self, models, store: LLMResponseStore):
+        self._models = models
+        self._store = store
+
+    def generate_content(self, model: str, contents, **kwargs):
+        started = time.perf_counter()
+        response = self._models.generate_content(model=model, contents=contents, **kwargs)
+        latency_ms = (time.perf_counter() - started) * 1000
+        try:
+            self._store.put(model, contents_to_text(contents), response.text, latency_ms)
+        except Exception as e:
+            print(f"[LLM_RECORDER] Failed to record response: {str(e)}", file=sys.stderr)
+        return response
+
+
+class RecordingClient:
+    """Wraps a real genai.Client and records every generate_content response"""
+
+    def __init__(self, client, store: LLMResponseStore):
+        self._client = client
+        self.models = _RecordingModels(client.models, store)
+
+
+class _ReplayModels:
+    def __init__(self, store: LLMResponseStore, latency_ms: float, jitter_ms: float):
+        self._store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def generate_content(self, model: str, contents, **kwargs):
+        prompt = contents_to_text(contents)
+        record = self._store.get(model, prompt)
+        if record is None:
+            raise ReplayMissError(f"No recorded response for prompt {prompt_hash(model, prompt)[:12]}")
+
+        delay_ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            # Blocking sleep on purpose: the real SDK call blocks its worker thread too
+            time.sleep(delay_ms / 1000.0)
+
+        return StoredResponse(record["response_text"])
+
+
+class ReplayClient:
+    """Offline client that serves recorded responses with injected latency"""
+
+    def __init__(self, store: LLMResponseStore, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.models = _ReplayModels(store, latency_ms, jitter_ms)
+
+
+def get_record_mode() -> str:
+    mode = os.getenv("GEMINI_RECORD_MODE", "off").strip().lower()
+    return mode if mode in ("off", "record", "replay") else "off"
+
+
+_store: Optional[LLMResponseStore] = None
+_wrapped_clients = {}
+_lock = threading.Lock()
+
+
+def get_response_store() -> LLMResponseStore:
+    global _store
+    if _store is None:
+        _store = LLMResponseStore()
+    return _store
+
+
+def get_llm_client(api_key: Optional[str] = None):
+    """
+    Return the client DocumentProcessor should call, honouring GEMINI_RECORD_MODE.
+
+    Replay mode works without an API key; the other modes return None when
+    no key is configured, same as get_gemini_client.
+    """
+    mode = get_record_mode()
+
+    with _lock:
+        if mode == "replay":
+            if "replay" not in _wrapped_clients:
+                _wrapped_clients["replay"] = ReplayClient(
+                    get_response_store(),
+                    latency_ms=float(os.getenv("GEMINI_REPLAY_LATENCY_MS", "0")),
+                    jitter_ms=float(os.getenv("GEMINI_REPLAY_JITTER_MS", "0"))
+                )
+            return _wrapped_clients["replay"]
+
+    # Imported here so replay mode never needs the Gemini SDK
+    from app.services.gemini_client import get_gemini_client
+    client = get_gemini_client(api_key)
+    if client is None or mode == "off":
+        return client
+
+    with _lock:
+        key = ("record", id(client))
+        if key not in _wrapped_clients:
+            _wrapped_clients[key] = RecordingClient(client, get_response_store())
+        return _wrapped_clients[key]
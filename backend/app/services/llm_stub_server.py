@@ -0,0 +1,206 @@
+"""
+Local stub of the Gemini generateContent REST endpoint.
+
+Serves responses from the LLMResponseStore so the real SDK (or anything
+else speaking the REST API) can run fully offline:
+
+    python -m app.services.llm_stub_server --port 8765 --latency-ms 800 --jitter-ms 300
+
+and point the backend at it with GEMINI_BASE_URL=http://127.0.0.1:8765
+(any non-empty GEMINI_API_KEY works). --latency-dist picks the shape of the
+injected delay (see app.services.latency_model); lognormal gives the long
+tail real API calls have.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from app.services.llm_recorder import LLMResponseStore, contents_to_text, prompt_hash
+from app.services.latency_model import DISTRIBUTIONS, sample_delay_ms
+
+
+def synthetic_invoice_json(key: str) -> str:
+    """Deterministic, plausible invoice extraction for prompts with no recording"""
+    rng = random.Random(key)
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    gstin = (
+        f"{rng.randint(1, 37):02d}"
+        + "".join(rng.choice(letters) for _ in range(5))
+        + f"{rng.randint(0, 9999):04d}"
+        + rng.choice(letters)
+        + "1Z"
+        + rng.choice(letters + "0123456789")
+    )
+    taxable = round(rng.uniform(500, 200000), 2)
+    inter_state = rng.random() < 0.3
+    tax = round(taxable * 0.18, 2)
+    return json.dumps({
+        "supplier_gstin": gstin,
+        "invoice_number": f"INV/{rng.randint(1, 99999):05d}",
+        "invoice_date": f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "document_type": "Invoice",
+        "taxable_value": taxable,
+        "cgst": 0 if inter_state else round(tax / 2, 2),
+        "sgst": 0 if inter_state else round(tax / 2, 2),
+        "igst": tax if inter_state else 0,
+        "invoice_amount": taxable,
+        "tax_amount": tax,
+        "total_amount": round(taxable + tax, 2),
+        "expense_category": rng.choice(["Office Supplies", "Travel", "Software", "Rent", "Utilities"]),
+        "gstr2b_section": None,
+        "itc_eligibility": True,
+        "items": [],
+        "status": "valid"
+    })
+
+
+class StubConfig:
+    def __init__(
+        self,
+        store: LLMResponseStore,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        on_miss: str = "synthetic",
+        latency_dist: str = "uniform"
+    ):
+        self.store = store
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.on_miss = on_miss
+        self.latency_dist = latency_dist
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "injected_errors": 0}
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    config: StubConfig = None
+
+    def log_message(self, format, *args):
+        # Keep stderr quiet under load; stats are available on GET /stats
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, {**self.config.stats, "recordings": self.config.store.count()})
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+
+    def do_POST(self):
+        # Expected path: /v1beta/models/{model}:generateContent
+        path = self.path.split("?", 1)[0]
+        if not path.endswith(":generateContent") or "/models/" not in path:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        config = self.config
+        config.stats["requests"] += 1
+        model = path.rsplit("/models/", 1)[1][: -len(":generateContent")]
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"code": 400, "message": "Invalid JSON body", "status": "INVALID_ARGUMENT"}})
+            return
+
+        delay_ms = sample_delay_ms(config.latency_dist, config.latency_ms, config.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+        if config.error_rate and random.random() < config.error_rate:
+            config.stats["injected_errors"] += 1
+            self._send_json(429, {"error": {"code": 429, "message": "Injected quota error", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        prompt = contents_to_text(body.get("contents", []))
+        record = config.store.get(model, prompt)
+        if record is not None:
+            config.stats["hits"] += 1
+            text = record["response_text"]
+        else:
+            config.stats["misses"] += 1
+            if config.on_miss != "synthetic":
+                self._send_json(404, {"error": {
+                    "code": 404,
+                    "message": f"No recording for prompt {prompt_hash(model, prompt)[:12]}",
+                    "status": "NOT_FOUND"
+                }})
+                return
+            text = synthetic_invoice_json(prompt_hash(model, prompt))
+
+        self._send_json(200, {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4
+            },
+            "modelVersion": model
+        })
+
+
+def create_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    store: Optional[LLMResponseStore] = None,
+    latency_ms: float = 0.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    on_miss: str = "synthetic",
+    latency_dist: str = "uniform"
+) -> ThreadingHTTPServer:
+    """Build (but do not start) a stub server; call serve_forever() on the result"""
+    config = StubConfig(store or LLMResponseStore(), latency_ms, jitter_ms, error_rate, on_miss, latency_dist)
+    handler = type("ConfiguredGeminiStubHandler", (GeminiStubHandler,), {"config": config})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini generateContent stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--recordings-dir", default=None, help="Defaults to LLM_RECORDINGS_DIR")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Half-width (uniform) or standard deviation (normal, lognormal)")
+    parser.add_argument("--latency-dist", choices=DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--on-miss", choices=["synthetic", "error"], default="synthetic")
+    args = parser.parse_args()
+
+    server = create_stub_server(
+        args.host,
+        args.port,
+        LLMResponseStore(args.recordings_dir),
+        args.latency_ms,
+        args.jitter_ms,
+        args.error_rate,
+        args.on_miss,
+        args.latency_dist
+    )
+    print(f"[LLM_STUB] Serving generateContent on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
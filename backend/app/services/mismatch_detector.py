@@ -1,7 +1,10 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Hashable, List, Tuple
 import pandas as pd
 from difflib import SequenceMatcher
 from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.incremental_reconciler import IncrementalReconciler
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.assignment import assign
 
 class MismatchDetector:
     """Handles detection of mismatches between extracted invoices and GSTR2B"""
@@ -9,31 +12,53 @@ class MismatchDetector:
     def __init__(self):
         self.similarity_threshold = 0.85  # For fuzzy matching
         self.reconciliation_engine = GSTRReconciliationEngine()
-
     
-    def detect_mismatches(self, extracted_invoices: List[Dict], gstr2b_data: Dict) -> Dict:
+    def detect_mismatches(self, extracted_invoices: List[Dict], gstr2b_data) -> Dict:
         """
         Compare extracted invoices with GSTR2B and identify mismatches
         
         Args:
             extracted_invoices: List of extracted invoice data
-            gstr2b_data: GSTR2B data containing reported invoices
+            gstr2b_data: GSTR2B data containing reported invoices, or its prebuilt GSTR2BIndex
         
         Returns:
             Dictionary with mismatch analysis and report cards
         """
-        gstr2b_invoices = self._parse_gstr2b(gstr2b_data)
+        index = GSTR2BIndex.from_data(gstr2b_data)
+        gstr2b_invoices = index.invoices
         
         matched_pairs = []
         unmatched_extracted = []
         unmatched_gstr2b = []
         mismatch_details = []
         
-        # Track which GSTR2B invoices have been matched
-        matched_gstr2b_indices = set()
+        # Linked duplicate documents would double-count the same bill
+        duplicates_skipped = sum(1 for inv in extracted_invoices if inv.get("status") == "duplicate")
+        
+        # Score each extracted invoice against its blocked candidates; pairs
+        # above the threshold form a sparse graph solved as an assignment
+        candidates = {}
+        scored = {}
+        blocks = self._candidate_blocks(index) if self.similarity_threshold > 0.8 else None
+        for position, extracted in enumerate(extracted_invoices):
+            if extracted.get("status") in ("duplicate", "error"):
+                continue
+            
+            edges = []
+            for idx in self._candidate_indices(extracted, index, blocks):
+                score, mismatches = self._calculate_match_score(extracted, gstr2b_invoices[idx])
+                if score >= self.similarity_threshold:
+                    edges.append((idx, score))
+                    scored[position, idx] = (score, mismatches)
+            candidates[position] = edges
         
-        # Compare each extracted invoice with GSTR2B invoices
-        for extracted in extracted_invoices:
+        assignment = assign(candidates)
+        matched_gstr2b_indices = set(assignment["pairs"].values())
+        
+        for position, extracted in enumerate(extracted_invoices):
+            if extracted.get("status") == "duplicate":
+                continue
+            
             if extracted.get("status") == "error":
                 unmatched_extracted.append({
                     "invoice": extracted,
@@ -41,37 +66,21 @@ class MismatchDetector:
                 })
                 continue
             
-            best_match = None
-            best_score = 0
-            best_index = None
-            
-            # Find best matching GSTR2B invoice
-            for idx, gstr2b in enumerate(gstr2b_invoices):
-                if idx in matched_gstr2b_indices:
-                    continue
-                
-                score, mismatches = self._calculate_match_score(extracted, gstr2b)
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = (gstr2b, mismatches)
-                    best_index = idx
-            
-            if best_score >= self.similarity_threshold:
-                matched_gstr2b_indices.add(best_index)
-                gstr2b, mismatches = best_match
+            idx = assignment["pairs"].get(position)
+            if idx is not None:
+                score, mismatches = scored[position, idx]
                 
                 matched_pairs.append({
                     "extracted": extracted,
-                    "gstr2b": gstr2b,
-                    "match_score": best_score,
+                    "gstr2b": gstr2b_invoices[idx],
+                    "match_score": score,
                     "mismatches": mismatches
                 })
                 
                 if mismatches:
                     mismatch_details.append({
                         "invoice_number": extracted.get("invoice_number", "UNKNOWN"),
-                        "match_score": best_score,
+                        "match_score": score,
                         "issues": mismatches
                     })
             else:
@@ -88,12 +97,20 @@ class MismatchDetector:
         return {
             "status": "completed",
             "summary": {
-                "total_extracted": len(extracted_invoices),
+                "total_extracted": len(extracted_invoices) - duplicates_skipped,
                 "total_gstr2b": len(gstr2b_invoices),
                 "matched": len(matched_pairs),
                 "unmatched_extracted": len(unmatched_extracted),
                 "unmatched_gstr2b": len(unmatched_gstr2b),
-                "mismatch_count": len(mismatch_details)
+                "mismatch_count": len(mismatch_details),
+                "duplicates_skipped": duplicates_skipped,
+                "assignment": {
+                    "method": "optimal",
+                    "match_quality": round(assignment["score"], 4),
+                    "greedy_match_quality": round(assignment["greedy_score"], 4),
+                    "reassigned": assignment["reassigned"],
+                    "oversized_components": assignment["oversized_components"]
+                }
             },
             "matched_pairs": matched_pairs,
             "unmatched_extracted": unmatched_extracted,
@@ -101,91 +118,59 @@ class MismatchDetector:
             "mismatches": mismatch_details
         }
     
-    def reconcile(self, extracted_invoices: List[Dict], gstr2b_data: Dict) -> Dict:
+    def reconcile(self, extracted_invoices: List[Dict], gstr2b_data) -> Dict:
         """
         Perform GSTR-2B reconciliation using deterministic MVP logic.
         
         Args:
             extracted_invoices: List of extracted invoice data from books
-            gstr2b_data: GSTR2B data from GST portal
+            gstr2b_data: GSTR2B data from GST portal, or its prebuilt GSTR2BIndex
         
         Returns:
-            Comprehensive reconciliation results with status, reasons, and actions
+            Comprehensive reconciliation results with status, reasons, and actions;
+            results reference invoices by books_index / gstr2b_index
         """
-        gstr2b_invoices = self._parse_gstr2b_for_reconciliation(gstr2b_data)
-        
-        # Use reconciliation engine for MVP-grade analysis
-        reconciliation_result = self.reconciliation_engine.reconcile(
-            extracted_invoices,
-            gstr2b_invoices
-        )
-        
-        return reconciliation_result
+        return self.build_reconciler(extracted_invoices, gstr2b_data).result()
     
-    def _parse_gstr2b_for_reconciliation(self, gstr2b_data: Dict) -> List[Dict]:
+    def build_reconciler(self, extracted_invoices: List[Dict], gstr2b_data) -> IncrementalReconciler:
         """
-        Parse GSTR2B data into format expected by reconciliation engine.
-        Includes additional fields like document_type, gstr2b_section, itc_eligibility.
+        Reconcile through the GSTR-2B match-key index, keeping it so later
+        per-invoice edits only recompute the pairs they affect.
         """
-        invoices = []
-        
-        # Handle different GSTR2B formats
-        if isinstance(gstr2b_data, dict):
-            if "invoices" in gstr2b_data:
-                invoices = gstr2b_data["invoices"]
-            elif "data" in gstr2b_data:
-                invoices = gstr2b_data["data"].get("invoices", [])
-        elif isinstance(gstr2b_data, list):
-            invoices = gstr2b_data
-        
-        # Normalize invoice format
-        normalized = []
-        for inv in invoices:
-            if isinstance(inv, dict):
-                normalized.append({
-                    "invoice_number": inv.get("inv_no") or inv.get("invoice_number"),
-                    "invoice_date": inv.get("inv_dt") or inv.get("invoice_date"),
-                    "supplier_gstin": inv.get("gstin") or inv.get("supplier_gstin"),
-                    "document_type": inv.get("document_type", "Invoice"),
-                    "taxable_value": float(inv.get("taxable_value", 0)),
-                    "cgst": float(inv.get("cgst", 0)),
-                    "sgst": float(inv.get("sgst", 0)),
-                    "igst": float(inv.get("igst", 0)),
-                    "total_amount": float(inv.get("total_amount", 0)),
-                    "gstr2b_section": inv.get("gstr2b_section", "B2B"),
-                    "itc_eligibility": inv.get("itc_eligibility", True)
-                })
-        
-        return normalized
+        return IncrementalReconciler(
+            extracted_invoices,
+            GSTR2BIndex.from_data(gstr2b_data),
+            self.reconciliation_engine
+        )
     
-    def _parse_gstr2b(self, gstr2b_data: Dict) -> List[Dict]:
-        """Parse GSTR2B data into standardized format"""
-        invoices = []
-        
-        # Handle different GSTR2B formats
-        if isinstance(gstr2b_data, dict):
-            if "invoices" in gstr2b_data:
-                invoices = gstr2b_data["invoices"]
-            elif "data" in gstr2b_data:
-                invoices = gstr2b_data["data"].get("invoices", [])
-        elif isinstance(gstr2b_data, list):
-            invoices = gstr2b_data
+    def _date_key(self, invoice: Dict) -> Hashable:
+        """What _same_date compares: the day ordinal, or the raw value when it does not parse"""
+        ordinal = self.reconciliation_engine._date_ordinal(invoice)
+        return ordinal if ordinal is not None else ("raw", invoice.get("invoice_date"))
+    
+    def _candidate_blocks(self, index: GSTR2BIndex) -> Dict[Tuple[str, Hashable], List[int]]:
+        """GSTR2B positions by (normalized supplier GSTIN, invoice date), ascending"""
+        blocks = {}
+        for idx, invoice in enumerate(index.invoices):
+            gstin = self.reconciliation_engine._normalize_gstin(invoice.get("supplier_gstin"))
+            blocks.setdefault((gstin, self._date_key(invoice)), []).append(idx)
+        return blocks
+    
+    def _candidate_indices(self, extracted: Dict, index: GSTR2BIndex, blocks=None) -> List[int]:
+        """
+        GSTR2B positions worth scoring for one extracted invoice, ascending.
         
-        # Normalize invoice format
-        normalized = []
-        for inv in invoices:
-            if isinstance(inv, dict):
-                normalized.append({
-                    "invoice_number": inv.get("inv_no") or inv.get("invoice_number"),
-                    "invoice_date": inv.get("inv_dt") or inv.get("invoice_date"),
-                    "gstin": inv.get("gstin"),
-                    "invoice_amount": float(inv.get("inv_amt", 0)),
-                    "tax_amount": float(inv.get("tax_amt", 0)),
-                    "total_amount": float(inv.get("total_amt", 0)),
-                    "source": "gstr2b"
-                })
+        GSTIN and date each weigh 0.2 and the other fields at most 0.6, so
+        missing either caps the match score at 0.8. Above that threshold
+        only the same supplier's invoices of the same date can match, and
+        those are exactly the ones scored: the same pairs as scoring every
+        GSTR2B invoice, for any supplier size.
+        """
+        if blocks is None:
+            return list(range(len(index.invoices)))
         
-        return normalized
+        gstin = self.reconciliation_engine._normalize_gstin(extracted.get("supplier_gstin"))
+        return blocks.get((gstin, self._date_key(extracted)), [])
     
     def _calculate_match_score(self, extracted: Dict, gstr2b: Dict) -> Tuple[float, List[str]]:
         """
@@ -207,16 +192,16 @@ class MismatchDetector:
             mismatches.append(f"Invoice number mismatch: {extracted.get('invoice_number')} vs {gstr2b.get('invoice_number')}")
         
         # Date comparison (medium weight)
-        date_score = 1.0 if extracted.get("invoice_date") == gstr2b.get("invoice_date") else 0.0
+        date_score = 1.0 if self._same_date(extracted, gstr2b) else 0.0
         scores.append(date_score * 0.2)
         if date_score < 1.0:
             mismatches.append(f"Date mismatch: {extracted.get('invoice_date')} vs {gstr2b.get('invoice_date')}")
         
         # GSTIN comparison (medium weight)
-        gstin_score = 1.0 if extracted.get("gstin") == gstr2b.get("gstin") else 0.0
+        gstin_score = 1.0 if extracted.get("supplier_gstin") == gstr2b.get("supplier_gstin") else 0.0
         scores.append(gstin_score * 0.2)
         if gstin_score < 1.0:
-            mismatches.append(f"GSTIN mismatch: {extracted.get('gstin')} vs {gstr2b.get('gstin')}")
+            mismatches.append(f"GSTIN mismatch: {extracted.get('supplier_gstin')} vs {gstr2b.get('supplier_gstin')}")
         
         # Amount comparison (high weight, allow 5% variance)
         ext_amount = float(extracted.get("total_amount", 0))
@@ -234,6 +219,14 @@ class MismatchDetector:
         overall_score = sum(scores)
         return overall_score, mismatches
     
+    def _same_date(self, extracted: Dict, gstr2b: Dict) -> bool:
+        """Compare parsed day ordinals, so 05/01/2026 equals 2026-01-05"""
+        extracted_date = self.reconciliation_engine._date_ordinal(extracted)
+        gstr2b_date = self.reconciliation_engine._date_ordinal(gstr2b)
+        if extracted_date is None or gstr2b_date is None:
+            return extracted.get("invoice_date") == gstr2b.get("invoice_date")
+        return extracted_date == gstr2b_date
+    
     def _string_similarity(self, str1: str, str2: str) -> float:
         """Calculate string similarity ratio"""
         return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
@@ -252,7 +245,8 @@ class MismatchDetector:
                 "discrepancies_found": summary["mismatch_count"],
                 "missing_from_gstr2b": summary["unmatched_extracted"],
                 "extra_in_gstr2b": summary["unmatched_gstr2b"],
-                "compliance_status": self._get_compliance_status(summary)
+                "compliance_status": self._get_compliance_status(summary),
+                "assignment": summary.get("assignment")
             },
             "detail": {
                 "mismatches": mismatch_data["mismatches"],
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import string
+from typing import List
+from app.services.latency_model import DISTRIBUTIONS, sample_delay_ms
+
+# OCR_BACKEND=stub replaces rasterizing and tesseract with a delay drawn
+# from the configured distribution and synthetic invoice text, so load tests
+# exercise the full pipeline on machines without tesseract/poppler and
+# without OCR dominating the measurement. Per-page defaults are in the range
+# of tesseract on a 300 dpi A4 scan.
+OCR_BACKEND = os.getenv("OCR_BACKEND", "tesseract").strip().lower()
+OCR_STUB_LATENCY_MS = float(os.getenv("OCR_STUB_LATENCY_MS", "1500"))
+OCR_STUB_JITTER_MS = float(os.getenv("OCR_STUB_JITTER_MS", "500"))
+OCR_STUB_DISTRIBUTION = os.getenv("OCR_STUB_DISTRIBUTION", "lognormal").strip().lower()
+
+if OCR_BACKEND == "stub":
+    if OCR_STUB_DISTRIBUTION not in DISTRIBUTIONS:
+        raise ValueError(f"OCR_STUB_DISTRIBUTION must be one of {', '.join(DISTRIBUTIONS)}")
+    print(
+        f"[OCR] Stub backend: {OCR_STUB_DISTRIBUTION} {OCR_STUB_LATENCY_MS:.0f}ms ±{OCR_STUB_JITTER_MS:.0f}ms per page",
+        file=sys.stderr
+    )
+
+
+def use_stub_ocr() -> bool:
+    return OCR_BACKEND == "stub"
+
+
+def stub_ocr_pages(file_path: str, page_count: int = 1) -> List[str]:
+    """
+    Synthetic OCR text for each page of a document.
+
+    Sleeps the simulated service time per page, holding its OCR pool
+    thread the way pytesseract blocks on its subprocess. The text is seeded by the file's
+    bytes: one invoice per document, so distinct files never look like
+    duplicates and the same file always reads the same.
+    """
+    with open(file_path, "rb") as f:
+        seed = hashlib.sha256(f.read()).hexdigest()
+    rng = random.Random(seed)
+    page_count = max(1, page_count)
+
+    header = _invoice_header(rng)
+    pages = []
+    for page_index in range(page_count):
+        time.sleep(sample_delay_ms(OCR_STUB_DISTRIBUTION, OCR_STUB_LATENCY_MS, OCR_STUB_JITTER_MS) / 1000.0)
+        lines = header if page_index == 0 else [header[0], header[2]]
+        lines = lines + _item_lines(rng, page_index) + [f"Page {page_index + 1} of {page_count}"]
+        pages.append("\n".join(lines))
+    return pages
+
+
+def _invoice_header(rng: random.Random) -> List[str]:
+    letters = string.ascii_uppercase
+    gstin = (
+        f"{rng.randint(1, 37):02d}"
+        + "".join(rng.choice(letters) for _ in range(5))
+        + f"{rng.randint(0, 9999):04d}"
+        + rng.choice(letters)
+        + rng.choice("123456789")
+        + "Z"
+        + rng.choice(letters + string.digits)
+    )
+    supplier = " ".join(rng.choice(["Shree", "Om", "Sai", "Global", "National", "Metro"]) for _ in range(2))
+    return [
+        f"{supplier} Traders Pvt Ltd",
+        "TAX INVOICE",
+        f"GSTIN: {gstin}",
+        f"Invoice No: {rng.choice(['INV', 'TI', 'BILL'])}/24-25/{rng.randint(1, 99999):05d}",
+        f"Invoice Date: {rng.randint(1, 28):02d}-01-2026",
+        f"Bill To: Client {rng.randint(100, 999)}"
+    ]
+
+
+def _item_lines(rng: random.Random, page_index: int) -> List[str]:
+    lines = ["Sr Description HSN Qty Rate Amount"]
+    taxable = 0.0
+    for item in range(rng.randint(3, 12)):
+        quantity = rng.randint(1, 50)
+        rate = round(rng.uniform(10, 5000), 2)
+        taxable += quantity * rate
+        lines.append(
+            f"{page_index * 20 + item + 1} Item {rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {quantity} {rate:.2f} {quantity * rate:.2f}"
+        )
+    tax = round(taxable * 0.09, 2)
+    lines += [f"Taxable Value: {taxable:.2f}", f"CGST @9%: {tax:.2f}", f"SGST @9%: {tax:.2f}", f"Total: {taxable + 2 * tax:.2f}"]
+    return lines
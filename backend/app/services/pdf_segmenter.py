@@ -0,0 +1,94 @@
+import re
+from typing import Dict, List, Optional
+
+# Page-level boundary signals used to split a multi-invoice PDF
+GSTIN_PATTERN = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]\b")
+INVOICE_NO_PATTERN = re.compile(
+    r"(?:invoice|inv|bill)\s*(?:no|number|num|#)\.?\s*[:\-#]?\s*([A-Z0-9][A-Z0-9/\-]{2,})",
+    re.IGNORECASE
+)
+PAGE_MARKER_PATTERN = re.compile(r"\bpage\s*(\d{1,3})\s*(?:of|/)\s*(\d{1,3})\b", re.IGNORECASE)
+
+# Only the top of a page is treated as its header
+HEADER_LINES = 15
+
+
+def _page_signals(text: str) -> Dict:
+    """Extract boundary signals from the header region of one page"""
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    header = "\n".join(lines[:HEADER_LINES])
+
+    gstin_match = GSTIN_PATTERN.search(header.upper())
+    invoice_match = INVOICE_NO_PATTERN.search(header)
+    # Page markers are usually in the footer, so search the whole page
+    page_match = PAGE_MARKER_PATTERN.search(text or "")
+
+    return {
+        "gstin": gstin_match.group(0) if gstin_match else None,
+        "invoice_number": invoice_match.group(1).upper() if invoice_match else None,
+        "page_number": int(page_match.group(1)) if page_match else None,
+        "page_count": int(page_match.group(2)) if page_match else None
+    }
+
+
+def _starts_new_invoice(signals: Dict, current: Dict) -> bool:
+    """Decide whether a page opens a new invoice given the open segment's state"""
+    # Explicit "Page k of N" markers are the strongest signal
+    if signals["page_number"] is not None:
+        return signals["page_number"] == 1
+
+    # The open segment declared its length and has reached it
+    if current["expected_pages"] and current["page_count"] >= current["expected_pages"]:
+        return True
+
+    if signals["invoice_number"] and current["invoice_number"]:
+        return signals["invoice_number"] != current["invoice_number"]
+
+    if signals["gstin"] and current["gstin"]:
+        return signals["gstin"] != current["gstin"]
+
+    return False
+
+
+def segment_pages(page_texts: List[str]) -> List[Dict]:
+    """
+    Split a PDF's pages into invoice segments.
+
+    Args:
+        page_texts: Text of each page, in order
+
+    Returns:
+        List of segments with 1-based start_page/end_page and the joined text
+    """
+    segments = []
+    current: Optional[Dict] = None
+
+    for page_index, text in enumerate(page_texts):
+        signals = _page_signals(text)
+
+        if current is None or _starts_new_invoice(signals, current):
+            current = {
+                "start_page": page_index + 1,
+                "end_page": page_index + 1,
+                "texts": [text],
+                "page_count": 1,
+                "expected_pages": signals["page_count"] if signals["page_number"] == 1 else None,
+                "invoice_number": signals["invoice_number"],
+                "gstin": signals["gstin"]
+            }
+            segments.append(current)
+        else:
+            current["end_page"] = page_index + 1
+            current["texts"].append(text)
+            current["page_count"] += 1
+            current["invoice_number"] = current["invoice_number"] or signals["invoice_number"]
+            current["gstin"] = current["gstin"] or signals["gstin"]
+
+    return [
+        {
+            "start_page": segment["start_page"],
+            "end_page": segment["end_page"],
+            "text": "\n".join(segment["texts"])
+        }
+        for segment in segments
+    ]
@@ -0,0 +1,442 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Set, Tuple
+
+try:
+    import httpx
+    TRANSPORT_ERRORS = (ConnectionError, TimeoutError, httpx.TransportError)
+except ImportError:
+    TRANSPORT_ERRORS = (ConnectionError, TimeoutError)
+
+# google.genai / google.api_core status names for the retryable HTTP codes
+STATUS_NAMES = {
+    "RESOURCE_EXHAUSTED": 429,
+    "TOO_MANY_REQUESTS": 429,
+    "INTERNAL": 500,
+    "INTERNAL_SERVER_ERROR": 500,
+    "BAD_GATEWAY": 502,
+    "UNAVAILABLE": 503,
+    "SERVICE_UNAVAILABLE": 503,
+    "DEADLINE_EXCEEDED": 504,
+    "GATEWAY_TIMEOUT": 504
+}
+
+
+class RetryableAPIError(Exception):
+    """Raised when an API call keeps failing with a retryable status"""
+
+
+class LoopWaiters:
+    """
+    Wake-ups for coroutines waiting on shared limiter state.
+
+    The limiter is a process-wide singleton used from several event loops
+    (the API's, asyncio.run per CLI client, test clients), so it holds no
+    loop-bound primitive of its own: every wait gets a fresh Event on the
+    running loop, and notify() sets them all, thread-safely.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @contextmanager
+    def waiting(self) -> Iterator[asyncio.Event]:
+        """Event set by the next notify(); enter it before checking the guarded state"""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiting.add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._waiting.discard(entry)
+
+    def notify(self):
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        with self._lock:
+            waiting = list(self._waiting)
+            self._waiting.clear()
+        for loop, event in waiting:
+            if loop is current:
+                event.set()
+            else:
+                try:
+                    loop.call_soon_threadsafe(event.set)
+                except RuntimeError:
+                    # That loop has been closed
+                    pass
+
+
+class TokenBucket:
+    """Token bucket holding the per-minute request budget"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or max(1.0, rate_per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """
+        Take the requested number of tokens, waiting until they are available.
+
+        Tokens are reserved up front (the balance may go negative), so
+        callers are served in arrival order without holding a lock while
+        they sleep.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate_per_second if self.tokens < 0 else 0.0
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                # Cancelled while waiting: the request is never sent
+                self.refund(tokens)
+                raise
+
+    def refund(self, tokens: float = 1.0):
+        """Give back a reservation that was not used for a request"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker that holds calls back instead of failing them.
+
+    closed -> open after `failure_threshold` failures in a row,
+    open -> half_open after `reset_timeout` seconds,
+    half_open -> closed on the first success (or back to open on failure).
+
+    While open, callers wait out the timeout; while half-open, one trial
+    call goes through and the rest wait for its outcome.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        # Calls that had to wait for the circuit to close
+        self.waits = 0
+        self._lock = threading.Lock()
+        self._waiters = LoopWaiters()
+
+    def _try_enter(self) -> Tuple[Optional[float], bool]:
+        """(None, is_trial) if the call may go ahead, else (seconds to wait or 0 until the trial ends, False)"""
+        with self._lock:
+            if self.state == "open":
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    return remaining, False
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    return 0.0, False
+                self._trial_in_flight = True
+                return None, True
+            return None, False
+
+    async def before_call(self) -> bool:
+        """Wait until a call may go through; True if it is the half-open trial call"""
+        waited = False
+        while True:
+            with self._waiters.waiting() as event:
+                wait, trial = self._try_enter()
+                if wait is None:
+                    return trial
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self.waits += 1
+                try:
+                    # Timed out at the end of the open period, or woken when a trial ends
+                    await asyncio.wait_for(event.wait(), wait or None)
+                except asyncio.TimeoutError:
+                    pass
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+        self._waiters.notify()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+        self._waiters.notify()
+
+    def record_neutral(self, trial: bool):
+        """The call ended without saying anything about API health; frees the trial slot if it held it"""
+        if not trial:
+            return
+        with self._lock:
+            self._trial_in_flight = False
+        self._waiters.notify()
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side limiter for Gemini calls shared by every job in the process.
+
+    Combines:
+    - a token bucket for the per-minute request quota
+    - AIMD concurrency control (additive increase on success,
+      multiplicative decrease on 429, once per overloaded window)
+    - jittered exponential backoff on 429/5xx responses
+    - a circuit breaker that holds calls back while the API is down
+
+    Safe to share between event loops: state is guarded by thread locks and
+    waits use per-loop events (see LoopWaiters).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        initial_concurrency: int = 2,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.bucket = TokenBucket(requests_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.min_concurrency = 1
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency_limit = float(min(max(1, initial_concurrency), self.max_concurrency))
+        self.in_flight = 0
+        # When the limit was last halved; throttled calls sent before then
+        # belong to the same overloaded window and do not halve it again
+        self._decreased_at = float("-inf")
+        self._slot_lock = threading.Lock()
+        self._slot_waiters = LoopWaiters()
+
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.stats = {
+            "calls": 0,
+            "successes": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "retries": 0
+        }
+        # Calls run on several event loops and worker threads
+        self._stats_lock = threading.Lock()
+
+    async def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking API call in a worker thread under the limiter.
+
+        Retries 429/5xx responses with jittered exponential backoff and
+        re-raises any other exception unchanged.
+        """
+        self._count("calls")
+
+        for attempt in range(self.max_retries + 1):
+            trial = await self.breaker.before_call()
+            reserved = False
+            try:
+                await self.bucket.acquire()
+                reserved = True
+                await self._acquire_slot()
+            except BaseException:
+                # Cancelled while queued: the token goes back to the bucket
+                # and the next caller may be the trial
+                if reserved:
+                    self.bucket.refund()
+                self.breaker.record_neutral(trial)
+                raise
+            sent_at = time.monotonic()
+            try:
+                result = await asyncio.to_thread(fn, *args, **kwargs)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            finally:
+                self._release_slot()
+
+            if error is None:
+                self._count("successes")
+                self.breaker.record_success()
+                self._increase_concurrency()
+                return result
+
+            status = self._status_code(error)
+            retryable = status == 429 or (status is not None and 500 <= status < 600)
+
+            if status == 429:
+                self._count("throttled")
+                self._decrease_concurrency(sent_at)
+            elif retryable:
+                self._count("server_errors")
+
+            if retryable or isinstance(error, TRANSPORT_ERRORS):
+                self.breaker.record_failure()
+            elif status is not None:
+                # Client errors (bad request etc.) show the API is up
+                self.breaker.record_success()
+            else:
+                # Not an API response at all (bad arguments, parsing in the SDK)
+                self.breaker.record_neutral(trial)
+
+            if not retryable:
+                raise error
+
+            if attempt >= self.max_retries:
+                raise RetryableAPIError(
+                    f"Gemini call failed after {self.max_retries + 1} attempts: {str(error)}"
+                ) from error
+
+            # Back off without holding a concurrency slot
+            self._count("retries")
+            delay = self._backoff_delay(attempt, error)
+            print(f"[RATE_LIMIT] HTTP {status}, retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{self.max_retries}, "
+                  f"concurrency {int(self.concurrency_limit)})", file=sys.stderr)
+            await asyncio.sleep(delay)
+
+    async def _acquire_slot(self):
+        while True:
+            with self._slot_waiters.waiting() as event:
+                with self._slot_lock:
+                    if self.in_flight < int(self.concurrency_limit):
+                        self.in_flight += 1
+                        return
+                await event.wait()
+
+    def _release_slot(self):
+        with self._slot_lock:
+            self.in_flight -= 1
+        self._slot_waiters.notify()
+
+    def _increase_concurrency(self):
+        """Additive increase: roughly +1 slot per window of successful calls"""
+        with self._slot_lock:
+            if self.concurrency_limit >= self.max_concurrency:
+                return
+            self.concurrency_limit = min(
+                self.max_concurrency,
+                self.concurrency_limit + 1.0 / self.concurrency_limit
+            )
+        self._slot_waiters.notify()
+
+    def _decrease_concurrency(self, sent_at: float):
+        """
+        Multiplicative decrease on throttling, at most once per window: a
+        burst of 429s for calls already in flight when the limit was last
+        halved reports the same overload and leaves it alone.
+        """
+        with self._slot_lock:
+            if sent_at <= self._decreased_at:
+                return
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2.0)
+            self._decreased_at = time.monotonic()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present"""
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _status_code(error: Exception) -> Optional[int]:
+        """
+        HTTP status of an SDK / HTTP client error, from its structured
+        fields only: code / status_code / response.status_code, or a status
+        name such as RESOURCE_EXHAUSTED. Never parsed out of the message,
+        which may hold amounts, invoice numbers or GSTINs.
+        """
+        for attr in ("code", "status_code", "status"):
+            value = getattr(error, attr, None)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+
+        response = getattr(error, "response", None)
+        value = getattr(response, "status_code", None)
+        if isinstance(value, int):
+            return value
+
+        for attr in ("status", "code"):
+            value = getattr(error, attr, None)
+            # Plain strings (google.genai) or enum members (grpc / api_core)
+            name = value if isinstance(value, str) else getattr(value, "name", None)
+            if isinstance(name, str) and name.upper() in STATUS_NAMES:
+                return STATUS_NAMES[name.upper()]
+        return None
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "circuit_waits": self.breaker.waits,
+            "concurrency_limit": int(self.concurrency_limit),
+            "in_flight": self.in_flight,
+            "circuit_state": self.breaker.state
+        }
+
+
+_gemini_limiter: Optional[AdaptiveRateLimiter] = None
+
+
+def get_gemini_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the process-wide Gemini limiter, creating it on first use"""
+    global _gemini_limiter
+    if _gemini_limiter is None:
+        _gemini_limiter = AdaptiveRateLimiter(
+            requests_per_minute=float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60")),
+            initial_concurrency=int(os.getenv("GEMINI_INITIAL_CONCURRENCY", "2")),
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+        )
+    return _gemini_limiter
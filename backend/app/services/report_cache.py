@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from app.services.invoice_record import plain_json
+
+
+def write_chunks(path: Path, chunks: Iterator[bytes]):
+    """Write a byte-chunk iterator to a file"""
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def content_version(*parts) -> str:
+    """Short digest of the data a report is generated from"""
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(json.dumps(part, sort_keys=True, default=plain_json).encode("utf-8"))
+        sha.update(b"\x00")
+    return sha.hexdigest()[:16]
+
+
+class ReportArtifactCache:
+    """
+    Generated report files kept on disk, keyed by session id and content version.
+    
+    Layout: <directory>/<session_id>/<report_type>-<version>.xlsx
+    A new version replaces older artifacts of the same report type, so
+    a report is only rebuilt when the data it is generated from changes.
+    """
+    
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        # Artifact path -> [lock, threads using it]; dropped with its last user,
+        # so replaced and invalidated artifacts leave no lock behind
+        self._locks: Dict[str, List] = {}
+        self._locks_guard = threading.Lock()
+    
+    def path_for(self, session_id: str, report_type: str, version: str, suffix: str = ".xlsx") -> Path:
+        return self.directory / session_id / f"{report_type}-{version}{suffix}"
+    
+    def get(self, session_id: str, report_type: str, version: str, suffix: str = ".xlsx") -> Optional[Path]:
+        path = self.path_for(session_id, report_type, version, suffix)
+        return path if path.exists() else None
+    
+    def get_or_create(
+        self,
+        session_id: str,
+        report_type: str,
+        version: str,
+        write_fn: Callable[[Path], None],
+        suffix: str = ".xlsx"
+    ) -> Path:
+        """
+        Return the artifact path, generating it with write_fn(tmp_path) on a miss.
+        Concurrent requests for the same artifact generate it once.
+        """
+        path = self.path_for(session_id, report_type, version, suffix)
+        if path.exists():
+            return path
+        
+        with self._locked(str(path)):
+            if path.exists():
+                return path
+            
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+            try:
+                write_fn(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            
+            self._remove_stale(session_id, report_type, keep=path)
+            print(f"[REPORT_CACHE] Generated {path.name} for session {session_id}", file=sys.stderr)
+            return path
+    
+    def stream_and_store(
+        self,
+        session_id: str,
+        report_type: str,
+        version: str,
+        chunks: Iterator[bytes],
+        suffix: str = ".xlsx"
+    ) -> Iterator[bytes]:
+        """
+        Pass generated chunks through to the caller while writing them to
+        the cache; the artifact is only published if the stream completes.
+        """
+        path = self.path_for(session_id, report_type, version, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        completed = False
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, path)
+            completed = True
+            self._remove_stale(session_id, report_type, keep=path)
+        finally:
+            # Client disconnected or generation failed part-way
+            if not completed and tmp_path.exists():
+                tmp_path.unlink()
+    
+    def invalidate(self, session_id: str):
+        """Remove every artifact for a session"""
+        shutil.rmtree(self.directory / session_id, ignore_errors=True)
+    
+    def _remove_stale(self, session_id: str, report_type: str, keep: Path):
+        for old in (self.directory / session_id).glob(f"{report_type}-*"):
+            if old != keep:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+    
+    @contextmanager
+    def _locked(self, key: str) -> Iterator[None]:
+        with self._locks_guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
@@ -0,0 +1,92 @@
+import io
+import csv
+import json
+from typing import Dict, Iterable, Iterator, List
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+
+# Row-oriented report formats streamed straight from reconciliation results.
+# Nothing is materialised beyond one flush buffer, so these stay cheap for
+# reconciliations far too large to be worth building a workbook for.
+
+FLUSH_BYTES = 64 * 1024
+
+AMOUNT_FIELDS = ["taxable_value", "cgst", "sgst", "igst", "total_amount"]
+
+RECONCILIATION_COLUMNS = (
+    ["source", "status", "supplier_gstin", "books_invoice_number", "gstr2b_invoice_number",
+     "books_invoice_date", "gstr2b_invoice_date"]
+    + [f"{side}_{field}" for field in AMOUNT_FIELDS for side in ("books", "gstr2b")]
+    + ["probable_reason", "action_required", "field_differences"]
+)
+
+
+def reconciliation_records(reconciliation: Dict, books_invoices: List[Dict], gstr2b_invoices: List[Dict]) -> Iterator[Dict]:
+    """
+    Reconciliation results in report order, tagged with the side they came
+    from and with the referenced invoices embedded one row at a time
+    """
+    for source, key in (("books", "books_reconciliation"), ("gstr2b", "gstr2b_unmatched")):
+        for result in reconciliation.get(key, []):
+            yield {
+                "source": source,
+                **GSTRReconciliationEngine.with_invoice_data(result, books_invoices, gstr2b_invoices)
+            }
+
+
+def reconciliation_rows(reconciliation: Dict, books_invoices: List[Dict], gstr2b_invoices: List[Dict]) -> Iterator[Dict]:
+    """Flatten reconciliation results into RECONCILIATION_COLUMNS rows"""
+    for record in reconciliation_records(reconciliation, books_invoices, gstr2b_invoices):
+        books = record.get("books_data") or {}
+        gstr2b = record.get("gstr2b_data") or {}
+        
+        row = {
+            "source": record["source"],
+            "status": record.get("status"),
+            "supplier_gstin": record.get("supplier_gstin"),
+            "books_invoice_number": record.get("books_invoice_number"),
+            "gstr2b_invoice_number": record.get("gstr2b_invoice_number"),
+            "books_invoice_date": books.get("invoice_date"),
+            "gstr2b_invoice_date": gstr2b.get("invoice_date"),
+            "probable_reason": record.get("probable_reason"),
+            "action_required": record.get("action_required"),
+            "field_differences": json.dumps(record["field_differences"], default=str) if record.get("field_differences") else ""
+        }
+        for field in AMOUNT_FIELDS:
+            row[f"books_{field}"] = books.get(field)
+            row[f"gstr2b_{field}"] = gstr2b.get(field)
+        
+        yield row
+
+
+def stream_csv(rows: Iterable[Dict], columns: List[str]) -> Iterator[bytes]:
+    """Yield CSV bytes (UTF-8 with BOM so Excel detects the encoding)"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    buffer.write("\ufeff")
+    writer.writeheader()
+    
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(records: Iterable[Dict]) -> Iterator[bytes]:
+    """Yield one JSON object per line"""
+    chunk: List[str] = []
+    size = 0
+    
+    for record in records:
+        line = json.dumps(record, default=str, ensure_ascii=False) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield "".join(chunk).encode("utf-8")
+            chunk = []
+            size = 0
+    
+    yield "".join(chunk).encode("utf-8")
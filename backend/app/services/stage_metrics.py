@@ -0,0 +1,255 @@
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Pipeline stages timed per file and per session, in pipeline order.
+# llm_call includes time queued in the Gemini rate limiter and retries:
+# what a document waited for Gemini, not only the HTTP round trip.
+STAGES = (
+    "upload_write", "pdf_text", "rasterize", "ocr", "llm_call", "json_parse",
+    "gstr2b_parse", "reconcile", "excel_build"
+)
+
+# Histogram bucket bounds in seconds: from a PDF text layer (milliseconds)
+# to OCR of a long scan or a throttled Gemini call (minutes)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Upload timings waiting for /process to pick them up, per upload directory
+MAX_PENDING_UPLOADS = 256
+
+
+class SessionTimings:
+    """Stage durations of one processing session, in total and per file"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # stage -> {"count", "seconds", "max_seconds"}
+        self.stages: Dict[str, Dict] = {}
+        # file -> stage -> seconds
+        self.files: Dict[str, Dict[str, float]] = {}
+
+    def add(self, stage: str, seconds: float, file: Optional[str] = None):
+        with self._lock:
+            totals = self.stages.get(stage)
+            if totals is None:
+                totals = self.stages[stage] = {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+            totals["count"] += 1
+            totals["seconds"] += seconds
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+            if file is not None:
+                by_stage = self.files.setdefault(file, {})
+                by_stage[stage] = by_stage.get(stage, 0.0) + seconds
+
+    def merge(self, other: "SessionTimings"):
+        with other._lock:
+            stages = {stage: dict(totals) for stage, totals in other.stages.items()}
+            files = {file: dict(by_stage) for file, by_stage in other.files.items()}
+        with self._lock:
+            for stage, totals in stages.items():
+                own = self.stages.setdefault(stage, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+                own["count"] += totals["count"]
+                own["seconds"] += totals["seconds"]
+                own["max_seconds"] = max(own["max_seconds"], totals["max_seconds"])
+            for file, by_stage in files.items():
+                own_file = self.files.setdefault(file, {})
+                for stage, seconds in by_stage.items():
+                    own_file[stage] = own_file.get(stage, 0.0) + seconds
+
+    def to_dict(self, include_files: bool = False) -> Dict:
+        """Per-stage totals in pipeline order; per-file seconds on request"""
+        with self._lock:
+            order = [stage for stage in STAGES if stage in self.stages]
+            order += [stage for stage in self.stages if stage not in STAGES]
+            data = {
+                "stages": {
+                    stage: {
+                        "count": self.stages[stage]["count"],
+                        "seconds": round(self.stages[stage]["seconds"], 4),
+                        "max_seconds": round(self.stages[stage]["max_seconds"], 4)
+                    }
+                    for stage in order
+                },
+                "total_seconds": round(sum(totals["seconds"] for totals in self.stages.values()), 4)
+            }
+            if include_files:
+                data["files"] = {
+                    file: {stage: round(seconds, 4) for stage, seconds in by_stage.items()}
+                    for file, by_stage in self.files.items()
+                }
+        return data
+
+
+class StageMetrics:
+    """
+    Process-wide stage duration histograms and counters, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # stage -> {"buckets": per-bound counts (not cumulative), "sum", "count", "errors"}
+        self._histograms: Dict[str, Dict] = {}
+        # (name, sorted label pairs) -> value
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._help: Dict[str, str] = {}
+
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = {
+                    "buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "errors": 0
+                }
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][position] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+            if error:
+                histogram["errors"] += 1
+
+    def increment(self, name: str, amount: float = 1, help_text: str = "", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    def render(self) -> List[str]:
+        """Exposition lines for the stage histograms and every counter"""
+        with self._lock:
+            histograms = {stage: {**h, "buckets": list(h["buckets"])} for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+            help_texts = dict(self._help)
+
+        lines = [
+            "# HELP gst_stage_duration_seconds Time spent in each pipeline stage, per file or per session step",
+            "# TYPE gst_stage_duration_seconds histogram"
+        ]
+        for stage in sorted(histograms, key=_stage_order):
+            histogram = histograms[stage]
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                cumulative += count
+                lines.append(f'gst_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'gst_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'gst_stage_duration_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'gst_stage_duration_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        lines += [
+            "# HELP gst_stage_errors_total Stage runs that raised",
+            "# TYPE gst_stage_errors_total counter"
+        ]
+        for stage in sorted(histograms, key=_stage_order):
+            lines.append(f'gst_stage_errors_total{{stage="{stage}"}} {histograms[stage]["errors"]}')
+
+        by_name: Dict[str, List] = {}
+        for (name, labels), value in sorted(counters.items()):
+            by_name.setdefault(name, []).append((labels, value))
+        for name, samples in by_name.items():
+            if name in help_texts:
+                lines.append(f"# HELP {name} {help_texts[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(dict(labels))} {format_value(value)}")
+        return lines
+
+
+def _stage_order(stage: str) -> Tuple[int, str]:
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+
+def format_labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.6f}"
+
+
+_metrics = StageMetrics()
+
+# Session whose timings stages record into when none is passed explicitly;
+# set around a session's pipeline run and inherited by the tasks and
+# threads (asyncio.to_thread) it starts
+_current_timings: ContextVar[Optional[SessionTimings]] = ContextVar("current_session_timings", default=None)
+
+_pending_uploads: "OrderedDict[str, SessionTimings]" = OrderedDict()
+_pending_lock = threading.Lock()
+
+
+def get_stage_metrics() -> StageMetrics:
+    """Return the process-wide metrics registry"""
+    return _metrics
+
+
+@contextmanager
+def session_timings(timings: SessionTimings) -> Iterator[SessionTimings]:
+    """Make stages timed inside this block (and the tasks it starts) count toward timings"""
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def record_stage(
+    stage: str,
+    seconds: float,
+    file: Optional[str] = None,
+    error: bool = False,
+    timings: Optional[SessionTimings] = None
+):
+    """Record one stage run in the process histograms and the session's timings"""
+    _metrics.observe(stage, seconds, error)
+    timings = timings or _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds, file)
+
+
+@contextmanager
+def timed_stage(stage: str, file: Optional[str] = None, timings: Optional[SessionTimings] = None):
+    """
+    Time the block as one run of stage, for file if given. Goes to the
+    session's timings passed in, or else the current session's.
+    """
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - started, file, error, timings)
+
+
+def upload_timings(directory: str) -> SessionTimings:
+    """Timings of uploads into a directory, until a session processing it takes them"""
+    with _pending_lock:
+        timings = _pending_uploads.get(directory)
+        if timings is None:
+            timings = _pending_uploads[directory] = SessionTimings()
+            # Uploads that are never processed must not pile up
+            while len(_pending_uploads) > MAX_PENDING_UPLOADS:
+                _pending_uploads.popitem(last=False)
+        else:
+            _pending_uploads.move_to_end(directory)
+        return timings
+
+
+def take_upload_timings(directory: str) -> Optional[SessionTimings]:
+    """Hand a directory's upload timings to the session processing it"""
+    with _pending_lock:
+        return _pending_uploads.pop(directory, None)
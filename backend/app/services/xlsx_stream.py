@@ -0,0 +1,224 @@
+import re
+import zipfile
+from datetime import date, datetime
+from typing import Dict, Iterator, List
+from xml.sax.saxutils import escape, quoteattr
+
+# Minimal SpreadsheetML writer that emits .xlsx bytes incrementally.
+#
+# openpyxl only produces bytes from Workbook.save(), after every row has
+# been written. Here each worksheet is a zip entry written row by row to
+# an unseekable sink (zipfile then uses data descriptors), and the sink is
+# drained between rows, so callers can forward bytes to an HTTP response
+# while later rows are still being generated. Memory use stays flat.
+
+FLUSH_BYTES = 64 * 1024
+
+ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+class _ChunkSink:
+    """Write-only file object that buffers bytes until drained"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _column_letter(index: int) -> str:
+    """1-based column index to letters (1 -> A, 27 -> AA)"""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell_xml(ref: str, value, style_id: int) -> str:
+    style = f' s="{style_id}"' if style_id else ""
+    if value is None:
+        return f'<c r="{ref}"{style}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value or value in (float("inf"), float("-inf")):
+            value = str(value)
+        else:
+            return f'<c r="{ref}"{style}><v>{value}</v></c>'
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    text = escape(ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _styles_xml(style_specs: Dict[str, Dict]) -> str:
+    """styles.xml with one cellXfs entry per named style (index 0 is the default)"""
+    fonts = ['<font><sz val="11"/><name val="Calibri"/></font>']
+    fills = ['<fill><patternFill patternType="none"/></fill>', '<fill><patternFill patternType="gray125"/></fill>']
+    borders = [
+        '<border><left/><right/><top/><bottom/><diagonal/></border>',
+        '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    ]
+    xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>']
+    
+    for spec in style_specs.values():
+        font_id = 0
+        if spec.get("bold") or spec.get("font_color"):
+            bold = "<b/>" if spec.get("bold") else ""
+            color = f'<color rgb="FF{spec["font_color"]}"/>' if spec.get("font_color") else ""
+            fonts.append(f'<font>{bold}<sz val="11"/>{color}<name val="Calibri"/></font>')
+            font_id = len(fonts) - 1
+        
+        fill_id = 0
+        if spec.get("fill"):
+            fills.append(
+                f'<fill><patternFill patternType="solid"><fgColor rgb="FF{spec["fill"]}"/>'
+                f'<bgColor rgb="FF{spec["fill"]}"/></patternFill></fill>'
+            )
+            fill_id = len(fills) - 1
+        
+        border_id = 1 if spec.get("border") else 0
+        
+        alignment = ""
+        for attr, key in (("horizontal", "horizontal"), ("vertical", "vertical")):
+            if spec.get(key):
+                alignment += f' {attr}="{spec[key]}"'
+        if spec.get("wrap_text"):
+            alignment += ' wrapText="1"'
+        
+        xfs.append(
+            f'<xf numFmtId="0" fontId="{font_id}" fillId="{fill_id}" borderId="{border_id}" xfId="0"'
+            f' applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+            f'<alignment{alignment}/></xf>'
+        )
+    
+    return (
+        f'{XML_HEADER}<styleSheet xmlns="{MAIN_NS}">'
+        f'<fonts count="{len(fonts)}">{"".join(fonts)}</fonts>'
+        f'<fills count="{len(fills)}">{"".join(fills)}</fills>'
+        f'<borders count="{len(borders)}">{"".join(borders)}</borders>'
+        f'<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+        f'<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        f'</styleSheet>'
+    )
+
+
+def _workbook_parts(titles: List[str]) -> Dict[str, str]:
+    sheets = "".join(
+        f'<sheet name={quoteattr(title)} sheetId="{i}" r:id="rId{i}"/>'
+        for i, title in enumerate(titles, 1)
+    )
+    sheet_rels = "".join(
+        f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, len(titles) + 1)
+    )
+    sheet_overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, len(titles) + 1)
+    )
+    styles_rel_id = len(titles) + 1
+    
+    return {
+        "[Content_Types].xml": (
+            f'{XML_HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{sheet_overrides}</Types>'
+        ),
+        "_rels/.rels": (
+            f'{XML_HEADER}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        "xl/workbook.xml": (
+            f'{XML_HEADER}<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+            f'<sheets>{sheets}</sheets></workbook>'
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'{XML_HEADER}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{sheet_rels}'
+            f'<Relationship Id="rId{styles_rel_id}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        )
+    }
+
+
+def stream_xlsx(sheets: List[Dict], style_specs: Dict[str, Dict]) -> Iterator[bytes]:
+    """
+    Yield an .xlsx file as byte chunks.
+    
+    Args:
+        sheets: Dicts with "title", "widths" and a lazy "rows" iterator of
+            (values, style) where style is a style name or one name per column
+        style_specs: Named style definitions (see ExcelGenerator._style_specs)
+    """
+    style_ids = {name: index for index, name in enumerate(style_specs, 1)}
+    sink = _ChunkSink()
+    
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _workbook_parts([sheet["title"] for sheet in sheets]).items():
+            archive.writestr(name, content)
+        archive.writestr("xl/styles.xml", _styles_xml(style_specs))
+        yield sink.drain()
+        
+        for sheet_index, sheet in enumerate(sheets, 1):
+            with archive.open(f"xl/worksheets/sheet{sheet_index}.xml", "w", force_zip64=True) as entry:
+                cols = "".join(
+                    f'<col min="{i}" max="{i}" width="{width}" customWidth="1"/>'
+                    for i, width in enumerate(sheet["widths"], 1)
+                )
+                entry.write(
+                    f'{XML_HEADER}<worksheet xmlns="{MAIN_NS}">'
+                    f'{"<cols>" + cols + "</cols>" if cols else ""}<sheetData>'.encode("utf-8")
+                )
+                
+                letters: List[str] = []
+                for row_number, (values, style) in enumerate(sheet["rows"], 1):
+                    while len(letters) < len(values):
+                        letters.append(_column_letter(len(letters) + 1))
+                    
+                    if isinstance(style, list):
+                        cells = "".join(
+                            _cell_xml(f"{letters[i]}{row_number}", value, style_ids.get(style[i], 0))
+                            for i, value in enumerate(values)
+                        )
+                    else:
+                        style_id = style_ids.get(style, 0)
+                        cells = "".join(
+                            _cell_xml(f"{letters[i]}{row_number}", value, style_id)
+                            for i, value in enumerate(values)
+                        )
+                    entry.write(f'<row r="{row_number}">{cells}</row>'.encode("utf-8"))
+                    
+                    if sink.size >= FLUSH_BYTES:
+                        yield sink.drain()
+                
+                entry.write(b"</sheetData></worksheet>")
+            yield sink.drain()
+    
+    # Central directory is written when the archive closes
+    yield sink.drain()
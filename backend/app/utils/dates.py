@@ -0,0 +1,56 @@
+import os
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+# Distinct date strings seen in a session are few (a month or two of
+# invoice dates in a handful of formats), so a small cache absorbs nearly
+# every lookup
+DATE_CACHE_SIZE = int(os.getenv("DATE_PARSE_CACHE_SIZE", "4096"))
+
+_SEPARATORS = str.maketrans("/.", "--")
+
+
+def date_ordinal(value) -> Optional[int]:
+    """
+    Invoice date as a proleptic Gregorian ordinal (date.toordinal()), or None.
+    
+    Accepts date/datetime objects (Excel cells) and strings in YYYY-MM-DD,
+    YYYY/MM/DD or the Indian DD-MM-YYYY, DD/MM/YYYY, DD-MM-YY, DD/MM/YY and
+    DD.MM.YYYY forms, optionally followed by a time ("2026-01-05 00:00:00").
+    Two-digit years are taken as 20YY.
+    """
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, str) and value:
+        return _parse_ordinal(value)
+    return None
+
+
+def ordinal_date(ordinal: Optional[int]) -> Optional[date]:
+    return date.fromordinal(ordinal) if ordinal is not None else None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_ordinal(text: str) -> Optional[int]:
+    # The layout is sniffed from the field widths instead of trying
+    # strptime formats one after another
+    text = text.strip().split(" ", 1)[0].split("T", 1)[0]
+    parts = text.translate(_SEPARATORS).split("-")
+    if len(parts) != 3 or not all(part.isascii() and part.isdigit() for part in parts):
+        return None
+    
+    if len(parts[0]) == 4:
+        year, month, day = parts
+    else:
+        day, month, year = parts
+    
+    if len(year) == 2:
+        year = "20" + year
+    elif len(year) != 4:
+        return None
+    
+    try:
+        return date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return None
@@ -0,0 +1,119 @@
+import os
+import re
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=start-end` header.
+
+    Returns an inclusive (start, end) tuple, or None if the header is not
+    a single satisfiable byte range (multi-range requests get the full file).
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+
+    if not start_text:
+        # Suffix range: last N bytes
+        length = int(end_text)
+        if length == 0:
+            return None
+        return max(0, file_size - length), file_size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else file_size - 1
+    if start >= file_size or end < start:
+        return None
+    return start, min(end, file_size - 1)
+
+
+def _iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match covers this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    quoted_etag = f'"{etag}"'
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or quoted_etag in candidates or f"W/{quoted_etag}" in candidates
+
+
+def cached_file_response(
+    request: Request,
+    path: Path,
+    media_type: str,
+    filename: str,
+    etag: str
+) -> Response:
+    """
+    Serve a file from disk with ETag/If-None-Match revalidation and
+    single byte-range support.
+    """
+    quoted_etag = f'"{etag}"'
+    headers = {
+        "ETag": quoted_etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename={filename}"
+    }
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    file_size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+
+    # If-Range: only honour the range when the client's copy is current
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != quoted_etag:
+        range_header = None
+
+    if range_header:
+        byte_range = _parse_range(range_header, file_size)
+        if byte_range is None and RANGE_PATTERN.match(range_header.strip()):
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{file_size}"}
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            return StreamingResponse(
+                _iter_file(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **headers,
+                    "Content-Range": f"bytes {start}-{end}/{file_size}",
+                    "Content-Length": str(length)
+                }
+            )
+
+    return StreamingResponse(
+        _iter_file(path, 0, file_size),
+        media_type=media_type,
+        headers={**headers, "Content-Length": str(file_size)}
+    )
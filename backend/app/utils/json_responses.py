@@ -0,0 +1,89 @@
+import os
+import gzip
+from typing import Any, Dict, Optional
+
+import brotli
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+from app.services.invoice_record import plain_json
+
+# Responses smaller than this go out uncompressed; below ~1 KB the codec
+# overhead costs more than the bytes it saves
+COMPRESSION_MIN_BYTES = int(os.getenv("JSON_COMPRESSION_MIN_BYTES", "1024"))
+
+# Fast settings: these payloads are built per request, not cached
+BROTLI_QUALITY = int(os.getenv("JSON_BROTLI_QUALITY", "4"))
+GZIP_LEVEL = int(os.getenv("JSON_GZIP_LEVEL", "6"))
+
+# Preferred first when the client weights them equally
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def encode_json(content: Any) -> bytes:
+    """
+    Serialize with orjson. Handles datetimes and numpy values natively;
+    invoice records become dicts and anything else unknown falls back to str().
+    """
+    return orjson.dumps(content, default=plain_json, option=ORJSON_OPTIONS)
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    weights = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best supported content coding for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    
+    weights = _parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def json_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    JSON response for large payloads.
+    
+    Returning a Response directly skips FastAPI's jsonable_encoder pass, which
+    walks every nested dict in Python before json.dumps runs. Bodies over
+    COMPRESSION_MIN_BYTES are compressed with brotli or gzip, whichever the
+    client's Accept-Encoding prefers.
+    """
+    body = encode_json(content)
+    headers = {"Vary": "Accept-Encoding"}
+    
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,77 @@
+import json
+import base64
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(position: int) -> str:
+    """Opaque cursor for the next list position"""
+    return base64.urlsafe_b64encode(json.dumps({"p": position}).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """List position from a cursor; raises ValueError if it is malformed"""
+    if not cursor:
+        return 0
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["p"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, int) or position < 0:
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Comma-separated field list from a query parameter (None means all fields)"""
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(",") if name.strip()]
+
+
+def project(item: Dict, fields: Optional[List[str]]) -> Dict:
+    """Keep only the requested top-level fields"""
+    if fields is None:
+        return item
+    return {name: item[name] for name in fields if name in item}
+
+
+def paginate(
+    items: Sequence[Dict],
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    predicate: Optional[Callable[[Dict], bool]] = None,
+    fields: Optional[List[str]] = None,
+    transform: Optional[Callable[[Dict], Dict]] = None,
+    index_key: Optional[str] = None
+) -> Dict:
+    """
+    One page of a list, scanning forward from the cursor position.
+    
+    Each item carries an "index" that stays stable across incremental edits
+    and is what the patch APIs take: its index_key field when given (e.g.
+    the invoice a result row belongs to), else its list position. Filtering
+    happens during the scan, so a filtered page never materializes the
+    whole filtered list. transform, if given, is applied to page items
+    only (e.g. to attach data the stored items just reference).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    position = decode_cursor(cursor)
+    
+    page = []
+    while position < len(items) and len(page) < limit:
+        item = items[position]
+        if predicate is None or predicate(item):
+            index = item[index_key] if index_key else position
+            if transform is not None:
+                item = transform(item)
+            page.append({"index": index, **project(item, fields)})
+        position += 1
+    
+    return {
+        "items": page,
+        "next_cursor": encode_cursor(position) if position < len(items) else None,
+        "total": len(items)
+    }
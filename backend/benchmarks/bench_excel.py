@@ -0,0 +1,150 @@
+"""
+Excel generation benchmark: rows/second and peak memory.
+
+Compares the incremental SpreadsheetML writer used for downloads and the
+openpyxl write-only / in-memory modes (shared named styles) against the
+original per-cell-style + DataFrame implementation kept below as a reference.
+
+    cd backend
+    python -m benchmarks.bench_excel --rows 50000 --skip-legacy
+"""
+import io
+import gc
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+
+from app.services.excel_generator import ExcelGenerator
+
+
+def make_invoices(count: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    invoices = []
+    for i in range(count):
+        taxable = round(rng.uniform(500, 200000), 2)
+        tax = round(taxable * 0.18, 2)
+        invoices.append({
+            "file": f"bill_{i:06d}.pdf",
+            "supplier_gstin": f"27AAPCT{i % 10000:04d}H1Z0",
+            "invoice_number": f"INV/{i:06d}",
+            "invoice_date": f"2026-01-{rng.randint(1, 28):02d}",
+            "document_type": "Invoice",
+            "taxable_value": taxable,
+            "cgst": round(tax / 2, 2),
+            "sgst": round(tax / 2, 2),
+            "igst": 0,
+            "total_amount": round(taxable + tax, 2),
+            "expense_category": "Office Supplies",
+            "itc_eligibility": True,
+            "gstr2b_section": None,
+            "status": "valid" if rng.random() > 0.02 else "error",
+            "error": "Failed to parse Gemini response"
+        })
+    return invoices
+
+
+def legacy_invoice_sheet(invoices: List[Dict]) -> bytes:
+    """The pre-streaming implementation: DataFrame + new style objects per cell"""
+    data = []
+    for inv in invoices:
+        if inv.get("status") == "error":
+            data.append({
+                "File": inv.get("file", "N/A"), "Supplier GSTIN": "ERROR", "Invoice No": "ERROR",
+                "Invoice Date": "ERROR", "Document Type": "ERROR", "Taxable Value": 0, "CGST": 0,
+                "SGST": 0, "IGST": 0, "Total Amount": 0,
+                "Expense Category": inv.get("error", "Unknown error"),
+                "ITC Eligibility": "N/A", "GSTR2B Section": "N/A", "Status": "error"
+            })
+        else:
+            data.append({
+                "File": inv.get("file", "N/A"), "Supplier GSTIN": inv.get("supplier_gstin", "N/A"),
+                "Invoice No": inv.get("invoice_number", "N/A"), "Invoice Date": inv.get("invoice_date", "N/A"),
+                "Document Type": inv.get("document_type", "Invoice"), "Taxable Value": inv.get("taxable_value", 0),
+                "CGST": inv.get("cgst", 0), "SGST": inv.get("sgst", 0), "IGST": inv.get("igst", 0),
+                "Total Amount": inv.get("total_amount", 0), "Expense Category": inv.get("expense_category", "N/A"),
+                "ITC Eligibility": inv.get("itc_eligibility", "N/A"), "GSTR2B Section": inv.get("gstr2b_section", "N/A"),
+                "Status": inv.get("status", "unknown")
+            })
+    df = pd.DataFrame(data)
+
+    workbook = Workbook()
+    worksheet = workbook.active
+    for col_num, column_title in enumerate(df.columns, 1):
+        cell = worksheet.cell(row=1, column=col_num)
+        cell.value = column_title
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    for row_num, row_data in enumerate(df.values, 2):
+        for col_num, value in enumerate(row_data, 1):
+            cell = worksheet.cell(row=row_num, column=col_num)
+            cell.value = value
+            cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
+            cell.border = Border(
+                left=Side(style='thin'), right=Side(style='thin'),
+                top=Side(style='thin'), bottom=Side(style='thin')
+            )
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def measure(name: str, fn: Callable[[], bytes], rows: int, trace_memory: bool = True) -> Dict:
+    # Timing and memory are taken in separate runs: tracemalloc slows
+    # allocation-heavy code several-fold and would distort rows/second
+    gc.collect()
+    started = time.perf_counter()
+    output = fn()
+    elapsed = time.perf_counter() - started
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "mode": name,
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 1) if peak is not None else "-",
+        "output_kb": round(len(output) / 1024)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ExcelGenerator modes")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the slow reference implementation")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    invoices = make_invoices(args.rows)
+    modes = [
+        ("stream_xlsx", lambda: b"".join(ExcelGenerator().stream_invoice_sheet(invoices))),
+        ("write_only", lambda: ExcelGenerator(write_only=True).generate_invoice_sheet(invoices)[0]),
+        ("in_memory", lambda: ExcelGenerator(write_only=False).generate_invoice_sheet(invoices)[0]),
+    ]
+    if not args.skip_legacy:
+        modes.append(("legacy", lambda: legacy_invoice_sheet(invoices)))
+
+    print(f"{'mode':<12}{'rows':>9}{'seconds':>10}{'rows/s':>10}{'peak MB':>10}{'size KB':>10}", file=sys.stderr)
+    for name, fn in modes:
+        result = measure(name, fn, args.rows, trace_memory=not args.no_memory)
+        print(f"{result['mode']:<12}{result['rows']:>9}{result['seconds']:>10}"
+              f"{result['rows_per_second']:>10}{result['peak_memory_mb']:>10}{result['output_kb']:>10}",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Reconciliation response benchmark: encode time and bytes on the wire.
+
+Builds a synthetic reconciliation (books invoices against a GSTR-2B set with
+value mismatches, missing invoices on both sides) and compares FastAPI's
+default path (jsonable_encoder + json.dumps) with orjson, then the size and
+cost of each content coding json_response can negotiate.
+
+    cd backend
+    python -m benchmarks.bench_json --invoices 20000
+"""
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.invoice_record import as_records
+from app.services.incremental_reconciler import IncrementalReconciler
+from app.utils.json_responses import encode_json, compress
+
+from benchmarks.bench_excel import make_invoices
+
+
+def make_gstr2b(books: List[Dict], seed: int = 7) -> Dict:
+    """GSTR-2B counterpart: ~90% present, a share with changed values, plus extra supplier invoices"""
+    rng = random.Random(seed)
+    invoices = []
+    for inv in books:
+        if rng.random() < 0.1:
+            continue
+        taxable = inv["taxable_value"]
+        if rng.random() < 0.15:
+            taxable = round(taxable * rng.uniform(0.9, 1.1), 2)
+        tax = round(taxable * 0.18, 2)
+        invoices.append({
+            "gstin": inv["supplier_gstin"],
+            "inv_no": inv["invoice_number"],
+            "inv_dt": inv["invoice_date"],
+            "taxable_value": taxable,
+            "cgst": round(tax / 2, 2),
+            "sgst": round(tax / 2, 2),
+            "igst": 0,
+            "total_amount": round(taxable + tax, 2)
+        })
+    for i in range(len(books) // 20):
+        invoices.append({
+            "gstin": f"29AABCU{i % 1000:04d}R1Z5",
+            "inv_no": f"SUP/{i:06d}",
+            "inv_dt": "2026-01-15",
+            "taxable_value": 1000.0,
+            "cgst": 90.0,
+            "sgst": 90.0,
+            "igst": 0,
+            "total_amount": 1180.0
+        })
+    return {"invoices": invoices}
+
+
+def timed(fn: Callable, repeat: int):
+    best = None
+    output = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        output = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return output, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reconciliation response encoding")
+    parser.add_argument("--invoices", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs per mode")
+    args = parser.parse_args()
+
+    books = as_records(make_invoices(args.invoices))
+    index = GSTR2BIndex(make_gstr2b(books))
+    reconciliation = IncrementalReconciler(books, index).result()
+    payload = {
+        "status": "success",
+        "session_id": "bench",
+        "reconciliation": GSTRReconciliationEngine.expand_reconciliation(reconciliation, books, index.invoices)
+    }
+
+    encoders = [
+        ("fastapi_default", lambda: json.dumps(
+            jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":")
+        ).encode("utf-8")),
+        ("orjson", lambda: encode_json(payload)),
+    ]
+
+    print(f"{len(payload['reconciliation']['books_reconciliation'])} books rows, "
+          f"{len(payload['reconciliation']['gstr2b_unmatched'])} GSTR-2B unmatched rows", file=sys.stderr)
+    print(f"{'encoder':<18}{'encode ms':>11}{'size KB':>10}", file=sys.stderr)
+    for name, fn in encoders:
+        output, seconds = timed(fn, args.repeat)
+        print(f"{name:<18}{seconds * 1000:>11.1f}{len(output) / 1024:>10.0f}", file=sys.stderr)
+
+    body = encode_json(payload)
+    print(f"\n{'coding':<18}{'compress ms':>11}{'wire KB':>10}{'ratio':>8}", file=sys.stderr)
+    print(f"{'identity':<18}{0:>11.1f}{len(body) / 1024:>10.0f}{1:>8.1f}", file=sys.stderr)
+    for coding in ("gzip", "br"):
+        output, seconds = timed(lambda: compress(body, coding), args.repeat)
+        print(f"{coding:<18}{seconds * 1000:>11.1f}{len(output) / 1024:>10.0f}"
+              f"{len(body) / len(output):>8.1f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Reconciliation and parsing benchmark suite with stored baselines.
+
+Times each stage of the pipeline on seeded synthetic data (see
+benchmarks.synthetic) at several sizes, and compares against a baseline
+JSON stored under benchmarks/baselines/. Exits non-zero when any stage is
+slower than its baseline by more than --threshold (relative) and
+--min-delta-ms (absolute, so timer noise on fast stages never fails a run).
+
+    cd backend
+    python -m benchmarks.bench_suite --sizes 100,1000,10000 --save-baseline local
+    python -m benchmarks.bench_suite --sizes 100,1000,10000 --compare local
+    python -m benchmarks.bench_suite --sizes 500000 --stages gstr2b_index,reconcile
+
+Baselines are only comparable on the machine they were recorded on;
+record one before a change and compare after it. baselines/reference.json
+holds the default run on a single-CPU Linux container, as a rough guide to
+where the time goes.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from openpyxl import Workbook
+
+from app.api.processing import _parse_gstr2b_excel
+from app.services.excel_generator import ExcelGenerator
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.incremental_reconciler import IncrementalReconciler
+from app.services.invoice_record import as_records
+from app.services.mismatch_detector import MismatchDetector
+
+from benchmarks.synthetic import DEFAULT_RATES, make_dataset
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Largest size each stage runs at unless --no-limits: fuzzy detection and
+# the openpyxl Excel parser hold everything in memory and take minutes
+# (or gigabytes) beyond these
+STAGE_MAX_ROWS = {
+    "detect_mismatches": 20000,
+    "report_card": 20000,
+    "excel_mismatch_report": 20000,
+    "parse_gstr2b_excel": 100000
+}
+
+# Edits applied per incremental patch
+PATCH_SIZE = 5
+
+
+class Fixture:
+    """One dataset and the artifacts later stages consume, built on demand"""
+
+    def __init__(self, rows: int, seed: int, rates: Dict):
+        books, self.gstr2b_data = make_dataset(rows, seed, **rates)
+        self.books = as_records(books)
+        self.rows = rows
+        self.seed = seed
+        self._cache: Dict = {}
+
+    def get(self, name: str, build: Callable):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def index(self) -> GSTR2BIndex:
+        return self.get("index", lambda: GSTR2BIndex(self.gstr2b_data))
+
+    @property
+    def analysis(self) -> Dict:
+        return self.get("analysis", lambda: MismatchDetector().detect_mismatches(self.books, self.index))
+
+    @property
+    def gstr2b_xlsx(self) -> str:
+        return self.get("gstr2b_xlsx", lambda: _write_gstr2b_xlsx(self.gstr2b_data["invoices"]))
+
+
+def _write_gstr2b_xlsx(invoices: List[Dict]) -> str:
+    """The GSTR-2B as a portal-style Excel export, for the parser stage"""
+    columns = ["gstin", "inv_no", "inv_dt", "taxable_value", "cgst", "sgst", "igst", "total_amount"]
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(columns)
+    for invoice in invoices:
+        worksheet.append([invoice.get(column) for column in columns])
+    handle, path = tempfile.mkstemp(suffix=".xlsx", prefix="bench_gstr2b_")
+    os.close(handle)
+    workbook.save(path)
+    return path
+
+
+def _patch_runner(fixture: Fixture) -> Callable:
+    """Incremental edits against a built reconciler: PATCH_SIZE random field changes per call"""
+    reconciler = IncrementalReconciler(fixture.books, fixture.index)
+    rng = random.Random(fixture.seed)
+
+    def patch():
+        changes = []
+        for _ in range(PATCH_SIZE):
+            index = rng.randrange(len(fixture.books))
+            field = rng.choice(["taxable_value", "invoice_number", "invoice_date"])
+            if field == "taxable_value":
+                value = round(rng.uniform(500, 50000), 2)
+            elif field == "invoice_number":
+                value = f"EDIT/{rng.randint(0, 99999):05d}"
+            else:
+                value = f"2026-01-{rng.randint(1, 28):02d}"
+            changes.append({"index": index, "fields": {field: value}})
+        return reconciler.apply_changes(changes)
+
+    return patch
+
+
+# stage -> (fixture -> zero-argument callable to time)
+STAGES: Dict[str, Callable[[Fixture], Callable]] = {
+    "gstr2b_index": lambda f: lambda: GSTR2BIndex(f.gstr2b_data),
+    "reconcile": lambda f: lambda: GSTRReconciliationEngine().reconcile(f.books, f.index.invoices),
+    "incremental_build": lambda f: lambda: IncrementalReconciler(f.books, f.index),
+    "incremental_patch": _patch_runner,
+    "detect_mismatches": lambda f: lambda: MismatchDetector().detect_mismatches(f.books, f.index),
+    "report_card": lambda f: lambda: MismatchDetector().generate_report_card(f.analysis),
+    "parse_gstr2b_excel": lambda f: lambda: _parse_gstr2b_excel(f.gstr2b_xlsx),
+    "excel_invoice_sheet": lambda f: lambda: sum(len(chunk) for chunk in ExcelGenerator().stream_invoice_sheet(f.books)),
+    "excel_mismatch_report": lambda f: lambda: sum(len(chunk) for chunk in ExcelGenerator().stream_mismatch_report(f.analysis))
+}
+
+
+def time_stage(fn: Callable, repeat: int) -> float:
+    """Best wall time of repeat runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_suite(sizes: List[int], stages: List[str], seed: int, rates: Dict, repeat: int, limits: bool) -> Dict[str, float]:
+    """{"stage@rows": seconds} for every stage and size that applies"""
+    results = {}
+    for rows in sizes:
+        fixture = Fixture(rows, seed, rates)
+        # Big sizes take long enough that one run is already stable
+        runs = repeat if rows <= 10000 else 1
+        for stage in stages:
+            if limits and rows > STAGE_MAX_ROWS.get(stage, rows):
+                continue
+            fn = STAGES[stage](fixture)
+            seconds = time_stage(fn, runs)
+            results[f"{stage}@{rows}"] = seconds
+            print(f"{stage:<24}{rows:>9}{seconds * 1000:>12.1f}", file=sys.stderr)
+        if "gstr2b_xlsx" in fixture._cache:
+            os.remove(fixture._cache["gstr2b_xlsx"])
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float, min_delta_ms: float) -> List[Dict]:
+    """Stages slower than baseline by more than threshold and min_delta_ms"""
+    regressions = []
+    print(f"\n{'stage@rows':<32}{'baseline ms':>12}{'current ms':>12}{'change':>9}", file=sys.stderr)
+    for key, seconds in results.items():
+        if key not in baseline:
+            print(f"{key:<32}{'-':>12}{seconds * 1000:>12.1f}{'new':>9}", file=sys.stderr)
+            continue
+        before = baseline[key]
+        change = (seconds - before) / before if before else 0.0
+        regressed = change > threshold and (seconds - before) * 1000 > min_delta_ms
+        print(f"{key:<32}{before * 1000:>12.1f}{seconds * 1000:>12.1f}{change:>+8.0%}{' REGRESSION' if regressed else ''}", file=sys.stderr)
+        if regressed:
+            regressions.append({"stage": key, "baseline_seconds": before, "seconds": seconds, "change": round(change, 3)})
+    return regressions
+
+
+def baseline_path(name: str) -> str:
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def load_baseline(name: str) -> Dict:
+    with open(baseline_path(name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(name: str, results: Dict[str, float], config: Dict):
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {
+        "created_at": datetime.now().isoformat(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": config,
+        "results": {key: round(seconds, 6) for key, seconds in results.items()}
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    print(f"Saved baseline to {path}", file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark reconciliation, parsing and report stages against a baseline")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated row counts (100 to 500000)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs (sizes up to 10000)")
+    parser.add_argument("--no-limits", action="store_true", help="Run every stage at every size, ignoring STAGE_MAX_ROWS")
+    for rate, default in DEFAULT_RATES.items():
+        parser.add_argument(f"--{rate.replace('_', '-')}", type=float, default=default)
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store results as benchmarks/baselines/NAME.json (or a .json path)")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against a stored baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative slowdown that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0, help="Absolute slowdown below which a stage never fails")
+    parser.add_argument("--output", help="Also write this run's results as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+    rates = {rate: getattr(args, rate) for rate in DEFAULT_RATES}
+    config = {"sizes": sizes, "stages": stages, "seed": args.seed, "repeat": args.repeat, "rates": rates}
+
+    print(f"{'stage':<24}{'rows':>9}{'ms':>12}", file=sys.stderr)
+    results = run_suite(sizes, stages, args.seed, rates, args.repeat, not args.no_limits)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, config)
+
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        if baseline.get("config", {}).get("seed") != args.seed or baseline.get("config", {}).get("rates") != rates:
+            print("Warning: baseline was recorded with a different seed or rates", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+        print("\nNo regressions", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
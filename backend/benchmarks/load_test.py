@@ -0,0 +1,622 @@
+"""
+End-to-end load test of the upload -> process -> progress -> reconcile flow.
+
+Starts the API (uvicorn, one process, as deployed) and the Gemini stub
+server (app.services.llm_stub_server) as subprocesses, with OCR stubbed
+through OCR_BACKEND=stub, then runs simulated CA sessions against it. Each
+session does what the frontend does for one client-month:
+
+    POST /upload/                       generated invoice PDFs and images
+    POST /process/process               start extraction
+    GET  /process/progress/{id}         poll every --poll-interval until done
+    GET  /process/session/{id}/invoices review the extracted rows
+    POST /process/upload-gstr2b/{id}    GSTR-2B built from those rows
+    POST /process/reconcile-gstr2b/{id}
+
+and the run reports latency percentiles per endpoint, job completion times
+(process start to "completed"), throughput, and the server's CPU, memory
+and thread count sampled while it ran.
+
+    cd backend
+    python -m benchmarks.load_test --sessions 20 --concurrency 5 --docs 8
+    python -m benchmarks.load_test --sessions 50 --concurrency 25 --ramp-up 60 \\
+        --ocr-latency-ms 2000 --ocr-jitter-ms 800 --llm-latency-ms 3000 --llm-jitter-ms 1500 \\
+        --output load_report.json
+
+Latencies are drawn per call from --ocr-dist / --llm-dist (constant,
+uniform, normal, lognormal, exponential; see app.services.latency_model).
+Documents are image-only ("scanned") PDFs and PNG/JPEG photos, unique per
+session, so neither duplicate detection nor the extraction cache skips work.
+Only OCR itself is stubbed: duplicate detection still renders the first PDF
+page for its perceptual hash (skipped, with a log line, without poppler).
+Uploads, reports and carry-forward indexes go to a scratch directory that
+is deleted afterwards unless --keep-work-dir is given.
+
+Resource usage comes from psutil when installed, otherwise /proc (Linux).
+The load generator shares the machine with the server; its own CPU time is
+reported too, so a saturated client is not mistaken for a slow server.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+from PIL import Image, ImageDraw
+from openpyxl import Workbook
+
+from app.services.latency_model import DISTRIBUTIONS
+
+from benchmarks.synthetic import make_gstr2b
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Terminal statuses of a processing session as /progress reports them
+DONE_STATUSES = ("completed", "error")
+
+# Invoice fields the GSTR-2B is built from
+REVIEW_FIELDS = (
+    "supplier_gstin", "invoice_number", "invoice_date", "document_type", "taxable_value",
+    "cgst", "sgst", "igst", "total_amount", "status"
+)
+
+# Scan resolution of generated documents; the stub never reads the pixels,
+# so this only sets upload size
+PAGE_SIZE = (827, 1169)  # A4 at 100 dpi
+
+
+class SessionFailed(Exception):
+    pass
+
+
+def _page_image(rng: random.Random, title: str, page: int, pages: int) -> Image.Image:
+    """A scanned-looking invoice page: header, item table, a little noise"""
+    image = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    y = 40
+    for line in (title, "TAX INVOICE", f"GSTIN: {rng.randint(10, 37)}ABCDE{rng.randint(1000, 9999)}F1Z{rng.randint(1, 9)}"):
+        draw.text((60, y), line, fill=0)
+        y += 24
+    for item in range(rng.randint(5, 20)):
+        draw.text((60, y + 40), f"{item + 1}  Item {rng.randint(1000, 9999)}  {rng.randint(1, 50)} x {rng.uniform(10, 5000):.2f}", fill=0)
+        y += 20
+    draw.text((60, PAGE_SIZE[1] - 60), f"Page {page} of {pages}", fill=0)
+    for _ in range(400):
+        image.putpixel((rng.randrange(PAGE_SIZE[0]), rng.randrange(PAGE_SIZE[1])), rng.randint(0, 200))
+    return image
+
+
+def make_documents(session_index: int, count: int, seed: int, pdf_share: float, max_pages: int) -> List[Dict]:
+    """[{"filename", "content", "content_type"}] for one session, deterministic per seed"""
+    rng = random.Random(f"{seed}-{session_index}")
+    documents = []
+    for doc_index in range(count):
+        title = f"Supplier {rng.randint(1, 999)} Pvt Ltd  bill {session_index:04d}-{doc_index:04d}"
+        buffer = io.BytesIO()
+        if rng.random() < pdf_share:
+            pages = rng.randint(1, max_pages)
+            images = [_page_image(rng, title, page + 1, pages) for page in range(pages)]
+            images[0].save(buffer, "PDF", save_all=True, append_images=images[1:], resolution=100)
+            filename, content_type = f"bill_{doc_index:04d}.pdf", "application/pdf"
+        elif rng.random() < 0.5:
+            _page_image(rng, title, 1, 1).save(buffer, "PNG")
+            filename, content_type = f"photo_{doc_index:04d}.png", "image/png"
+        else:
+            _page_image(rng, title, 1, 1).save(buffer, "JPEG", quality=80)
+            filename, content_type = f"photo_{doc_index:04d}.jpg", "image/jpeg"
+        documents.append({"filename": filename, "content": buffer.getvalue(), "content_type": content_type})
+    return documents
+
+
+def gstr2b_workbook(invoices: List[Dict], seed: int) -> bytes:
+    """GSTR-2B Excel export derived from the reviewed rows, with the usual missing/mismatch rates"""
+    books = []
+    for invoice in invoices:
+        if not invoice.get("supplier_gstin") or not invoice.get("invoice_number"):
+            continue
+        books.append({
+            **{field: invoice.get(field) or 0.0 for field in ("taxable_value", "cgst", "sgst", "igst", "total_amount")},
+            "supplier_gstin": invoice["supplier_gstin"],
+            "invoice_number": invoice["invoice_number"],
+            "invoice_date": invoice.get("invoice_date"),
+            "document_type": invoice.get("document_type") or "Invoice",
+            "status": "extracted"
+        })
+    # At least one supplier invoice not in the books, so the upload is never empty
+    rows = make_gstr2b(books, seed, extra_rate=max(0.04, 1.0 / max(1, len(books))))["invoices"]
+
+    columns = ["supplier_gstin", "invoice_no", "invoice_date", "taxable_value", "cgst", "sgst", "igst", "total_amount"]
+    source = ["gstin", "inv_no", "inv_dt", "taxable_value", "cgst", "sgst", "igst", "total_amount"]
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(columns)
+    for row in rows:
+        worksheet.append([row.get(key) for key in source])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class LoadRecorder:
+    """Request latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Dict:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            raise SessionFailed(f"{label}: {type(e).__name__}: {str(e)}")
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            raise SessionFailed(f"{label}: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()
+
+
+async def run_session(
+    client: httpx.AsyncClient,
+    recorder: LoadRecorder,
+    index: int,
+    documents: List[Dict],
+    args
+) -> Dict:
+    """One CA working through one client-month; returns its timings"""
+    client_name = f"load_{args.run_id}_{index:04d}"
+    month = "2026_01"
+    result = {"session": index, "client_name": client_name, "documents": len(documents), "status": "running", "error": None}
+    started = time.perf_counter()
+    try:
+        stage = time.perf_counter()
+        upload = await recorder.request(
+            client, "POST /upload", "POST", "/upload/",
+            data={"client_name": client_name, "month": month},
+            files=[("files", (doc["filename"], doc["content"], doc["content_type"])) for doc in documents]
+        )
+        if upload.get("status") != "success":
+            recorder.errors["POST /upload"] = recorder.errors.get("POST /upload", 0) + 1
+            raise SessionFailed(f"POST /upload: {upload.get('message')}")
+        result["upload_seconds"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        job = await recorder.request(
+            client, "POST /process/process", "POST", "/process/process",
+            params={"client_name": client_name, "month": month}
+        )
+        session_id = result["session_id"] = job["session_id"]
+        polls = 0
+        while True:
+            await asyncio.sleep(args.poll_interval)
+            progress = await recorder.request(client, "GET /process/progress", "GET", f"/process/progress/{session_id}")
+            polls += 1
+            if progress["status"] in DONE_STATUSES:
+                break
+            if time.perf_counter() - stage > args.job_timeout:
+                raise SessionFailed(f"job still {progress['status']} after {args.job_timeout:.0f}s")
+        result["job_seconds"] = time.perf_counter() - stage
+        result["polls"] = polls
+        if progress["status"] == "error":
+            raise SessionFailed(f"job failed: {progress.get('error')}")
+        result["extracted_count"] = progress["extracted_count"]
+        # Server-side breakdown of the job, from the session's stage timings
+        result["stages"] = {stage: totals["seconds"] for stage, totals in progress.get("timings", {}).get("stages", {}).items()}
+
+        stage = time.perf_counter()
+        invoices, cursor = [], None
+        while True:
+            page = await recorder.request(
+                client, "GET /process/session/invoices", "GET", f"/process/session/{session_id}/invoices",
+                params={"limit": 1000, "fields": ",".join(REVIEW_FIELDS), **({"cursor": cursor} if cursor else {})}
+            )
+            invoices.extend(page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        result["needs_review"] = sum(1 for invoice in invoices if invoice.get("status") in ("error", "pending_review"))
+
+        await recorder.request(
+            client, "POST /process/upload-gstr2b", "POST", f"/process/upload-gstr2b/{session_id}",
+            files={"file": ("gstr2b.xlsx", gstr2b_workbook(invoices, args.seed + index), "application/octet-stream")}
+        )
+        reconciliation = await recorder.request(
+            client, "POST /process/reconcile-gstr2b", "POST", f"/process/reconcile-gstr2b/{session_id}"
+        )
+        result["reconcile_seconds"] = time.perf_counter() - stage
+        result["reconciliation_summary"] = {
+            key: value for key, value in reconciliation["reconciliation"]["summary"].items()
+            if isinstance(value, (int, float))
+        }
+        result["status"] = "completed"
+    except SessionFailed as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        print(f"[LOAD] session {index}: ✗ {str(e)}", file=sys.stderr)
+    result["total_seconds"] = time.perf_counter() - started
+    return result
+
+
+async def run_sessions(base_url: str, all_documents: List[List[Dict]], args) -> Dict:
+    """All sessions, at most --concurrency at once, starts spread over --ramp-up"""
+    recorder = LoadRecorder()
+    slots = asyncio.Semaphore(args.concurrency)
+    results = []
+
+    async def one(index: int, client: httpx.AsyncClient):
+        await asyncio.sleep(args.ramp_up * index / max(1, len(all_documents)))
+        async with slots:
+            result = await run_session(client, recorder, index, all_documents[index], args)
+        results.append(result)
+        done = len(results)
+        if done % max(1, len(all_documents) // 10) == 0 or done == len(all_documents):
+            print(f"[LOAD] {done}/{len(all_documents)} sessions finished", file=sys.stderr)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        await asyncio.gather(*(one(index, client) for index in range(len(all_documents))))
+    results.sort(key=lambda result: result["session"])
+    return {"recorder": recorder, "results": results}
+
+
+class ResourceSampler:
+    """Samples a process's CPU, RSS, threads and open files at a fixed interval"""
+
+    def __init__(self, pid: int, interval: float):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Dict] = []
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._process = psutil.Process(pid) if psutil else None
+
+    def available(self) -> bool:
+        return self._process is not None or os.path.exists(f"/proc/{self.pid}/stat")
+
+    def _read(self) -> Optional[Dict]:
+        try:
+            if self._process is not None:
+                cpu = self._process.cpu_times()
+                return {
+                    "cpu_seconds": cpu.user + cpu.system,
+                    "rss_bytes": self._process.memory_info().rss,
+                    "threads": self._process.num_threads(),
+                    "open_files": self._process.num_fds() if hasattr(self._process, "num_fds") else None
+                }
+            with open(f"/proc/{self.pid}/stat", "r") as f:
+                # Fields after the parenthesised command name, which may contain spaces
+                fields = f.read().rsplit(")", 1)[1].split()
+            rss_bytes = threads = None
+            with open(f"/proc/{self.pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss_bytes = int(line.split()[1]) * 1024
+                    elif line.startswith("Threads:"):
+                        threads = int(line.split()[1])
+            return {
+                "cpu_seconds": (int(fields[11]) + int(fields[12])) / self._clock_ticks,
+                "rss_bytes": rss_bytes,
+                "threads": threads,
+                "open_files": len(os.listdir(f"/proc/{self.pid}/fd"))
+            }
+        except (OSError, IndexError, ValueError):
+            return None
+        except Exception as e:
+            if psutil and isinstance(e, psutil.Error):
+                return None
+            raise
+
+    async def run(self):
+        while True:
+            sample = self._read()
+            if sample is not None:
+                sample["at"] = time.perf_counter()
+                self.samples.append(sample)
+            await asyncio.sleep(self.interval)
+
+    def summary(self) -> Optional[Dict]:
+        if len(self.samples) < 2:
+            return None
+        cpu_percent = []
+        for before, after in zip(self.samples, self.samples[1:]):
+            elapsed = after["at"] - before["at"]
+            if elapsed > 0:
+                cpu_percent.append((after["cpu_seconds"] - before["cpu_seconds"]) / elapsed * 100)
+        elapsed = self.samples[-1]["at"] - self.samples[0]["at"]
+        cpu_seconds = self.samples[-1]["cpu_seconds"] - self.samples[0]["cpu_seconds"]
+        rss = [sample["rss_bytes"] for sample in self.samples if sample["rss_bytes"] is not None]
+        threads = [sample["threads"] for sample in self.samples if sample["threads"] is not None]
+        open_files = [sample["open_files"] for sample in self.samples if sample["open_files"] is not None]
+        return {
+            "samples": len(self.samples),
+            "cpu_seconds": round(cpu_seconds, 2),
+            "cpu_percent_mean": round(cpu_seconds / elapsed * 100, 1) if elapsed else None,
+            "cpu_percent_p95": round(percentile(cpu_percent, 95), 1) if cpu_percent else None,
+            "cpu_percent_max": round(max(cpu_percent), 1) if cpu_percent else None,
+            "rss_mb_start": round(rss[0] / 2 ** 20, 1) if rss else None,
+            "rss_mb_max": round(max(rss) / 2 ** 20, 1) if rss else None,
+            "rss_mb_end": round(rss[-1] / 2 ** 20, 1) if rss else None,
+            "threads_max": max(threads) if threads else None,
+            "open_files_max": max(open_files) if open_files else None
+        }
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, name: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{name} not ready at {url} after {timeout:.0f}s")
+
+
+def start_services(args, work_dir: str) -> Dict:
+    """Gemini stub and API server subprocesses, with logs in the work directory"""
+    stub_port, api_port = free_port(), free_port()
+    log = open(os.path.join(work_dir, "server.log"), "w")
+    stub = subprocess.Popen(
+        [
+            sys.executable, "-m", "app.services.llm_stub_server",
+            "--port", str(stub_port),
+            "--latency-ms", str(args.llm_latency_ms),
+            "--jitter-ms", str(args.llm_jitter_ms),
+            "--latency-dist", args.llm_dist,
+            "--error-rate", str(args.llm_error_rate),
+            "--recordings-dir", os.path.join(work_dir, "recordings")
+        ],
+        cwd=BACKEND_DIR, stdout=log, stderr=subprocess.STDOUT
+    )
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "load-test",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "GEMINI_RECORD_MODE": "off",
+        "GEMINI_REQUESTS_PER_MINUTE": str(args.gemini_rpm),
+        "OCR_BACKEND": "stub",
+        "OCR_STUB_LATENCY_MS": str(args.ocr_latency_ms),
+        "OCR_STUB_JITTER_MS": str(args.ocr_jitter_ms),
+        "OCR_STUB_DISTRIBUTION": args.ocr_dist,
+        "UPLOAD_DIR": os.path.join(work_dir, "uploads"),
+        "EXCEL_DIR": os.path.join(work_dir, "excel"),
+        "CARRY_FORWARD_DIR": os.path.join(work_dir, "carry_forward")
+    }
+    env.pop("EXTRACTION_CACHE_DIR", None)
+    for assignment in args.server_env or []:
+        key, _, value = assignment.partition("=")
+        env[key] = value
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    services = {"stub": stub, "server": server, "log": log, "stub_url": f"http://127.0.0.1:{stub_port}", "api_url": f"http://127.0.0.1:{api_port}"}
+    try:
+        wait_until_ready(f"{services['stub_url']}/stats", stub, "Gemini stub")
+        wait_until_ready(f"{services['api_url']}/", server, "API server")
+    except RuntimeError:
+        stop_services(services)
+        raise
+    return services
+
+
+def stop_services(services: Dict):
+    for name in ("server", "stub"):
+        process = services[name]
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    services["log"].close()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def distribution(values: List[float]) -> Optional[Dict]:
+    """Count, mean and p50/p90/p95/p99/max of seconds, in milliseconds"""
+    if not values:
+        return None
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 1),
+        **{f"p{pct}_ms": round(percentile(values, pct) * 1000, 1) for pct in (50, 90, 95, 99)},
+        "max_ms": round(max(values) * 1000, 1)
+    }
+
+
+def build_report(args, run: Dict, wall_seconds: float, resources: Optional[Dict], stub_stats: Optional[Dict], generator_cpu: float) -> Dict:
+    recorder, results = run["recorder"], run["results"]
+    completed = [result for result in results if result["status"] == "completed"]
+    documents = sum(result["documents"] for result in completed)
+    stage_seconds: Dict[str, float] = {}
+    for result in completed:
+        for stage, seconds in result.get("stages", {}).items():
+            stage_seconds[stage] = round(stage_seconds.get(stage, 0.0) + seconds, 3)
+    return {
+        "created_at": datetime.now().isoformat(),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()},
+        "config": {
+            key: getattr(args, key) for key in (
+                "sessions", "concurrency", "ramp_up", "docs", "pdf_share", "max_pages", "seed", "poll_interval",
+                "ocr_dist", "ocr_latency_ms", "ocr_jitter_ms", "llm_dist", "llm_latency_ms", "llm_jitter_ms",
+                "llm_error_rate", "gemini_rpm"
+            )
+        },
+        "wall_seconds": round(wall_seconds, 2),
+        "sessions": {"completed": len(completed), "failed": len(results) - len(completed)},
+        "throughput": {
+            "sessions_per_minute": round(len(completed) / wall_seconds * 60, 2) if wall_seconds else None,
+            "documents_per_second": round(documents / wall_seconds, 2) if wall_seconds else None
+        },
+        "endpoints": {
+            label: {**distribution(values), "errors": recorder.errors.get(label, 0)}
+            for label, values in recorder.latencies.items()
+        },
+        "endpoint_errors": recorder.errors,
+        "job_completion": distribution([result["job_seconds"] for result in completed]),
+        "job_seconds_per_document": distribution([result["job_seconds"] / result["documents"] for result in completed if result["documents"]]),
+        "session_total": distribution([result["total_seconds"] for result in completed]),
+        "server_stage_seconds": stage_seconds,
+        "server_resources": resources,
+        "load_generator_cpu_seconds": round(generator_cpu, 2),
+        "llm_stub": stub_stats,
+        "failures": [{"session": result["session"], "error": result["error"]} for result in results if result["status"] != "completed"],
+        "results": results
+    }
+
+
+def print_report(report: Dict):
+    out = sys.stderr
+    print(f"\n{report['sessions']['completed']} sessions completed, {report['sessions']['failed']} failed in {report['wall_seconds']:.1f}s"
+          f" ({report['throughput']['sessions_per_minute']} sessions/min, {report['throughput']['documents_per_second']} docs/s)", file=out)
+    print(f"\n{'endpoint':<34}{'count':>7}{'err':>5}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}", file=out)
+    for label, stats in report["endpoints"].items():
+        print(f"{label:<34}{stats['count']:>7}{stats['errors']:>5}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}", file=out)
+    for name in ("job_completion", "job_seconds_per_document", "session_total"):
+        stats = report[name]
+        if stats:
+            print(f"{name:<34}{stats['count']:>7}{'':>5}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}", file=out)
+    if report["server_stage_seconds"]:
+        print("\nserver stage seconds (summed over jobs): " + ", ".join(
+            f"{stage} {seconds:.1f}" for stage, seconds in report["server_stage_seconds"].items()
+        ), file=out)
+    resources = report["server_resources"]
+    if resources:
+        print(
+            f"\nserver: CPU mean {resources['cpu_percent_mean']}% (p95 {resources['cpu_percent_p95']}%, max {resources['cpu_percent_max']}%),"
+            f" RSS {resources['rss_mb_start']} -> max {resources['rss_mb_max']} MB, threads max {resources['threads_max']},"
+            f" open files max {resources['open_files_max']}",
+            file=out
+        )
+    print(f"load generator CPU: {report['load_generator_cpu_seconds']}s", file=out)
+    if report["llm_stub"]:
+        print(f"Gemini stub: {report['llm_stub']}", file=out)
+
+
+async def _run(args, base_url: str, server_pid: Optional[int], all_documents: List[List[Dict]]) -> Dict:
+    sampler = ResourceSampler(server_pid, args.sample_interval) if server_pid else None
+    if sampler is not None and not sampler.available():
+        print("[LOAD] Resource sampling needs psutil or /proc; skipping", file=sys.stderr)
+        sampler = None
+    sampling = asyncio.create_task(sampler.run()) if sampler else None
+    generator_started = time.process_time()
+    started = time.perf_counter()
+    try:
+        run = await run_sessions(base_url, all_documents, args)
+    finally:
+        if sampling:
+            sampling.cancel()
+    return {
+        "run": run,
+        "wall_seconds": time.perf_counter() - started,
+        "generator_cpu": time.process_time() - generator_started,
+        "resources": sampler.summary() if sampler else None
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test upload -> process -> progress -> reconcile with stubbed OCR and Gemini")
+    parser.add_argument("--sessions", type=int, default=10, help="Simulated CA sessions (one client-month each)")
+    parser.add_argument("--concurrency", type=int, default=5, help="Sessions in flight at once")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which session starts are spread")
+    parser.add_argument("--docs", type=int, default=8, help="Documents uploaded per session")
+    parser.add_argument("--pdf-share", type=float, default=0.6, help="Fraction of documents that are PDFs (rest PNG/JPEG)")
+    parser.add_argument("--max-pages", type=int, default=3, help="Pages per PDF are drawn from 1..N")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between /progress polls (the frontend uses 1s)")
+    parser.add_argument("--job-timeout", type=float, default=900.0)
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    parser.add_argument("--ocr-dist", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--ocr-latency-ms", type=float, default=1500.0, help="Mean stub OCR time per page")
+    parser.add_argument("--ocr-jitter-ms", type=float, default=500.0)
+    parser.add_argument("--llm-dist", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--llm-latency-ms", type=float, default=2500.0, help="Mean stub Gemini time per call")
+    parser.add_argument("--llm-jitter-ms", type=float, default=1000.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of Gemini calls answered with 429")
+    parser.add_argument("--gemini-rpm", type=float, default=600.0, help="GEMINI_REQUESTS_PER_MINUTE for the server's rate limiter")
+    parser.add_argument("--server-env", action="append", metavar="KEY=VALUE", help="Extra server environment (repeatable)")
+    parser.add_argument("--server-url", help="Use an already running server (with its own stubs) instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID to sample resources of, with --server-url")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--work-dir", help="Scratch directory; defaults to a new temporary directory")
+    parser.add_argument("--keep-work-dir", action="store_true", help="Keep uploads, reports and server.log")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+    args.run_id = f"{int(time.time()) % 100000:05d}"
+
+    print(f"[LOAD] Generating {args.sessions * args.docs} documents...", file=sys.stderr)
+    all_documents = [
+        make_documents(index, args.docs, args.seed, args.pdf_share, args.max_pages) for index in range(args.sessions)
+    ]
+    upload_mb = sum(len(doc["content"]) for docs in all_documents for doc in docs) / 2 ** 20
+    print(f"[LOAD] {upload_mb:.1f} MB of documents; {args.sessions} sessions, {args.concurrency} at a time", file=sys.stderr)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="gst_load_")
+    os.makedirs(work_dir, exist_ok=True)
+    services = None
+    try:
+        if args.server_url:
+            base_url, server_pid = args.server_url.rstrip("/"), args.server_pid
+        else:
+            services = start_services(args, work_dir)
+            base_url, server_pid = services["api_url"], services["server"].pid
+            print(f"[LOAD] Server {base_url} (pid {server_pid}), Gemini stub {services['stub_url']}, logs in {work_dir}", file=sys.stderr)
+
+        outcome = asyncio.run(_run(args, base_url, server_pid, all_documents))
+
+        stub_stats = None
+        if services:
+            try:
+                stub_stats = httpx.get(f"{services['stub_url']}/stats", timeout=5.0).json()
+            except httpx.HTTPError:
+                pass
+    finally:
+        if services:
+            stop_services(services)
+        if not args.keep_work_dir and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = build_report(args, outcome["run"], outcome["wall_seconds"], outcome["resources"], stub_stats, outcome["generator_cpu"])
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    return 1 if report["sessions"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
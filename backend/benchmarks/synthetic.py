@@ -0,0 +1,180 @@
+"""
+Seeded synthetic books / GSTR-2B datasets for benchmarks.
+
+Books invoices come from a pool of suppliers with valid GSTINs (state code,
+PAN, entity code, checksum) and per-supplier invoice series with the fiscal
+year in the number, the way real bills look. The GSTR-2B side is derived
+from the books with controlled rates of:
+
+- missing: books invoice not filed by the supplier (Missing in GSTR-2B)
+- extra: supplier invoice not in the books (Missing in Books)
+- mismatch: taxable value drift, tax structure (IGST vs CGST+SGST) or date
+- typo: invoice number as OCR / data entry gets it wrong (O/0, dropped
+  separator, transposed digits, dropped fiscal year)
+
+The same seed and parameters always give the same data.
+
+    from benchmarks.synthetic import make_dataset
+    books, gstr2b = make_dataset(10000, seed=7, typo_rate=0.05)
+"""
+import random
+import string
+from typing import Dict, List, Tuple
+
+GSTIN_CHARS = string.digits + string.ascii_uppercase
+
+# Rates applied when make_dataset is called without overrides
+DEFAULT_RATES = {
+    "missing_rate": 0.08,
+    "extra_rate": 0.04,
+    "mismatch_rate": 0.10,
+    "typo_rate": 0.05,
+    "error_rate": 0.01,
+    "duplicate_rate": 0.01
+}
+
+
+def gstin_checksum(first14: str) -> str:
+    """Check character of a GSTIN (mod-36 Luhn variant used by the GST portal)"""
+    total = 0
+    for position, char in enumerate(first14):
+        product = GSTIN_CHARS.index(char) * (2 if position % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARS[(36 - total % 36) % 36]
+
+
+def make_gstin(rng: random.Random, state_code: int = None) -> str:
+    state = state_code if state_code is not None else rng.randint(1, 37)
+    pan = (
+        "".join(rng.choice(string.ascii_uppercase) for _ in range(3))
+        + rng.choice("CPHFATBLJG")  # PAN holder type
+        + rng.choice(string.ascii_uppercase)
+        + f"{rng.randint(0, 9999):04d}"
+        + rng.choice(string.ascii_uppercase)
+    )
+    first14 = f"{state:02d}{pan}{rng.choice('123456789')}Z"
+    return first14 + gstin_checksum(first14)
+
+
+def typo_variant(number: str, rng: random.Random) -> str:
+    """An invoice number as OCR or manual entry might mangle it"""
+    choice = rng.random()
+    if choice < 0.3 and "0" in number:
+        return number.replace("0", "O", 1)
+    if choice < 0.5:
+        return number.replace("/", "")
+    if choice < 0.7:
+        digits = [i for i in range(len(number) - 1) if number[i].isdigit() and number[i + 1].isdigit()]
+        if digits:
+            i = rng.choice(digits)
+            return number[:i] + number[i + 1] + number[i] + number[i + 2:]
+    if choice < 0.85 and "/24-25/" in number:
+        return number.replace("/24-25/", "/")
+    return number.replace("1", "I", 1) if "1" in number else number + "A"
+
+
+def _amounts(taxable: float, inter_state: bool) -> Dict:
+    tax = round(taxable * 0.18, 2)
+    return {
+        "taxable_value": taxable,
+        "cgst": 0.0 if inter_state else round(tax / 2, 2),
+        "sgst": 0.0 if inter_state else round(tax / 2, 2),
+        "igst": tax if inter_state else 0.0,
+        "total_amount": round(taxable + tax, 2)
+    }
+
+
+def make_books(rows: int, seed: int = 7, error_rate: float = 0.01, duplicate_rate: float = 0.01) -> List[Dict]:
+    """Books invoices as extraction produces them"""
+    rng = random.Random(seed)
+    client_state = 27
+    suppliers = [
+        {
+            "gstin": make_gstin(rng),
+            "prefix": rng.choice(["INV", "TI", "GST", "BILL", "S"]) + rng.choice(["", str(rng.randint(1, 9))]),
+            "next": rng.randint(1, 5000)
+        }
+        for _ in range(max(5, min(rows // 20, 5000)))
+    ]
+    books = []
+    for i in range(rows):
+        supplier = rng.choice(suppliers)
+        supplier["next"] += rng.randint(1, 3)
+        taxable = round(rng.choice([rng.uniform(500, 20000), rng.uniform(20000, 500000)]), 2)
+        invoice = {
+            "file": f"bill_{i:06d}.pdf",
+            "supplier_gstin": supplier["gstin"],
+            "invoice_number": f"{supplier['prefix']}/24-25/{supplier['next']:05d}",
+            "invoice_date": f"2026-01-{rng.randint(1, 28):02d}",
+            "document_type": "Invoice" if rng.random() > 0.03 else "Credit Note",
+            **_amounts(taxable, int(supplier["gstin"][:2]) != client_state),
+            "expense_category": rng.choice(["Office Supplies", "Raw Material", "Services", "Travel"]),
+            "itc_eligibility": True,
+            "gstr2b_section": None,
+            "status": "extracted"
+        }
+        roll = rng.random()
+        if roll < error_rate:
+            invoice = {"file": invoice["file"], "status": "error", "error": "Failed to parse Gemini response"}
+        elif roll < error_rate + duplicate_rate and books:
+            invoice = {**rng.choice(books), "file": invoice["file"], "status": "duplicate"}
+        books.append(invoice)
+    return books
+
+
+def make_gstr2b(
+    books: List[Dict],
+    seed: int = 7,
+    missing_rate: float = 0.08,
+    extra_rate: float = 0.04,
+    mismatch_rate: float = 0.10,
+    typo_rate: float = 0.05
+) -> Dict:
+    """GSTR-2B data (portal field names) derived from the books"""
+    rng = random.Random(seed + 1)
+    invoices = []
+    for invoice in books:
+        if invoice.get("status") != "extracted" or rng.random() < missing_rate:
+            continue
+        number = invoice["invoice_number"]
+        if rng.random() < typo_rate:
+            number = typo_variant(number, rng)
+        row = {
+            "gstin": invoice["supplier_gstin"],
+            "inv_no": number,
+            "inv_dt": invoice["invoice_date"],
+            "document_type": invoice["document_type"],
+            **{key: invoice[key] for key in ("taxable_value", "cgst", "sgst", "igst", "total_amount")}
+        }
+        if rng.random() < mismatch_rate:
+            kind = rng.random()
+            if kind < 0.5:
+                row.update(_amounts(round(row["taxable_value"] * rng.uniform(0.9, 1.1), 2), row["igst"] > 0))
+            elif kind < 0.75:
+                row.update(_amounts(row["taxable_value"], row["igst"] == 0))
+            else:
+                row["inv_dt"] = f"2026-02-{rng.randint(1, 28):02d}"
+        invoices.append(row)
+
+    extra_rng = random.Random(seed + 2)
+    for i in range(int(len(books) * extra_rate)):
+        invoices.append({
+            "gstin": make_gstin(extra_rng),
+            "inv_no": f"EXT/24-25/{i:06d}",
+            "inv_dt": f"2026-01-{extra_rng.randint(1, 28):02d}",
+            "document_type": "Invoice",
+            **_amounts(round(extra_rng.uniform(500, 50000), 2), extra_rng.random() < 0.3)
+        })
+    rng.shuffle(invoices)
+    return {"gstin": make_gstin(random.Random(seed), 27), "period": "2026-01", "invoices": invoices}
+
+
+def make_dataset(rows: int, seed: int = 7, **rates) -> Tuple[List[Dict], Dict]:
+    """(books invoices, GSTR-2B data) with DEFAULT_RATES overridden by rates"""
+    unknown = set(rates) - set(DEFAULT_RATES)
+    if unknown:
+        raise ValueError(f"Unknown rates: {', '.join(sorted(unknown))}")
+    rates = {**DEFAULT_RATES, **rates}
+    books = make_books(rows, seed, rates["error_rate"], rates["duplicate_rate"])
+    gstr2b = make_gstr2b(books, seed, rates["missing_rate"], rates["extra_rate"], rates["mismatch_rate"], rates["typo_rate"])
+    return books, gstr2b
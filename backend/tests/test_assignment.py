@@ -0,0 +1,117 @@
+import pytest
+
+from app.services.assignment import assign, greedy_assignment
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+
+
+def test_greedy_takes_best_free_column_in_row_order():
+    candidates = {"a": [("x", 0.9), ("y", 0.85)], "b": [("x", 0.88)]}
+    assert greedy_assignment(candidates) == {"a": "x"}
+
+
+def test_greedy_breaks_ties_on_the_earliest_listed_column():
+    candidates = {"a": [("y", 1.0), ("x", 1.0)]}
+    assert greedy_assignment(candidates) == {"a": "y"}
+
+
+def test_assignment_fixes_first_come_loss():
+    candidates = {"a": [("x", 0.9), ("y", 0.85)], "b": [("x", 0.88)]}
+    result = assign(candidates)
+    assert result["pairs"] == {"a": "y", "b": "x"}
+    assert result["score"] == pytest.approx(1.73)
+    assert result["greedy_score"] == pytest.approx(0.9)
+    assert result["reassigned"] == 2
+
+
+def test_equal_weight_optimum_keeps_the_greedy_pairing():
+    # Both pairings score 2; the solver may pick either, the baseline must win
+    candidates = {"a": [("x", 1.0), ("y", 1.0)], "b": [("x", 1.0), ("y", 1.0)]}
+    result = assign(candidates)
+    assert result["pairs"] == greedy_assignment(candidates) == {"a": "x", "b": "y"}
+    assert result["reassigned"] == 0
+    assert result["score"] == result["greedy_score"] == pytest.approx(2.0)
+
+
+def test_tie_within_rounding_keeps_the_greedy_pairing():
+    # a->y, b->x beats greedy a->x by float noise only
+    candidates = {"a": [("x", 0.9), ("y", 0.45)], "b": [("x", 0.45 + 1e-12)]}
+    result = assign(candidates)
+    assert result["pairs"] == {"a": "x"}
+    assert result["reassigned"] == 0
+
+
+def test_given_baseline_is_kept_on_ties():
+    candidates = {"a": [("x", 1.0), ("y", 1.0)], "b": [("x", 1.0), ("y", 1.0)]}
+    result = assign(candidates, baseline={"a": "y", "b": "x"})
+    assert result["pairs"] == {"a": "y", "b": "x"}
+    assert result["reassigned"] == 0
+
+
+def test_single_row_component_takes_its_best_edge():
+    candidates = {"a": [("x", 0.7), ("y", 0.95)]}
+    result = assign(candidates, baseline={"a": "x"})
+    assert result["pairs"] == {"a": "y"}
+    assert result["reassigned"] == 1
+
+
+def test_components_are_solved_independently():
+    candidates = {
+        "a": [("x", 0.9), ("y", 0.85)], "b": [("x", 0.88)],
+        "c": [("z", 0.95)], "d": [],
+    }
+    result = assign(candidates)
+    assert result["pairs"] == {"a": "y", "b": "x", "c": "z"}
+    assert result["score"] == pytest.approx(1.73 + 0.95)
+
+
+def test_oversized_component_keeps_greedy():
+    candidates = {"a": [("x", 0.9), ("y", 0.85)], "b": [("x", 0.88)]}
+    result = assign(candidates, max_edges=2)
+    assert result["pairs"] == {"a": "x"}
+    assert result["oversized_components"] == 1
+
+
+def test_optimum_is_at_least_greedy_on_dense_random_graphs():
+    import random
+    rng = random.Random(3)
+    for _ in range(50):
+        candidates = {
+            row: [(column, round(rng.uniform(0.1, 1.0), 2)) for column in rng.sample(range(6), rng.randint(0, 4))]
+            for row in range(6)
+        }
+        result = assign(candidates)
+        columns = list(result["pairs"].values())
+        assert len(columns) == len(set(columns))
+        assert result["score"] >= result["greedy_score"] - 1e-9
+
+
+def invoice(number, taxable, date, gstin="27AAACB1234F1Z5"):
+    return {
+        "supplier_gstin": gstin, "invoice_number": number, "invoice_date": date,
+        "document_type": "Invoice", "taxable_value": taxable,
+        "cgst": round(taxable * 0.09, 2), "sgst": round(taxable * 0.09, 2), "igst": 0.0,
+        "total_amount": round(taxable * 1.18, 2), "status": "extracted"
+    }
+
+
+def test_repeated_match_key_pairs_by_closeness_not_input_order():
+    engine = GSTRReconciliationEngine()
+    books = [invoice("INV-1", 5000.0, "2026-01-20"), invoice("INV-1", 1000.0, "2026-01-05")]
+    gstr2b = [invoice("INV-1", 1000.0, "2026-01-05"), invoice("INV-1", 5000.0, "2026-01-20")]
+
+    result = engine.reconcile(books, gstr2b)
+    pairs = {row["books_index"]: row["gstr2b_index"] for row in result["books_reconciliation"]}
+    assert pairs == {0: 1, 1: 0}
+    assert all(row["status"] == "Matched" for row in result["books_reconciliation"])
+    assert result["summary"]["assignment"]["reassigned"] == 2
+
+
+def test_repeated_match_key_tie_keeps_input_order():
+    engine = GSTRReconciliationEngine()
+    books = [invoice("INV-1", 1000.0, "2026-01-05"), invoice("INV-1", 1000.0, "2026-01-05")]
+    gstr2b = [invoice("INV-1", 1000.0, "2026-01-05"), invoice("INV-1", 1000.0, "2026-01-05")]
+
+    result = engine.reconcile(books, gstr2b)
+    pairs = {row["books_index"]: row["gstr2b_index"] for row in result["books_reconciliation"]}
+    assert pairs == {0: 0, 1: 1}
+    assert result["summary"]["assignment"]["reassigned"] == 0
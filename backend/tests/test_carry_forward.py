@@ -0,0 +1,100 @@
+from app.services.carry_forward import CarryForwardIndex
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.invoice_record import as_records
+
+GSTIN = "27AAAAA0000A1Z5"
+
+
+def invoice(number, month):
+    return {
+        "invoice_number": number, "supplier_gstin": GSTIN, "invoice_date": f"2026-{month[-2:]}-05",
+        "taxable_value": 100.0, "cgst": 9.0, "sgst": 9.0, "igst": 0.0, "total_amount": 118.0
+    }
+
+
+def apply_period(index, month, books_numbers, gstr2b_numbers):
+    """Reconcile one period and run it through the carry-forward index"""
+    books = as_records([{**invoice(number, month), "status": "extracted"} for number in books_numbers])
+    gstr2b = GSTR2BIndex({"gstin": GSTIN, "period": month, "invoices": [invoice(n, month) for n in gstr2b_numbers]})
+    reconciliation = GSTRReconciliationEngine().reconcile(books, gstr2b.invoices)
+    # Reconciled again within the same test, so drop the run's own timestamp
+    reconciliation.pop("timestamp", None)
+    return index.apply(month, reconciliation, books, gstr2b.invoices)
+
+
+def carried(result):
+    """(side, invoice number) -> carry_forward block of every annotated result"""
+    blocks = {}
+    for row in result["books_reconciliation"]:
+        if "carry_forward" in row:
+            blocks[("books", row["books_invoice_number"])] = row["carry_forward"]
+    for row in result["gstr2b_unmatched"]:
+        if "carry_forward" in row:
+            blocks[("gstr2b", row["gstr2b_invoice_number"])] = row["carry_forward"]
+    return blocks
+
+
+def open_numbers(index):
+    return {side: sorted(item["invoice"]["invoice_number"] for item in items) for side, items in index.open_items().items()}
+
+
+def test_next_period_closes_open_items(tmp_path):
+    index = CarryForwardIndex("Acme", tmp_path / "acme.json")
+
+    january = apply_period(index, "2026_01", ["A1", "B2"], ["C3"])
+    assert carried(january) == {}
+    assert january["summary"]["carry_forward"] == {"matched_books": 0, "matched_gstr2b": 0, "opened": 3, "open_items": 3}
+
+    # A1 reaches GSTR-2B a month late; C3 is booked a month late
+    february = apply_period(index, "2026_02", ["C3", "D4"], ["A1"])
+    blocks = carried(february)
+    assert {key: block["matched_period"] for key, block in blocks.items()} == {
+        ("books", "C3"): "2026_01",
+        ("gstr2b", "A1"): "2026_01"
+    }
+    assert blocks[("books", "C3")]["matched_side"] == "gstr2b"
+    assert february["summary"]["carry_forward"] == {"matched_books": 1, "matched_gstr2b": 1, "opened": 1, "open_items": 2}
+    assert open_numbers(index) == {"books": ["B2", "D4"], "gstr2b": []}
+
+
+def test_rerunning_a_period_is_idempotent(tmp_path):
+    index = CarryForwardIndex("Acme", tmp_path / "acme.json")
+    apply_period(index, "2026_01", ["A1", "B2"], ["C3"])
+    february = apply_period(index, "2026_02", ["C3", "D4"], ["A1"])
+
+    assert apply_period(index, "2026_02", ["C3", "D4"], ["A1"]) == february
+    assert open_numbers(index) == {"books": ["B2", "D4"], "gstr2b": []}
+
+    # January again: what February closed stays closed
+    january = apply_period(index, "2026_01", ["A1", "B2"], ["C3"])
+    assert carried(january) == {
+        ("books", "A1"): {"closed_in": "2026_02"},
+        ("gstr2b", "C3"): {"closed_in": "2026_02"}
+    }
+    assert open_numbers(index) == {"books": ["B2", "D4"], "gstr2b": []}
+
+
+def test_rerun_without_the_match_reopens_the_item(tmp_path):
+    index = CarryForwardIndex("Acme", tmp_path / "acme.json")
+    apply_period(index, "2026_01", ["A1", "B2"], ["C3"])
+    apply_period(index, "2026_02", ["C3", "D4"], ["A1"])
+
+    # C3 turns out to be misread in February's books
+    february = apply_period(index, "2026_02", ["C8", "D4"], ["A1"])
+    assert set(carried(february)) == {("gstr2b", "A1")}
+    assert open_numbers(index) == {"books": ["B2", "C8", "D4"], "gstr2b": ["C3"]}
+
+
+def test_index_persists_across_reloads(tmp_path):
+    path = tmp_path / "acme.json"
+    index = CarryForwardIndex("Acme", path)
+    apply_period(index, "2026_01", ["A1", "B2"], ["C3"])
+    apply_period(index, "2026_02", ["C3", "D4"], ["A1"])
+
+    reloaded = CarryForwardIndex("Acme", path)
+    assert reloaded.open_count == 2
+    assert reloaded.open_items() == index.open_items()
+
+    # The reloaded index still knows which period closed what
+    assert apply_period(reloaded, "2026_02", ["C3", "D4"], ["A1"]) == apply_period(index, "2026_02", ["C3", "D4"], ["A1"])
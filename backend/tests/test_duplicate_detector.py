@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import random
+
+from app.services.document_processor import DocumentProcessor
+from app.services.duplicate_detector import DuplicateDetector, get_duplicate_detector
+from app.services.extraction_cache import ExtractionCache
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def document(rng, length=300):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def edited(rng, text, rate):
+    return " ".join(word if rng.random() > rate else rng.choice(WORDS) for word in text.split())
+
+
+def pairwise_link(detector, registered, text, own_hash):
+    """What check_text returned when it compared against every earlier file"""
+    shingles = detector._shingles(text)
+    best = None
+    for path, other_shingles, other_hash in registered:
+        similarity = detector._jaccard(shingles, other_shingles)
+        close = detector._hashes_close(own_hash, other_hash)
+        threshold = detector.text_similarity_threshold_with_hash if close else detector.text_similarity_threshold
+        if similarity >= threshold and (best is None or similarity > best[1]):
+            best = (path, similarity)
+    return best[0] if best else None
+
+
+def test_near_duplicate_text_is_linked_to_first_copy():
+    rng = random.Random(3)
+    original = document(rng)
+    detector = DuplicateDetector()
+    assert detector.check_text("email.pdf", original) is None
+    assert detector.check_text("other.pdf", document(rng)) is None
+
+    link = detector.check_text("photo.jpg", edited(rng, original, 0.005))
+    assert link["duplicate_of"] == "email.pdf"
+    assert link["method"] == "text_shingles"
+    assert link["similarity"] >= 0.9
+
+
+def test_different_invoice_numbers_are_never_duplicates():
+    rng = random.Random(4)
+    body = document(rng)
+    detector = DuplicateDetector()
+    assert detector.check_text("a.pdf", "Invoice No: INV-001\n" + body) is None
+    assert detector.check_text("b.pdf", "Invoice No: INV-002\n" + body) is None
+
+
+def test_close_perceptual_hashes_lower_the_text_threshold():
+    rng = random.Random(5)
+    original = document(rng)
+    copy = edited(rng, original, 0.03)
+    detector = DuplicateDetector()
+    detector._perceptual_hashes.update({"scan.pdf": 0b1011, "rescan.pdf": 0b1001})
+    detector.check_text("scan.pdf", original)
+
+    link = detector.check_text("rescan.pdf", copy)
+    assert link is not None
+    assert link["method"] == "perceptual_hash+text_shingles"
+
+
+def test_lsh_index_finds_the_same_links_as_a_pairwise_scan():
+    rng = random.Random(6)
+    texts = []
+    for _ in range(400):
+        if texts and rng.random() < 0.3:
+            texts.append(edited(rng, rng.choice(texts), rng.choice([0.005, 0.02, 0.05, 0.1])))
+        else:
+            texts.append(document(rng, rng.randint(100, 400)))
+
+    detector = DuplicateDetector()
+    registered = []
+    links = 0
+    for index, text in enumerate(texts):
+        path = f"doc_{index}.pdf"
+        own_hash = 0 if index % 2 else None
+        detector._perceptual_hashes[path] = own_hash
+        expected = pairwise_link(detector, registered, text, own_hash)
+
+        link = detector.check_text(path, text)
+        assert (link["duplicate_of"] if link else None) == expected
+        if link is None:
+            registered.append((path, detector._shingles(text), own_hash))
+        else:
+            links += 1
+    assert links > 20
+
+
+def test_same_bill_in_a_later_batch_is_linked_not_served_from_cache(tmp_path):
+    bill = b"scanned bill bytes"
+    first = tmp_path / "2026_01" / "bill.png"
+    second = tmp_path / "2026_02" / "bill_again.png"
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_bytes(bill)
+
+    processor = DocumentProcessor()
+    processor.extraction_cache = ExtractionCache()
+    # Extracted before, so neither batch needs OCR or Gemini
+    records = [{"file": "bill.png", "invoice_number": "INV-7", "status": "extracted"}]
+    processor.extraction_cache.put(hashlib.sha256(bill).hexdigest(), records, "Invoice No: INV-7")
+    detector = get_duplicate_detector("Two Batch Traders")
+
+    january = asyncio.run(processor.process_documents([str(first)], duplicate_detector=detector))
+    assert january["invoices"][0]["status"] == "extracted"
+    assert january["duplicates"] == []
+
+    february = asyncio.run(processor.process_documents([str(second)], duplicate_detector=detector))
+    assert february["invoices"][0]["status"] == "duplicate"
+    assert february["duplicates"] == [
+        {"file": "bill_again.png", "duplicate_of": "bill.png", "method": "exact_hash", "similarity": 1.0}
+    ]
+
+    # Re-running the first batch keeps its own file canonical
+    again = asyncio.run(processor.process_documents([str(first)], duplicate_detector=detector))
+    assert again["duplicates"] == []
+
+
+def test_rechecking_a_file_does_not_link_it_to_itself():
+    rng = random.Random(7)
+    text = document(rng)
+    detector = DuplicateDetector()
+    assert detector.check_text("scan.pdf", text) is None
+    assert detector.check_text("scan.pdf", text) is None
+    assert detector.check_text("copy.pdf", text)["duplicate_of"] == "scan.pdf"
+
+
+def test_shingle_hashes_are_stable_across_processes():
+    # Fixed value: hash() of a str is salted per process and would differ
+    assert DuplicateDetector()._shingles("invoice no inv 001 dated") == {15913806756410602909}
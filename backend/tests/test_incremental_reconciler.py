@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from app.services import incremental_reconciler
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.gstr_reconciliation import GSTRReconciliationEngine
+from app.services.incremental_reconciler import IncrementalReconciler
+from app.services.invoice_record import as_records
+from benchmarks.synthetic import make_dataset
+
+
+def without_timestamp(result):
+    return {key: value for key, value in result.items() if key != "timestamp"}
+
+
+def full_reconcile(books, index):
+    return without_timestamp(GSTRReconciliationEngine().reconcile(books, index.invoices))
+
+
+def dataset(rows, seed):
+    books, gstr2b = make_dataset(rows, seed=seed, typo_rate=0.1, mismatch_rate=0.15)
+    return as_records(books), GSTR2BIndex(gstr2b)
+
+
+def random_edit(rng, books, index):
+    """One field edit of the kinds a reviewer makes"""
+    other = index.invoices[rng.randrange(len(index.invoices))]
+    return rng.choice([
+        {"taxable_value": round(rng.uniform(100, 50000), 2)},
+        {"total_amount": round(rng.uniform(100, 50000), 2)},
+        {"invoice_number": other.get("invoice_number")},
+        {"invoice_number": other.get("invoice_number"), "supplier_gstin": other.get("supplier_gstin")},
+        {"supplier_gstin": books[rng.randrange(len(books))].get("supplier_gstin")},
+        {"invoice_date": f"2026-01-{rng.randint(1, 28):02d}"},
+        {"document_type": rng.choice(["Invoice", "Credit Note"])},
+        {"status": "error"},
+        {"status": "extracted"},
+        {"status": "duplicate"},
+    ])
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_serial_build_equals_full_reconcile(seed):
+    books, index = dataset(1500, seed)
+    reconciler = IncrementalReconciler(books, index, workers=1)
+    assert without_timestamp(reconciler.result()) == full_reconcile(books, index)
+
+
+def test_parallel_build_equals_full_reconcile(monkeypatch):
+    monkeypatch.setattr(incremental_reconciler, "PARALLEL_MIN_INVOICES", 0)
+    books, index = dataset(2000, 4)
+    reconciler = IncrementalReconciler(books, index, workers=2)
+    assert without_timestamp(reconciler.result()) == full_reconcile(books, index)
+
+
+@pytest.mark.parametrize("seed", [5, 6])
+def test_random_patches_match_full_reconcile(seed):
+    rng = random.Random(seed)
+    books, index = dataset(800, seed)
+    reconciler = IncrementalReconciler(books, index, workers=1)
+
+    for step in range(150):
+        batch = [
+            {"index": rng.randrange(len(books)), "fields": random_edit(rng, books, index)}
+            for _ in range(rng.choice([1, 1, 1, 3]))
+        ]
+        changed = reconciler.apply_changes(batch)
+        if step % 15 == 0:
+            expected = full_reconcile(books, index)
+            assert without_timestamp(reconciler.result()) == expected
+            assert changed["summary"] == expected["summary"]
+
+    assert without_timestamp(reconciler.result()) == full_reconcile(books, index)
+
+
+def test_patches_after_parallel_build_match_full_reconcile(monkeypatch):
+    monkeypatch.setattr(incremental_reconciler, "PARALLEL_MIN_INVOICES", 0)
+    rng = random.Random(7)
+    books, index = dataset(1200, 7)
+    reconciler = IncrementalReconciler(books, index, workers=2)
+
+    for _ in range(100):
+        index_to_edit = rng.randrange(len(books))
+        reconciler.apply_changes([{"index": index_to_edit, "fields": random_edit(rng, books, index)}])
+
+    assert without_timestamp(reconciler.result()) == full_reconcile(books, index)
+
+
+def test_apply_changes_returns_only_changed_rows():
+    books, index = dataset(300, 8)
+    reconciler = IncrementalReconciler(books, index, workers=1)
+    before = without_timestamp(reconciler.result())
+
+    position = next(i for i, invoice in enumerate(books) if invoice.get("status") == "extracted")
+    changed = reconciler.apply_changes([{"index": position, "fields": {"status": "error"}}])
+
+    changed_books = {row["index"] for row in changed["books_reconciliation"]}
+    assert position in changed_books
+    after = without_timestamp(reconciler.result())
+    # Every row that differs from before is reported
+    before_rows = {row["books_index"]: row for row in before["books_reconciliation"]}
+    after_rows = {row["books_index"]: row for row in after["books_reconciliation"]}
+    differing = {i for i in set(before_rows) | set(after_rows) if before_rows.get(i) != after_rows.get(i)}
+    assert differing <= changed_books
+
+
+def test_invalid_change_is_rejected_before_anything_is_applied():
+    books, index = dataset(100, 9)
+    reconciler = IncrementalReconciler(books, index, workers=1)
+    before = without_timestamp(reconciler.result())
+
+    with pytest.raises(ValueError):
+        reconciler.apply_changes([
+            {"index": 0, "fields": {"status": "error"}},
+            {"index": len(books), "fields": {"status": "error"}},
+        ])
+    assert without_timestamp(reconciler.result()) == before
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from app.services.invoice_numbers import edit_distance, key_similarity, normalize_invoice_number
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("INV/24-25/0042", "42"),
+    ("Tax Invoice No. 42", "42"),
+    ("inv-2024-25-042", "42"),
+    ("FY24-25/42", "42"),
+    ("1NV/42", "42"),
+    ("O42", "42"),
+    ("B-0I2", "B012"),
+    # Not consecutive years: part of the number
+    ("12-34", "1234"),
+    # A label only counts when digits follow
+    ("NOTE5", "N0TE5"),
+    ("000", "0"),
+    ("", ""),
+    (None, ""),
+])
+def test_normalize_invoice_number(raw, expected):
+    assert normalize_invoice_number(raw) == expected
+
+
+def test_book_and_portal_spellings_share_a_key():
+    assert normalize_invoice_number("INV/2024-25/00O42") == normalize_invoice_number("42")
+    assert normalize_invoice_number("Bill No: 1I7") == normalize_invoice_number("117")
+
+
+def levenshtein(a, b):
+    """Plain dynamic-programming reference, no prefix/suffix trimming"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def test_edit_distance_matches_the_reference():
+    assert edit_distance("KITTEN", "SITTING") == 3
+    assert edit_distance("", "ABC") == 3
+    rng = random.Random(5)
+    for _ in range(2000):
+        a = "".join(rng.choice("0123AB") for _ in range(rng.randint(0, 8)))
+        b = "".join(rng.choice("0123AB") for _ in range(rng.randint(0, 8)))
+        assert edit_distance(a, b) == levenshtein(a, b)
+
+
+def test_key_similarity():
+    assert key_similarity("12345", "12345") == 1.0
+    assert key_similarity("12345", "12346") == pytest.approx(0.8)
+    assert key_similarity("1234", "12345") == pytest.approx(0.8)
+    assert key_similarity("", "12345") == 0.0
@@ -0,0 +1,91 @@
+import random
+
+from app.services.gstr2b_index import GSTR2BIndex
+from app.services.mismatch_detector import MismatchDetector
+
+BIG_SUPPLIER = "27AAACB1234F1Z5"
+SMALL_SUPPLIER = "29AAGCS5678K1Z2"
+
+
+class FullScanDetector(MismatchDetector):
+    """Scores every GSTR2B invoice, as detection did before candidate blocking"""
+
+    def _candidate_indices(self, extracted, index, blocks=None):
+        return list(range(len(index.invoices)))
+
+
+def row(gstin, number, date, total):
+    return {"gstin": gstin, "inv_no": number, "inv_dt": date, "total_amount": total, "taxable_value": round(total / 1.18, 2)}
+
+
+def make_case(seed, supplier_rows=300):
+    rng = random.Random(seed)
+    gstr2b = []
+    for i in range(supplier_rows):
+        gstr2b.append(row(BIG_SUPPLIER, f"INV/24-25/{i:05d}", f"2026-01-{rng.randint(1, 5):02d}", round(rng.uniform(1000, 3000), 2)))
+    for i in range(20):
+        gstr2b.append(row(SMALL_SUPPLIER, f"S-{i:03d}", f"2026-01-{rng.randint(1, 28):02d}", round(rng.uniform(1000, 3000), 2)))
+
+    extracted = []
+    for source in rng.sample(gstr2b, 120):
+        number, date, total = source["inv_no"], source["inv_dt"], source["total_amount"]
+        roll = rng.random()
+        if roll < 0.25:
+            # Far from every nearby number, but the same day and amount: still
+            # above the threshold on invoice-number similarity alone
+            number = "BILL" + number[-5:]
+        elif roll < 0.4:
+            number = number[:-2] + f"{rng.randint(0, 99):02d}"
+        elif roll < 0.5:
+            total = round(total * rng.uniform(0.9, 1.1), 2)
+        elif roll < 0.55:
+            date = f"{date[8:10]}/01/2026"
+        elif roll < 0.6:
+            date = "2026-02-01"
+        extracted.append({
+            "supplier_gstin": source["gstin"], "invoice_number": number, "invoice_date": date,
+            "total_amount": total, "status": "extracted"
+        })
+    extracted.append({"file": "broken.pdf", "status": "error"})
+    extracted.append({**extracted[0], "status": "duplicate"})
+    return extracted, {"invoices": gstr2b}
+
+
+def test_blocked_candidates_match_a_full_scan_for_large_suppliers():
+    for seed in range(4):
+        extracted, gstr2b = make_case(seed)
+        index = GSTR2BIndex(gstr2b)
+        blocked = MismatchDetector().detect_mismatches(extracted, index)
+        full = FullScanDetector().detect_mismatches(extracted, index)
+
+        assert blocked == full
+        assert blocked["summary"]["matched"] > 50
+
+
+def test_match_outside_the_nearest_invoice_numbers_is_found():
+    # "00051" is two edits from "00150" and has plenty of closer numbers, but
+    # only row 150 has its date and amount
+    gstr2b = {"invoices": [
+        row(BIG_SUPPLIER, f"INV/24-25/{i:05d}", f"2026-01-{i % 28 + 1:02d}", 1000.0 + i) for i in range(200)
+    ]}
+    extracted = [{
+        "supplier_gstin": BIG_SUPPLIER, "invoice_number": "INV/24-25/00051", "invoice_date": "11-01-2026",
+        "total_amount": 1150.0, "status": "extracted"
+    }]
+
+    result = MismatchDetector().detect_mismatches(extracted, gstr2b)
+    assert result["summary"]["matched"] == 1
+    assert result["matched_pairs"][0]["gstr2b"]["invoice_number"] == "INV/24-25/00150"
+
+
+def test_candidates_are_the_same_supplier_and_day():
+    detector = MismatchDetector()
+    index = GSTR2BIndex({"invoices": [
+        row(BIG_SUPPLIER, "A-1", "2026-01-03", 100.0),
+        row(BIG_SUPPLIER, "A-2", "2026-01-04", 100.0),
+        row(SMALL_SUPPLIER, "A-1", "2026-01-03", 100.0),
+        row(BIG_SUPPLIER.lower(), "A-3", "03/01/2026", 100.0),
+    ]})
+    blocks = detector._candidate_blocks(index)
+    extracted = {"supplier_gstin": BIG_SUPPLIER, "invoice_number": "A-1", "invoice_date": "2026-01-03"}
+    assert detector._candidate_indices(extracted, index, blocks) == [0, 3]
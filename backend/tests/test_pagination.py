@@ -0,0 +1,18 @@
+from app.utils.pagination import paginate
+
+
+def test_index_is_list_position_by_default():
+    items = [{"status": "ok"}, {"status": "error"}, {"status": "ok"}]
+    page = paginate(items, limit=10, predicate=lambda item: item["status"] == "ok")
+    assert [item["index"] for item in page["items"]] == [0, 2]
+
+
+def test_index_key_reports_the_referenced_invoice():
+    # GSTR-2B invoices left unmatched: positions in the list are not invoice positions
+    rows = [{"gstr2b_index": 4, "status": "Missing in Books"}, {"gstr2b_index": 9, "status": "Missing in Books"}]
+    first = paginate(rows, limit=1, index_key="gstr2b_index", fields=["status"])
+    assert first["items"] == [{"index": 4, "status": "Missing in Books"}]
+
+    second = paginate(rows, cursor=first["next_cursor"], limit=1, index_key="gstr2b_index")
+    assert [item["index"] for item in second["items"]] == [9]
+    assert second["next_cursor"] is None
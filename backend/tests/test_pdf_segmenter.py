@@ -0,0 +1,72 @@
+from app.services.pdf_segmenter import segment_pages
+
+
+def page(invoice_number=None, gstin=None, marker=None, body="Item 1  Qty 2  Rate 100.00"):
+    lines = ["Acme Traders Pvt Ltd", "TAX INVOICE"]
+    if gstin:
+        lines.append(f"GSTIN: {gstin}")
+    if invoice_number:
+        lines.append(f"Invoice No: {invoice_number}")
+    lines.append(body)
+    if marker:
+        lines.append(f"Page {marker[0]} of {marker[1]}")
+    return "\n".join(lines)
+
+
+def ranges(segments):
+    return [(segment["start_page"], segment["end_page"]) for segment in segments]
+
+
+def test_single_page_is_one_segment():
+    segments = segment_pages([page("INV-001")])
+    assert ranges(segments) == [(1, 1)]
+    assert "INV-001" in segments[0]["text"]
+
+
+def test_empty_pdf_has_no_segments():
+    assert segment_pages([]) == []
+
+
+def test_page_markers_split_at_page_one():
+    pages = [page("A-1", marker=(1, 2)), page(marker=(2, 2)), page("B-7", marker=(1, 3)), page(marker=(2, 3)), page(marker=(3, 3))]
+    assert ranges(segment_pages(pages)) == [(1, 2), (3, 5)]
+
+
+def test_page_markers_win_over_a_repeated_invoice_number():
+    # The continuation page repeats a different-looking reference in its header
+    pages = [page("A-1", marker=(1, 2)), page("A-1-CONT", marker=(2, 2))]
+    assert ranges(segment_pages(pages)) == [(1, 2)]
+
+
+def test_declared_length_closes_segment_without_markers_on_later_pages():
+    pages = [page("A-1", marker=(1, 2)), page(), page()]
+    assert ranges(segment_pages(pages)) == [(1, 2), (3, 3)]
+
+
+def test_invoice_number_change_starts_new_invoice():
+    pages = [page("INV-100"), page("INV-100"), page("INV-101")]
+    assert ranges(segment_pages(pages)) == [(1, 2), (3, 3)]
+
+
+def test_gstin_change_starts_new_invoice_when_no_invoice_numbers():
+    pages = [page(gstin="27AAACB1234F1Z5"), page(gstin="27AAACB1234F1Z5"), page(gstin="29AAGCS5678K1Z2")]
+    assert ranges(segment_pages(pages)) == [(1, 2), (3, 3)]
+
+
+def test_pages_without_signals_continue_the_open_invoice():
+    pages = [page("INV-100", gstin="27AAACB1234F1Z5"), page(), page(body="Terms and conditions")]
+    segments = segment_pages(pages)
+    assert ranges(segments) == [(1, 3)]
+    assert segments[0]["text"].count("Acme Traders") == 3
+
+
+def test_invoice_number_below_the_header_is_ignored():
+    filler = "\n".join(f"line {i}" for i in range(20))
+    pages = [page("INV-100"), page(body=filler + "\nInvoice No: INV-999")]
+    assert ranges(segment_pages(pages)) == [(1, 2)]
+
+
+def test_signals_learned_on_continuation_pages_are_kept():
+    # The first page has no invoice number; the second supplies it
+    pages = [page(), page("INV-100"), page("INV-200")]
+    assert ranges(segment_pages(pages)) == [(1, 2), (3, 3)]
@@ -0,0 +1,297 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from app.services.rate_limiter import AdaptiveRateLimiter, CircuitBreaker, RetryableAPIError
+
+
+class APIError(Exception):
+    def __init__(self, message, code=None, status=None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = Response(status_code, headers)
+
+
+def make_limiter(**kwargs):
+    options = dict(requests_per_minute=60000, base_delay=0.001, max_delay=0.01, reset_timeout=0.2)
+    options.update(kwargs)
+    return AdaptiveRateLimiter(**options)
+
+
+def failing(errors, result="ok"):
+    """Callable raising the given errors in turn, then returning result"""
+    remaining = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+@pytest.mark.parametrize("error, expected", [
+    (APIError("quota", code=429), 429),
+    (APIError("unavailable", status="UNAVAILABLE"), 503),
+    (APIError("quota", status="RESOURCE_EXHAUSTED"), 429),
+    (HTTPError(502), 502),
+    (APIError("bad request", code=400), 400),
+    # Digits in the message are invoice data, not a status
+    (ValueError("Invoice INV/429/24 total 5003.00 for 27AAACB5003F1Z4"), None),
+    (RuntimeError("RESOURCE_EXHAUSTED mentioned in a note"), None),
+])
+def test_status_code_from_structured_fields_only(error, expected):
+    assert AdaptiveRateLimiter._status_code(error) == expected
+
+
+def test_retries_server_errors_then_succeeds():
+    limiter = make_limiter()
+    fn = failing([APIError("down", code=503), HTTPError(500)])
+
+    assert asyncio.run(limiter.call(fn)) == "ok"
+    assert len(fn.calls) == 3
+    stats = limiter.get_stats()
+    assert stats["retries"] == 2
+    assert stats["server_errors"] == 2
+    assert stats["successes"] == 1
+    assert stats["circuit_state"] == "closed"
+
+
+def test_client_error_is_not_retried():
+    limiter = make_limiter()
+    fn = failing([APIError("bad request", code=400)])
+
+    with pytest.raises(APIError):
+        asyncio.run(limiter.call(fn))
+    assert len(fn.calls) == 1
+    assert limiter.breaker.failures == 0
+
+
+def test_non_api_error_with_status_like_digits_is_not_retried_or_counted():
+    limiter = make_limiter(failure_threshold=1)
+    fn = failing([ValueError("taxable value 429.00, IGST 500.00")])
+
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.call(fn))
+    assert len(fn.calls) == 1
+    assert limiter.get_stats()["retries"] == 0
+    assert limiter.breaker.state == "closed"
+
+
+def test_gives_up_after_max_retries():
+    limiter = make_limiter(max_retries=2, failure_threshold=100)
+    fn = failing([APIError("down", code=503)] * 5)
+
+    with pytest.raises(RetryableAPIError):
+        asyncio.run(limiter.call(fn))
+    assert len(fn.calls) == 3
+
+
+def test_throttling_halves_concurrency_and_honours_retry_after():
+    limiter = make_limiter(initial_concurrency=4, max_delay=1.0)
+    fn = failing([HTTPError(429, {"retry-after": "0.2"})])
+
+    started = time.monotonic()
+    asyncio.run(limiter.call(fn))
+    assert fn.calls[1] - started >= 0.2
+    assert limiter.get_stats()["throttled"] == 1
+    # Halved to 2, then +1/2 for the success
+    assert limiter.concurrency_limit == pytest.approx(2.5)
+
+
+def test_burst_of_throttled_calls_halves_concurrency_once():
+    limiter = make_limiter(initial_concurrency=4, max_concurrency=4, max_retries=0)
+    sent = []
+
+    def burst():
+        # All four are in flight before any of them hears back
+        sent.append(None)
+        deadline = time.monotonic() + 5
+        while len(sent) < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        raise HTTPError(429)
+
+    async def run():
+        return await asyncio.gather(*(limiter.call(burst) for _ in range(4)), return_exceptions=True)
+
+    asyncio.run(run())
+    assert limiter.get_stats()["throttled"] == 4
+    # One overloaded window, one halving
+    assert limiter.concurrency_limit == pytest.approx(2.0)
+
+    # A call sent after that decrease and throttled again backs off again,
+    # then gains +1/1 for its success
+    limiter.max_retries = 1
+    asyncio.run(limiter.call(failing([HTTPError(429)])))
+    assert limiter.concurrency_limit == pytest.approx(2.0)
+    assert limiter.get_stats()["throttled"] == 5
+
+
+def test_cancelled_waiter_refunds_its_token():
+    limiter = make_limiter(requests_per_minute=60)
+    bucket = limiter.bucket
+    bucket.tokens = 0.0
+
+    async def run():
+        waiter = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+    # Only the refill while it waited is gone, not the reservation
+    assert bucket.tokens >= 0.0
+
+
+def test_cancelled_call_waiting_for_a_slot_refunds_its_token():
+    limiter = make_limiter(initial_concurrency=1, max_concurrency=1)
+
+    async def run():
+        with limiter._slot_lock:
+            limiter.in_flight = 1
+        tokens = limiter.bucket.tokens
+        call = asyncio.ensure_future(limiter.call(lambda: "ok"))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        return tokens
+
+    tokens = asyncio.run(run())
+    assert limiter.bucket.tokens == pytest.approx(tokens)
+
+
+def test_stats_count_every_call_from_many_threads():
+    limiter = make_limiter()
+
+    async def run():
+        await asyncio.gather(*(limiter.call(lambda: 1) for _ in range(50)))
+
+    def client():
+        asyncio.run(run())
+
+    threads = [threading.Thread(target=client) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = limiter.get_stats()
+    assert stats["calls"] == stats["successes"] == 200
+
+
+def test_backoff_is_bounded_by_max_delay():
+    limiter = make_limiter(base_delay=1.0, max_delay=4.0)
+    error = APIError("down", code=503)
+    for attempt in range(10):
+        assert 0 <= limiter._backoff_delay(attempt, error) <= min(4.0, 2 ** attempt)
+
+
+def test_concurrency_limit_bounds_calls_in_flight():
+    limiter = make_limiter(initial_concurrency=2, max_concurrency=2)
+    peak = []
+
+    def fn():
+        peak.append(limiter.in_flight)
+        time.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(*(limiter.call(fn) for _ in range(8)))
+
+    asyncio.run(run())
+    assert max(peak) == 2
+    assert limiter.in_flight == 0
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_success()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_open_breaker_holds_calls_until_reset_timeout():
+    limiter = make_limiter(max_retries=0, failure_threshold=2, reset_timeout=0.3)
+    down = failing([APIError("down", code=503)] * 2)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RetryableAPIError):
+                await limiter.call(down)
+        assert limiter.breaker.state == "open"
+        opened = time.monotonic()
+        # Waits instead of failing the file, then goes through as the trial
+        result = await limiter.call(lambda: "recovered")
+        return result, time.monotonic() - opened
+
+    result, waited = asyncio.run(run())
+    assert result == "recovered"
+    assert waited >= 0.25
+    assert limiter.breaker.state == "closed"
+    assert limiter.get_stats()["circuit_waits"] == 1
+
+
+def test_half_open_lets_one_trial_through_and_others_wait_for_it():
+    limiter = make_limiter(max_retries=0, failure_threshold=1, reset_timeout=0.1, max_concurrency=8)
+    started = []
+
+    def trial():
+        started.append(time.monotonic())
+        time.sleep(0.2)
+        return "ok"
+
+    async def run():
+        with pytest.raises(RetryableAPIError):
+            await limiter.call(failing([APIError("down", code=503)]))
+        return await asyncio.gather(*(limiter.call(trial) for _ in range(4)))
+
+    assert asyncio.run(run()) == ["ok"] * 4
+    started.sort()
+    # The rest only started once the trial had closed the circuit
+    assert all(later - started[0] >= 0.19 for later in started[1:])
+    assert limiter.breaker.state == "closed"
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+
+    async def run():
+        trial = await breaker.before_call()
+        assert trial and breaker.state == "half_open"
+        breaker.record_failure()
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+
+
+def test_shared_limiter_works_across_event_loops():
+    limiter = make_limiter(initial_concurrency=1, max_concurrency=1)
+
+    async def run():
+        return await asyncio.gather(*(limiter.call(lambda: 1) for _ in range(3)))
+
+    # The CLI runs a loop per client; the singleton must not stay bound to the first
+    assert asyncio.run(run()) == [1, 1, 1]
+    assert asyncio.run(run()) == [1, 1, 1]
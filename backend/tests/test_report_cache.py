@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from app.services.report_cache import ReportArtifactCache
+
+
+def test_concurrent_requests_generate_once(tmp_path):
+    cache = ReportArtifactCache(tmp_path)
+    builds = []
+
+    def build(path):
+        builds.append(path)
+        time.sleep(0.05)
+        path.write_bytes(b"report")
+
+    threads = [
+        threading.Thread(target=cache.get_or_create, args=("s1", "invoices", "v1", build))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert cache.get("s1", "invoices", "v1").read_bytes() == b"report"
+
+
+def test_new_version_replaces_the_old_artifact_and_keeps_no_locks(tmp_path):
+    cache = ReportArtifactCache(tmp_path)
+    for version in ("v1", "v2", "v3"):
+        cache.get_or_create("s1", "invoices", version, lambda path: path.write_bytes(version.encode()))
+
+    assert [path.name for path in (tmp_path / "s1").iterdir()] == ["invoices-v3.xlsx"]
+    assert cache._locks == {}
+
+
+def test_failed_build_publishes_nothing_and_releases_its_lock(tmp_path):
+    cache = ReportArtifactCache(tmp_path)
+
+    def build(path):
+        path.write_bytes(b"partial")
+        raise RuntimeError("generation failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("s1", "invoices", "v1", build)
+
+    assert list((tmp_path / "s1").iterdir()) == []
+    assert cache._locks == {}
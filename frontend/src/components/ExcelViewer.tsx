@@ -27,7 +27,7 @@ const ExcelViewer = ({ invoices, isEditable = false, onUpdate = null }) => {
   const columnKeyMap = {
     "File": "file",
     "Supplier GSTIN": "supplier_gstin",
-    "Invoice No": "invoice_no",
+    "Invoice No": "invoice_number",
     "Invoice Date": "invoice_date",
     "Taxable Value": "taxable_value",
     "CGST": "cgst",
@@ -58,7 +58,9 @@ const ExcelViewer = ({ invoices, isEditable = false, onUpdate = null }) => {
     setEditingCell(null);
 
     if (onUpdate) {
-      onUpdate(newData);
+      // Paged rows carry their server-side index
+      const index = newData[rowIdx].index ?? rowIdx;
+      onUpdate(newData, { index, fields: { [fieldKey]: value } });
     }
   };
 
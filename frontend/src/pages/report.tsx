@@ -21,6 +21,11 @@ const Report = () => {
   const [reportCard, setReportCard] = useState<any>(null);
   const [gstin, setGstin] = useState("");
   const [dragActive, setDragActive] = useState(false);
+  // Cursor of every page visited so far; the last one is on screen
+  const [pageCursors, setPageCursors] = useState<(string | null)[]>([null]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [totalInvoices, setTotalInvoices] = useState(0);
+  const [pageLoading, setPageLoading] = useState(false);
 
   useEffect(() => {
     if (!sessionId) {
@@ -31,19 +36,53 @@ const Report = () => {
     fetchSessionData();
   }, [sessionId]);
 
+  // Only the columns ExcelViewer renders; raw text, items etc. stay server-side
+  const INVOICE_FIELDS = [
+    "file",
+    "supplier_gstin",
+    "invoice_number",
+    "invoice_date",
+    "taxable_value",
+    "cgst",
+    "sgst",
+    "igst",
+    "total_amount",
+    "expense_category",
+    "status",
+  ].join(",");
+  const PAGE_SIZE = "100";
+
+  // One page of invoices; only the rows on screen are ever downloaded
+  const fetchInvoicePage = async (cursor: string | null) => {
+    const params = new URLSearchParams({ limit: PAGE_SIZE, fields: INVOICE_FIELDS });
+    if (cursor) params.set("cursor", cursor);
+    const pageResponse = await fetch(
+      `${API_BASE}/process/session/${sessionId}/invoices?${params}`
+    );
+    const pageText = await pageResponse.text();
+    if (!pageResponse.ok) throw new Error(pageText);
+
+    const page = JSON.parse(pageText);
+    setNextCursor(page.next_cursor);
+    setTotalInvoices(page.total);
+    return page.items;
+  };
+
   const fetchSessionData = async () => {
     try {
       setLoading(true);
 
       const response = await fetch(
-        `${API_BASE}/process/session/${sessionId}`
+        `${API_BASE}/process/session/${sessionId}?view=summary`
       );
 
       const text = await response.text();
       if (!response.ok) throw new Error(text);
 
-      const data = JSON.parse(text);
-      setSessionData(data);
+      const summary = JSON.parse(text);
+      const invoices = await fetchInvoicePage(pageCursors[pageCursors.length - 1]);
+
+      setSessionData({ ...summary, extracted_invoices: invoices });
       setError(null);
     } catch (err: any) {
       setError(err.message || "Failed to load report");
@@ -53,6 +92,27 @@ const Report = () => {
     }
   };
 
+  const goToPage = async (cursors: (string | null)[]) => {
+    try {
+      setPageLoading(true);
+      const invoices = await fetchInvoicePage(cursors[cursors.length - 1]);
+      setPageCursors(cursors);
+      setSessionData((current: any) => ({ ...current, extracted_invoices: invoices }));
+    } catch (err: any) {
+      setError(err.message || "Failed to load invoices");
+    } finally {
+      setPageLoading(false);
+    }
+  };
+
+  const handleNextPage = () => {
+    if (nextCursor) goToPage([...pageCursors, nextCursor]);
+  };
+
+  const handlePreviousPage = () => {
+    if (pageCursors.length > 1) goToPage(pageCursors.slice(0, -1));
+  };
+
   const handleDownloadExcel = async () => {
     try {
       const response = await fetch(
@@ -176,16 +236,15 @@ const Report = () => {
     }
   };
 
-  const handleEditAndUpdateExcel = async (updatedData: any) => {
+  const handleEditAndUpdateExcel = async (_updatedData: any, change: any) => {
     try {
-      const response = await fetch(
-        `${API_BASE}/process/update-excel/${sessionId}`,
-        {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ invoices: updatedData }),
-        }
-      );
+      // Send only the edited cell; the backend recomputes just the affected pairs.
+      // Rows are field-projected, so never post them back wholesale.
+      const response = await fetch(`${API_BASE}/process/invoices/${sessionId}`, {
+        method: "PATCH",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ changes: [change] }),
+      });
 
       if (!response.ok) throw new Error("Failed to update Excel");
     } catch (err: any) {
@@ -236,6 +295,28 @@ const Report = () => {
             onUpdate={handleEditAndUpdateExcel}
           />
         )}
+
+        {totalInvoices > Number(PAGE_SIZE) && (
+          <div className="flex items-center justify-between mt-4 text-sm text-gray-600">
+            <button
+              onClick={handlePreviousPage}
+              disabled={pageLoading || pageCursors.length === 1}
+              className="px-4 py-2 bg-gray-200 rounded disabled:opacity-50"
+            >
+              Previous
+            </button>
+            <span>
+              Page {pageCursors.length} of {Math.ceil(totalInvoices / Number(PAGE_SIZE))}
+            </span>
+            <button
+              onClick={handleNextPage}
+              disabled={pageLoading || !nextCursor}
+              className="px-4 py-2 bg-gray-200 rounded disabled:opacity-50"
+            >
+              Next
+            </button>
+          </div>
+        )}
       </div>
     </main>
   );
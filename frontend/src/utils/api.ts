@@ -9,8 +9,16 @@ export const API_ENDPOINTS = {
   processDocuments: `${API_BASE_URL}/process/process`,
   getProgress: (sessionId: string) => `${API_BASE_URL}/process/progress/${sessionId}`,
   getSessionData: (sessionId: string) => `${API_BASE_URL}/process/session/${sessionId}`,
+  getSessionSummary: (sessionId: string) => `${API_BASE_URL}/process/session/${sessionId}?view=summary`,
+  listInvoices: (sessionId: string) => `${API_BASE_URL}/process/session/${sessionId}/invoices`,
+  listReconciliation: (sessionId: string) => `${API_BASE_URL}/process/session/${sessionId}/reconciliation`,
   downloadExcel: (sessionId: string) => `${API_BASE_URL}/process/download-excel/${sessionId}`,
+  downloadReconciliation: (sessionId: string, format: 'csv' | 'ndjson' = 'csv') =>
+    `${API_BASE_URL}/process/download-reconciliation/${sessionId}?format=${format}`,
+  exportColumnar: (format: 'parquet' | 'arrow' | 'csv' = 'parquet') =>
+    `${API_BASE_URL}/process/export?format=${format}`,
   updateExcel: (sessionId: string) => `${API_BASE_URL}/process/update-excel/${sessionId}`,
+  patchInvoices: (sessionId: string) => `${API_BASE_URL}/process/invoices/${sessionId}`,
   uploadGstr2b: (sessionId: string) => `${API_BASE_URL}/process/upload-gstr2b/${sessionId}`,
   detectMismatches: (sessionId: string) => `${API_BASE_URL}/process/detect-mismatches/${sessionId}`,
   fetchGovtGstr2b: (gstin: string, period: string) => 